@@ -0,0 +1,162 @@
+from utils.export_data import *
+from utils.data_processing import *
+from utils.pipeline import *
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import copy
+import importlib.util
+import csv
+import os
+import time
+
+
+def ReadInManifest(csv_name):
+    # This function reads in the list of sites to solve
+    # The manifest has one row per site, with the columns:
+    #   Site = the name of the site
+    #   Preferences = the path of the site's individual preference csv file
+    #   Groups = the path of the site's volunteer group csv file
+    #   Periods = the path of the site's shift period csv file; defaults to the --periods setting
+    #   Output Directory = the directory to write the site's schedules to; defaults to <batch output>/<site>
+    #   Time Limit = the site's solver time budget in seconds; defaults to the --time-limit setting
+    # Relative paths are relative to the manifest's directory.
+    # Inputs:
+    #   csv_name = the path of the manifest csv file
+    # Outputs:
+    #   sites = a list of dictionaries, one per site, keyed by the column names
+
+    base = os.path.dirname(os.path.abspath(csv_name))
+
+    sites = []
+    with open(csv_name, newline='') as f:
+        for row in csv.DictReader(f):
+            site = dict((k.strip(), (v or '').strip()) for (k, v) in row.items() if k)
+
+            # Resolve the paths against the manifest's directory
+            for column in ('Preferences', 'Groups', 'Periods', 'Output Directory'):
+                if site.get(column):
+                    site[column] = os.path.join(base, site[column])
+
+            sites.append(site)
+
+    return sites
+
+
+def SolveSite(Site, Config, OutputDirectory, Formats=(), PeriodsFile='../data/Shift Periods.csv'):
+    # This function solves one site's roster and exports its schedules. It runs in a worker process.
+    # Inputs:
+    #   Site = the site's dictionary from the manifest
+    #   Config = the SolverConfig object to solve with
+    #   OutputDirectory = the batch output directory
+    #   Formats = a list of the formats to also export the long-form assignment table in
+    #   PeriodsFile = the path of the shift period csv file, used when the site does not list its own
+    # Outputs:
+    #   summary = a dictionary of the site's results, keyed by the columns of the batch summary
+
+    start = time.perf_counter()
+
+    summary = {'Site': Site['Site']}
+    directory = Site.get('Output Directory') or os.path.join(OutputDirectory, Site['Site'])
+    summary['Output Directory'] = directory
+
+    try:
+        # Apply the site's own time budget
+        if Site.get('Time Limit'):
+            Config = copy.copy(Config)
+            Config.MaxTimeInSeconds = float(Site['Time Limit'])
+
+        # Solve the roster
+        (solution, shifts, status) = SolveRoster(Config, Site['Preferences'], Site['Groups'],
+                                                 Site.get('Periods') or PeriodsFile)
+        summary['Status'] = STATUS_NAMES.get(status, str(status))
+
+        # Export the site's schedules, unless the solver found none (e.g. it ran out of time)
+        if solution is not None:
+            os.makedirs(directory, exist_ok=True)
+            ExportSchedules(solution, shifts, directory, Formats)
+            ExportSolverSettings(Config, solution, directory)
+
+            summary['Objective Value'] = solution.ObjectiveValue
+            summary['Volunteers'] = len(solution.Volunteers)
+            summary['Assignments Required'] = solution.AssignmentsRequired
+            summary['Assignments Realized'] = solution.AssignmentsRealized
+            summary['Under-staffed Shifts'] = solution.UnderStaffedShifts
+            summary['Preferred Volunteers'] = solution.PreferredVolunteers
+            summary['Preferred Volunteers Assigned'] = solution.PreferredVolunteersAssigned
+
+    except Exception as error:  # report the failure and carry on with the other sites
+        summary['Status'] = 'Error: %s' % error
+
+    summary['Seconds'] = round(time.perf_counter() - start, 3)
+
+    return summary
+
+
+def SplitSearchWorkers(Jobs, Sites, Cores=None):
+    # This function shares the cores between the sites solved at once
+    # Inputs:
+    #   Jobs = the most sites solved at once
+    #   Sites = the number of sites; with fewer sites than jobs, only that many are ever solved at once
+    #   Cores = the number of cores; defaults to all of the machine's
+    # Outputs:
+    #   workers = the number of search workers per site, at least 1
+
+    cores = Cores or os.cpu_count() or 1
+    return max(cores // max(min(Jobs, Sites), 1), 1)
+
+
+if __name__ == '__main__':
+
+    # Read the batch settings from the command line
+    parser = argparse.ArgumentParser(description='Assign volunteers to shifts for many sites in parallel.')
+    parser.add_argument('manifest', help='csv file listing the sites to solve')
+    parser.add_argument('--output', default='../exported_files/batch', help='directory for the batch output')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count(), help='number of sites solved at once')
+    parser.add_argument('--backend', choices=['cp-sat', 'min-cost-flow', 'lns'], default='cp-sat',
+                        help='solver backend; without a time limit, lns stops after a pass of neighborhoods brings no '
+                             'improvement, or at %d seconds' % SolverConfig().LNSTimeLimit)
+    parser.add_argument('--time-limit', type=float, help='default maximum solve time per site in seconds')
+    parser.add_argument('--workers', type=int,
+                        help='number of search workers per site; defaults to sharing the cores between the jobs')
+    parser.add_argument('--seed', type=int, help='random seed for the search')
+    parser.add_argument('--gap', type=float, help='stop once the relative optimality gap falls to this value')
+    parser.add_argument('--periods', default='../data/Shift Periods.csv',
+                        help='shift period csv of the sites that do not list their own')
+    parser.add_argument('--min-rest', type=float, default=1, help='least rest in hours between two shifts')
+    parser.add_argument('--format', action='append', default=[], choices=sorted(ASSIGNMENT_FORMATS),
+                        help='also export each site\'s assignments as a long-form table in this format')
+    arguments = parser.parse_args()
+
+    # Check for pyarrow before solving rather than when exporting
+    if set(arguments.format) & {'parquet', 'arrow'} and importlib.util.find_spec('pyarrow') is None:
+        parser.error('the parquet and arrow formats require pyarrow (pip install pyarrow)')
+
+    jobs = max(arguments.jobs, 1)
+
+    config = SolverConfig()
+    config.Backend = arguments.backend
+    config.MaxTimeInSeconds = arguments.time_limit
+    config.RandomSeed = arguments.seed
+    config.RelativeGapLimit = arguments.gap
+    config.MinRestHours = arguments.min_rest
+
+    # Read in the sites
+    sites = ReadInManifest(arguments.manifest)
+    os.makedirs(arguments.output, exist_ok=True)
+    config.NumSearchWorkers = arguments.workers or SplitSearchWorkers(jobs, len(sites))
+
+    # Solve the sites in parallel, one process per site at a time
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        summaries = list(pool.map(SolveSite, sites, [config] * len(sites), [arguments.output] * len(sites),
+                                  [arguments.format] * len(sites), [os.path.abspath(arguments.periods)] * len(sites)))
+    seconds = time.perf_counter() - start
+
+    # Write the combined summary
+    ExportBatchSummary(summaries, arguments.output)
+
+    # Print the results
+    for summary in summaries:
+        print('%-24s %-16s %10s %8.2fs' % (
+            summary['Site'], summary['Status'], summary.get('Objective Value', ''), summary['Seconds']))
+    print('\nSolved %d sites in %1.2fs with %d jobs.' % (len(summaries), seconds, jobs))
@@ -0,0 +1,377 @@
+from utils.export_data import *
+from utils.cp_model import *
+from ortools.sat.python import cp_model
+from utils.data_processing import *
+from utils.flow_model import *
+from utils.pipeline import *
+from utils.synthetic_data import *
+from utils.telemetry import *
+from utils.validation import *
+import argparse
+import copy
+import csv
+import json
+import os
+import sys
+import tempfile
+import time
+
+
+# The shift sizes RunShiftSizeScaling draws from
+SHIFT_SIZES = [1, 2, 3, 4, 5, 6, 8, 10, 12]
+
+
+def RunBenchmark(Directory, OutputDirectory, Config, PeriodsFile='../data/Shift Periods.csv'):
+    # This function runs the full pipeline on a roster, timing each stage separately
+    # Inputs:
+    #   Directory = the directory holding 'Updated Preferences.csv' and 'Group Volunteers.csv'
+    #   OutputDirectory = the directory to export the schedules to
+    #   Config = the SolverConfig object to solve with
+    #   PeriodsFile = the path of the shift period csv file
+    # Outputs:
+    #   results = a list of (stage name, wall time in seconds, growth of the peak memory in MB) tuples
+
+    results = []
+    state = {}
+
+    def Stage(name, function):
+        # Run one stage, recording its wall time and how much it raised the peak memory
+        memory = PeakMemoryMB()
+        start = time.perf_counter()
+        function()
+        results.append((name, time.perf_counter() - start, PeakMemoryMB() - memory))
+
+    def Load():
+        state['individuals'] = ReadInIndividualVolunteerData(os.path.join(Directory, 'Updated Preferences.csv'))
+        state['groups'] = ReadInGroupVolunteerData(os.path.join(Directory, 'Group Volunteers.csv'))
+
+    def Points():
+        state['points'] = CalculatePreferencePoints(state['individuals'] + state['groups'], state['shifts'])
+
+    def Presolve():
+        state['presolve'] = PresolveAssignment(state['points'], state['shifts']) if Config.Presolve else None
+
+    def Build():
+        (state['model'], state['assignment']) = BuildModel(
+            state['individuals'], state['shifts'], state['groups'], Points=state['points'], Presolve=state['presolve'],
+            MinRestHours=Config.MinRestHours)
+
+    def Solve():
+        if Config.Backend == 'min-cost-flow':
+            state['solver'] = MinCostFlowSolver(
+                state['individuals'], state['shifts'], state['assignment'], state['groups'])
+        elif Config.Backend == 'lns':
+            from utils.lns import LNSSolver
+            state['solver'] = LNSSolver(
+                state['individuals'], state['shifts'], state['assignment'], state['groups'], Config)
+        else:
+            state['solver'] = cp_model.CpSolver()
+            ConfigureSolver(state['solver'], Config)
+        state['status'] = state['solver'].Solve(state['model'])
+
+    def Export():
+        if not state['status'] in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+            raise RuntimeError('No schedule was found (%s); raise --time-limit.' % STATUS_NAMES.get(
+                state['status'], state['status']))
+        state['solution'] = ExtractSolution(
+            state['solver'], state['assignment'], state['shifts'], state['individuals'], state['groups'])
+        ExportSchedules(state['solution'], state['shifts'], OutputDirectory)
+
+    def Validate():
+        # Check the exported schedule, as a coordinator's edit would be
+        ValidateSchedule(ReadInScheduleRows(os.path.join(OutputDirectory, 'Volunteer-Focused Schedule.csv')),
+                         state['individuals'], state['shifts'], state['groups'], Config.MinRestHours, state['points'])
+
+    Stage('BuildShiftDictionary', lambda: state.update(shifts=BuildShiftDictionary(PeriodsFile)))
+    Stage('Load', Load)
+    Stage('CapVolunteerGroups', lambda: CapVolunteerGroups(state['groups'], state['shifts']))
+    Stage('CalculatePreferencePoints', Points)
+    Stage('PresolveAssignment', Presolve)
+    Stage('BuildModel', Build)
+    Stage('Solve', Solve)
+    Stage('Export', Export)
+    Stage('Validate', Validate)
+
+    return results
+
+
+def MeasureColdStart(Modules, Repeats=5):
+    # This function times how long each module takes to import in a fresh interpreter, and which of the heavy
+    # libraries it pulls in
+    # Inputs:
+    #   Modules = a list of module names, e.g. 'utils.pipeline'
+    #   Repeats = the number of fresh interpreters to time each module in; the median is reported
+    # Outputs:
+    #   results = a list of (module name, median seconds, list of the heavy libraries loaded) tuples
+
+    import statistics
+    import subprocess
+
+    heavy = ['numpy', 'pandas', 'ortools.sat.python.cp_model', 'ortools.graph.python.min_cost_flow']
+    script = ('import sys, time\n'
+              'start = time.perf_counter()\n'
+              'import %s\n'
+              'print(time.perf_counter() - start)\n'
+              'print(",".join(m for m in %r if m in sys.modules))\n')
+
+    results = []
+    for module in Modules:
+        times = []
+        for _ in range(Repeats):
+            output = subprocess.run([sys.executable, '-c', script % (module, heavy)], capture_output=True, text=True,
+                                    check=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.split('\n')
+            times.append(float(output[0]))
+        results.append((module, statistics.median(times), [m for m in output[1].split(',') if m]))
+
+    return results
+
+
+def RunShiftLimitScaling(Limits, Config, PeriodsFile='../data/Shift Periods.csv', **RosterOptions):
+    # This function times the model build and the solve as volunteers are allowed more shifts each, on rosters that
+    # are otherwise identical
+    # Inputs:
+    #   Limits = a list of the most shifts per volunteer to try, e.g. [1, 2, 3]
+    #   Config = the SolverConfig object to solve with
+    #   PeriodsFile = the path of the shift period csv file
+    #   RosterOptions = the keyword arguments passed on to WriteSyntheticRoster
+    # Outputs:
+    #   results = a list of (limit, build seconds, solve seconds) tuples
+
+    results = []
+    for limit in Limits:
+        with tempfile.TemporaryDirectory() as directory:
+            WriteSyntheticRoster(directory, MaxShifts=limit, PeriodsFile=PeriodsFile, **RosterOptions)
+            stages = dict(
+                (name, seconds) for (name, seconds, _) in RunBenchmark(directory, directory, Config, PeriodsFile))
+        results.append((limit, stages['BuildModel'], stages['Solve']))
+
+    return results
+
+
+def RunShiftSizeScaling(SizeCounts, Config, **RosterOptions):
+    # This function times the model build and the solve as the shifts take more distinct numbers of volunteers, which
+    # raises the objective scalar (the least common multiple of the sizes). Every roster has the same nine daily
+    # periods, so only the sizes change.
+    # Inputs:
+    #   SizeCounts = a list of the numbers of distinct shift sizes to try, from 1 to len(SHIFT_SIZES)
+    #   Config = the SolverConfig object to solve with
+    #   RosterOptions = the keyword arguments passed on to WriteSyntheticRoster
+    # Outputs:
+    #   results = a list of (number of sizes, objective scalar, build seconds, solve seconds) tuples
+
+    results = []
+    for count in SizeCounts:
+        with tempfile.TemporaryDirectory() as directory:
+
+            # Write nine two-hour periods, cycling through the first count sizes
+            periods_file = os.path.join(directory, 'Shift Periods.csv')
+            with open(periods_file, mode='w', newline='') as f:
+                writer = csv.writer(f)
+                writer.writerow(['Period', 'Required Volunteers', 'Start Hour', 'Hours'])
+                for PeriodIndex in range(9):
+                    writer.writerow(['Period %d' % (PeriodIndex + 1), SHIFT_SIZES[PeriodIndex % count],
+                                     6 + 2 * PeriodIndex, 2])
+
+            WriteSyntheticRoster(directory, PeriodsFile=periods_file, **RosterOptions)
+            scalar = CalcObjectiveScalar(BuildShiftDictionary(periods_file))
+            stages = dict(
+                (name, seconds) for (name, seconds, _) in RunBenchmark(directory, directory, Config, periods_file))
+        results.append((count, scalar, stages['BuildModel'], stages['Solve']))
+
+    return results
+
+
+def CompareBackends(Directory, Config, Backends, PeriodsFile='../data/Shift Periods.csv'):
+    # This function solves the same roster with each backend under the same settings and time limit
+    # Inputs:
+    #   Directory = the directory holding 'Updated Preferences.csv' and 'Group Volunteers.csv'
+    #   Config = the SolverConfig object to solve with
+    #   Backends = a list of backend names
+    #   PeriodsFile = the path of the shift period csv file
+    # Outputs:
+    #   results = a list of (backend, seconds, objective value, status name, stop reason) tuples; the objective value
+    #             is '-' when the backend found no schedule, and the stop reason is '-' for the backends that do not
+    #             report one
+
+    results = []
+    for backend in Backends:
+        config = copy.copy(Config)
+        config.Backend = backend
+
+        telemetry = Telemetry()
+        start = time.perf_counter()
+        (solution, _, status) = SolveRoster(config, os.path.join(Directory, 'Updated Preferences.csv'),
+                                            os.path.join(Directory, 'Group Volunteers.csv'), PeriodsFile,
+                                            Telemetry=telemetry)
+        results.append((backend, time.perf_counter() - start,
+                        solution.ObjectiveValue if solution is not None else '-', STATUS_NAMES.get(status, status),
+                        telemetry.Solver.get('stop_reason') or '-'))
+
+    return results
+
+
+def CompareToBaseline(Results, Baseline, Tolerance):
+    # This function prints the benchmark results next to the baseline and flags the regressions
+    # Inputs:
+    #   Results = the list of (stage name, seconds, MB) tuples returned by RunBenchmark
+    #   Baseline = a dictionary mapping stage names to baseline seconds, or an empty dictionary
+    #   Tolerance = the allowed fractional slowdown before a stage counts as a regression
+    # Outputs:
+    #   regressions = the list of names of the stages that regressed
+
+    regressions = []
+
+    print('%-32s %10s %10s %10s %8s' % ('Stage', 'Seconds', 'Peak +MB', 'Baseline', 'Ratio'))
+    for (name, seconds, memory) in Results:
+        line = '%-32s %10.4f %10.1f' % (name, seconds, memory)
+
+        if name in Baseline and Baseline[name] > 0:
+            ratio = seconds / Baseline[name]
+            line += ' %10.4f %8.2f' % (Baseline[name], ratio)
+
+            # Ignore differences too small to time reliably
+            if ratio > 1 + Tolerance and seconds - Baseline[name] > 0.01:
+                line += '  REGRESSION'
+                regressions.append(name)
+
+        print(line)
+
+    return regressions
+
+
+if __name__ == '__main__':
+
+    # Read the benchmark settings from the command line
+    # The stage times are compared with a baseline stored by an earlier run with the same settings. Timings only
+    # compare on the same machine, so no baseline is kept with the code; regenerate one on the machine the benchmark
+    # gates a deployment on, e.g.
+    #   python benchmark.py --baseline ../benchmarks/baseline.json --save-baseline
+    parser = argparse.ArgumentParser(
+        description='Time each stage of the pipeline on a synthetic roster.',
+        epilog='Without --baseline the stage times are only reported. To gate on them, regenerate a baseline on the '
+               'machine the benchmark gates by running once with --baseline FILE --save-baseline; a baseline is only '
+               'used when it was stored with the same settings.')
+    parser.add_argument('--volunteers', type=int, default=1000, help='number of individual volunteers')
+    parser.add_argument('--groups', type=int, default=20, help='number of volunteer groups')
+    parser.add_argument('--group-size', type=int, default=3, help='number of volunteers per group')
+    parser.add_argument('--prefs', type=int, default=6, help='longest preference list')
+    parser.add_argument('--seed', type=int, default=0, help='random seed of the synthetic roster')
+    parser.add_argument('--sites', type=int, default=1,
+                        help='number of sites, each with its own synthetic rosters; the stage times are summed')
+    parser.add_argument('--weeks', type=int, default=1, help='number of weekly synthetic rosters per site')
+    parser.add_argument('--backend', choices=['cp-sat', 'min-cost-flow', 'lns'], default='cp-sat',
+                        help='solver backend')
+    parser.add_argument('--time-limit', type=float, default=60, help='maximum solve time in seconds')
+    parser.add_argument('--workers', type=int, default=8, help='number of parallel search workers')
+    parser.add_argument('--baseline', help='baseline json file to compare with, written by --save-baseline; '
+                                           'by default there is no comparison')
+    parser.add_argument('--save-baseline', action='store_true', help='store these results as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed fractional slowdown per stage')
+    parser.add_argument('--imports', action='store_true', help='time the cold start import of each module instead')
+    parser.add_argument('--max-shifts', type=int, nargs='+', metavar='LIMIT',
+                        help='instead time the build and solve for each of these limits on shifts per volunteer, '
+                             'on a single roster')
+    parser.add_argument('--shift-sizes', type=int, nargs='+', metavar='COUNT',
+                        choices=range(1, len(SHIFT_SIZES) + 1),
+                        help='instead time the build and solve for each of these numbers of distinct shift sizes, '
+                             'on a single roster with nine periods a day')
+    parser.add_argument('--min-rest', type=float, default=1, help='least rest in hours between two shifts')
+    parser.add_argument('--periods', default='../data/Shift Periods.csv', help='shift period csv')
+    parser.add_argument('--compare', nargs='+', choices=['cp-sat', 'min-cost-flow', 'lns'], metavar='BACKEND',
+                        help='instead solve the roster with each of these backends under the same time limit')
+    arguments = parser.parse_args()
+    if arguments.save_baseline and arguments.baseline is None:
+        parser.error('--save-baseline needs a --baseline file to write')
+
+    # Time the imports in fresh interpreters, next to the libraries they are dominated by
+    if arguments.imports:
+        print('%-36s %10s  %s' % ('Module', 'Seconds', 'Heavy libraries loaded'))
+        for (module, seconds, loaded) in MeasureColdStart([
+                'utils.data_processing', 'utils.pipeline', 'utils.cp_model', 'utils.flow_model', 'numpy', 'pandas',
+                'ortools.sat.python.cp_model']):
+            print('%-36s %10.4f  %s' % (module, seconds, ', '.join(loaded) or '-'))
+        sys.exit(0)
+
+    config = SolverConfig()
+    config.Backend = arguments.backend
+    config.MaxTimeInSeconds = arguments.time_limit
+    config.NumSearchWorkers = arguments.workers
+    config.RandomSeed = arguments.seed
+    config.MinRestHours = arguments.min_rest
+
+    # Time the solve as volunteers take on more shifts
+    if arguments.max_shifts:
+        print('%-12s %12s %12s' % ('Max shifts', 'BuildModel', 'Solve'))
+        for (limit, build, solve) in RunShiftLimitScaling(
+                arguments.max_shifts, config, arguments.periods, Volunteers=arguments.volunteers,
+                PreferenceListLength=arguments.prefs, Groups=arguments.groups, GroupSize=arguments.group_size,
+                Seed=arguments.seed):
+            print('%-12d %12.4f %12.4f' % (limit, build, solve))
+        sys.exit(0)
+
+    # Time the solve as the shifts take more distinct numbers of volunteers
+    if arguments.shift_sizes:
+        print('%-12s %12s %12s %12s' % ('Sizes', 'Scalar', 'BuildModel', 'Solve'))
+        for (count, scalar, build, solve) in RunShiftSizeScaling(
+                arguments.shift_sizes, config, Volunteers=arguments.volunteers, PreferenceListLength=arguments.prefs,
+                Groups=arguments.groups, GroupSize=arguments.group_size, Seed=arguments.seed):
+            print('%-12d %12d %12.4f %12.4f' % (count, scalar, build, solve))
+        sys.exit(0)
+
+    with tempfile.TemporaryDirectory() as directory:
+
+        # Write a synthetic roster for every site and week
+        rosters = WriteSyntheticRosters(
+            directory, Sites=arguments.sites, Weeks=arguments.weeks, Seed=arguments.seed,
+            Volunteers=arguments.volunteers, PreferenceListLength=arguments.prefs, Groups=arguments.groups,
+            GroupSize=arguments.group_size, PeriodsFile=arguments.periods)
+
+        # Compare the objective each backend reaches in the time limit, roster by roster
+        if arguments.compare:
+            print('%-16s %-16s %10s %14s  %-10s %s' % ('Roster', 'Backend', 'Seconds', 'Objective', 'Status', 'Stop'))
+            for roster in rosters:
+                name = os.path.relpath(roster, directory)
+                for (backend, seconds, objective, status, reason) in CompareBackends(
+                        roster, config, arguments.compare, arguments.periods):
+                    print('%-16s %-16s %10.3f %14s  %-10s %s' % (name, backend, seconds, objective, status, reason))
+            sys.exit(0)
+
+        # Run the pipeline on each roster, adding up the time of each stage and keeping its largest memory growth
+        stages = {}
+        for roster in rosters:
+            for (name, seconds, memory) in RunBenchmark(roster, roster, config, arguments.periods):
+                (total, peak) = stages.get(name, (0, 0))
+                stages[name] = (total + seconds, max(peak, memory))
+        results = [(name, seconds, memory) for (name, (seconds, memory)) in stages.items()]
+
+    # The settings that determine the workload, which must match for a baseline to be comparable
+    settings = dict(
+        (k, v) for (k, v) in vars(arguments).items()
+        if not k in ('baseline', 'save_baseline', 'tolerance', 'imports', 'max_shifts', 'shift_sizes', 'compare'))
+
+    # Read in the baseline
+    baseline = {}
+    if arguments.baseline is not None and os.path.exists(arguments.baseline):
+        with open(arguments.baseline) as f:
+            stored = json.load(f)
+
+        if stored['settings'] == settings:
+            baseline = stored['stages']
+        else:
+            print('The baseline in %s was measured with different settings; not comparing.\n' % arguments.baseline)
+
+    # Report the results
+    regressions = CompareToBaseline(results, baseline, arguments.tolerance)
+
+    # Store the new baseline
+    if arguments.save_baseline:
+        os.makedirs(os.path.dirname(arguments.baseline) or '.', exist_ok=True)
+        with open(arguments.baseline, mode='w') as f:
+            json.dump({
+                'settings': settings,
+                'stages': dict((name, seconds) for (name, seconds, _) in results),
+            }, f, indent=2)
+
+    # Fail when a stage regressed, so the benchmark can gate a deployment
+    if regressions:
+        sys.exit(1)
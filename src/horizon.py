@@ -0,0 +1,67 @@
+from utils.export_data import *
+from utils.cp_model import *
+from ortools.sat.python import cp_model
+from utils.data_processing import *
+from utils.horizon import *
+from utils.pipeline import *
+import argparse
+import os
+
+# Read the horizon settings from the command line
+parser = argparse.ArgumentParser(description='Assign volunteers to shifts over several weeks.')
+parser.add_argument('--weeks', type=int, nargs='+', default=[1, 2, 4, 8],
+                    help='horizon lengths in weeks; each one is solved and timed, and the longest is exported')
+parser.add_argument('--max-per-week', type=int, default=1,
+                    help='most shifts a volunteer works in one week, unless their own limit is lower')
+parser.add_argument('--max-per-season', type=int, help='most shifts a volunteer works over the horizon')
+parser.add_argument('--min-rest', type=float, default=1, help='least rest in hours between two shifts')
+parser.add_argument('--window', type=int, default=1, help='weeks per solve in the rolling horizon')
+parser.add_argument('--mode', choices=['rolling', 'monolithic', 'both'], default='both',
+                    help='solve week by week, the whole horizon at once, or both to compare them')
+parser.add_argument('--preferences', default='../data/Updated Preferences.csv', help='individual preference csv')
+parser.add_argument('--groups', default='../data/Group Volunteers.csv', help='volunteer group csv')
+parser.add_argument('--periods', default='../data/Shift Periods.csv', help='shift period csv')
+parser.add_argument('--output', help='directory to export the schedules of the longest horizon to')
+parser.add_argument('--time-limit', type=float, help='maximum time per solve in seconds')
+parser.add_argument('--workers', type=int, help='number of parallel search workers')
+parser.add_argument('--seed', type=int, help='random seed for the search')
+arguments = parser.parse_args()
+
+config = SolverConfig()
+config.MaxTimeInSeconds = arguments.time_limit
+config.NumSearchWorkers = arguments.workers
+config.RandomSeed = arguments.seed
+
+# Read in the roster
+shifts = BuildShiftDictionary(arguments.periods)
+individual_volunteers = ReadInIndividualVolunteerData(arguments.preferences)
+group_volunteers = ReadInGroupVolunteerData(arguments.groups)
+CapVolunteerGroups(group_volunteers, shifts)
+points = CalculatePreferencePoints(individual_volunteers + group_volunteers, shifts)
+
+# Solve each horizon length in each mode
+modes = ['rolling', 'monolithic'] if arguments.mode == 'both' else [arguments.mode]
+print('%-6s %-11s %8s %10s %12s %10s' % ('Weeks', 'Mode', 'Solves', 'Seconds', 'Objective', 'Status'))
+for weeks in sorted(arguments.weeks):
+    for mode in modes:
+        horizon = HorizonConfig()
+        horizon.Weeks = weeks
+        horizon.MaxShiftsPerWeek = arguments.max_per_week
+        horizon.MaxShiftsPerSeason = arguments.max_per_season
+        horizon.MinRestHours = arguments.min_rest
+        horizon.Window = arguments.window if mode == 'rolling' else None
+
+        (solution, horizon_shifts, report) = SolveHorizon(
+            individual_volunteers, shifts, group_volunteers, horizon, config, points)
+
+        # Report the total solve time and the worst status of the solves
+        seconds = sum(r[2] for r in report)
+        statuses = set(r[3] for r in report)
+        status = 'Optimal' if statuses == {cp_model.OPTIMAL} else \
+            ', '.join(sorted(STATUS_NAMES.get(s, str(s)) for s in statuses if s != cp_model.OPTIMAL))
+        print('%-6d %-11s %8d %10.3f %12d %10s' % (weeks, mode, len(report), seconds, solution.ObjectiveValue, status))
+
+# Export the schedules of the longest horizon
+if arguments.output:
+    os.makedirs(arguments.output, exist_ok=True)
+    ExportSchedules(solution, horizon_shifts, arguments.output)
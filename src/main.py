@@ -1,34 +1,132 @@
 from utils.export_data import *
-from utils.cp_model import *
 from utils.data_processing import *
+from utils.pipeline import *
+from utils.cache import *
+from utils.telemetry import *
+import argparse
+import importlib.util
+import os
+import sys
 
-# Build the list of shifts
-shifts = BuildShiftDictionary()
+# Read the solver settings from the command line
+parser = argparse.ArgumentParser(description='Assign volunteers to shifts.')
+parser.add_argument('--backend', choices=['cp-sat', 'min-cost-flow', 'lns'], default='cp-sat',
+                    help='solver backend; without --time-limit, lns stops after a pass of neighborhoods brings no '
+                         'improvement, or at %d seconds' % SolverConfig().LNSTimeLimit)
+parser.add_argument('--time-limit', type=float, help='maximum solve time in seconds')
+parser.add_argument('--workers', type=int, help='number of parallel search workers')
+parser.add_argument('--seed', type=int, help='random seed for the search')
+parser.add_argument('--gap', type=float, help='stop once the relative optimality gap falls to this value')
+parser.add_argument('--hint', help='volunteer-focused schedule csv of an earlier solution, used to warm start the solver')
+parser.add_argument('--no-presolve', action='store_true', help='build the model without the presolve pass')
+parser.add_argument('--stall', type=float, help='stop once this many seconds pass without an improving solution')
+parser.add_argument('--progress', action='store_true', help='print each improving solution as it is found')
+parser.add_argument('--provisional', help='directory to export each improving schedule to as it is found')
+parser.add_argument('--cache', help='directory of the cache of parsed rosters and solved schedules')
+parser.add_argument('--cache-size', type=float, default=100, help='largest size of the cache in MB')
+parser.add_argument('--pool', type=int, metavar='K',
+                    help='enumerate up to K distinct optimal schedules and export each with a diff against the first')
+parser.add_argument('--pool-tolerance', type=float, default=0.0,
+                    help='let pool schedules fall short of the best objective by this fraction')
+parser.add_argument('--pool-time', type=float, help='time budget in seconds for building the pool')
+parser.add_argument('--pool-output', help='directory to export the pool to; defaults to <output>/pool')
+parser.add_argument('--profile', action='append', default=[], metavar='STAGE',
+                    help='run a pipeline stage (e.g. Solve or BuildModel) under cProfile; may be repeated')
+parser.add_argument('--periods', default='../data/Shift Periods.csv', help='shift period csv')
+parser.add_argument('--min-rest', type=float, default=1, help='least rest in hours between two shifts')
+parser.add_argument('--output', default='../exported_files', help='directory to export the results to')
+parser.add_argument('--format', action='append', default=[], choices=sorted(ASSIGNMENT_FORMATS),
+                    help='also export the assignments as a long-form table in this format; may be repeated')
+arguments = parser.parse_args()
 
-# Read in the individual volunteer data
-individual_volunteers = ReadInIndividualVolunteerData()
+# The pool enumerates its schedules with CP-SAT from the whole model, without the presolve pass, and reports only
+# the finished pool
+if arguments.pool:
+    unsupported = [flag for (flag, used) in [
+        ('--backend %s' % arguments.backend, arguments.backend != 'cp-sat'), ('--hint', arguments.hint),
+        ('--cache', arguments.cache), ('--stall', arguments.stall is not None), ('--progress', arguments.progress),
+        ('--provisional', arguments.provisional), ('--profile', arguments.profile)] if used]
+    if unsupported:
+        parser.error('%s cannot be used with --pool' % ', '.join(unsupported))
 
-# Read in the volunteer group data
-group_volunteers = ReadInGroupVolunteerData()
+# Check for pyarrow before solving rather than when exporting
+if set(arguments.format) & {'parquet', 'arrow'} and importlib.util.find_spec('pyarrow') is None:
+    parser.error('the parquet and arrow formats require pyarrow (pip install pyarrow)')
 
-# Break the volunteer groups down into individuals
-DisaggregateVolunteerGroups(group_volunteers, individual_volunteers, shifts)
+config = SolverConfig()
+config.Backend = arguments.backend
+config.MaxTimeInSeconds = arguments.time_limit
+config.NumSearchWorkers = arguments.workers
+config.RandomSeed = arguments.seed
+config.RelativeGapLimit = arguments.gap
+config.NoImprovementSeconds = arguments.stall
+config.MinRestHours = arguments.min_rest
+config.Presolve = not arguments.no_presolve and not arguments.pool
 
-# Calculate the number of preference points each volunteer associates with each shift
-for v in individual_volunteers:
-    v.CalculateShiftPreferencePoints(shifts)
+# Read in the earlier solution to warm start from
+prior_assignments = ReadInPriorSchedule(arguments.hint) if arguments.hint else None
 
-# Build the constraint programming model
-(model, assignment) = BuildModel(individual_volunteers, shifts)
+# Choose what to do with each improving solution
+hooks = []
+if arguments.progress or arguments.provisional:
+    from utils.progress import LogProgress, ProvisionalScheduleWriter
+if arguments.progress:
+    hooks.append(LogProgress)
+if arguments.provisional:
+    hooks.append(ProvisionalScheduleWriter(BuildShiftDictionary(arguments.periods), arguments.provisional))
 
-# Create the solver and solve
-solver = cp_model.CpSolver()
-solver.Solve(model)
+# Open the cache
+cache = ScheduleCache(arguments.cache, arguments.cache_size * 1024 * 1024) if arguments.cache else None
+
+# Record the time and memory of each stage, profiling the requested ones
+os.makedirs(arguments.output, exist_ok=True)
+telemetry = Telemetry(arguments.profile, os.path.join(arguments.output, 'profiles'))
+
+# Read in the volunteers, build the model and solve it
+if arguments.pool:
+    from utils.solution_pool import DiffSchedules, SolveSolutionPool
+
+    # Enumerate the alternative schedules; the first is the optimum the rest are compared with
+    (pool, shifts, status) = SolveSolutionPool(config, Count=arguments.pool, Tolerance=arguments.pool_tolerance,
+                                               TimeBudget=arguments.pool_time, PeriodsFile=arguments.periods)
+    if not pool:
+        sys.exit('No schedule was found (%s).' % STATUS_NAMES.get(status, status))
+    solution = pool[0].Solution
+
+    # Export each schedule with its differences from the first
+    pool_output = arguments.pool_output or os.path.join(arguments.output, 'pool')
+    exported = []
+    for (ScheduleIndex, schedule) in enumerate(pool):
+        directory = os.path.join(pool_output, 'schedule_%d' % (ScheduleIndex + 1))
+        os.makedirs(directory, exist_ok=True)
+        ExportSchedules(schedule.Solution, shifts, directory, arguments.format)
+        ExportScheduleDiff(DiffSchedules(solution, schedule.Solution), directory)
+        exported.append((schedule, directory))
+    ExportSolutionPool(exported, pool_output)
+
+    print('Found %d schedule(s):' % len(pool))
+    for (ScheduleIndex, schedule) in enumerate(pool):
+        print('\tSchedule %d: objective %s, %d volunteer(s) moved from the first' % (
+            ScheduleIndex + 1, schedule.ObjectiveValue, schedule.Changes))
+    print()
+else:
+    (solution, shifts, status) = SolveRoster(config, PeriodsFile=arguments.periods, PriorAssignments=prior_assignments,
+                                             Cache=cache, Hooks=hooks, Telemetry=telemetry)
+    if solution is None:
+        sys.exit('No schedule was found (%s).' % STATUS_NAMES.get(status, status))
 
 # Print out the results
-PrintShiftAssignments(solver, assignment, shifts, individual_volunteers)
-PrintSummaryStatistics(solver, assignment, shifts, individual_volunteers)
+PrintShiftAssignments(solution)
+PrintSummaryStatistics(solution)
+if solution.Presolve is not None:
+    PrintPresolveReport(solution.Presolve)
 
 # Write the results to a CSV file
-ExportShiftFocusedSchedule(solver, assignment, shifts, individual_volunteers)
-ExportVolunteerFocusedSchedule(solver, assignment, shifts, individual_volunteers)
+ExportSchedules(solution, shifts, arguments.output, arguments.format)
+if arguments.pool:
+    ExportSolverSettings(config, solution, arguments.output, [
+        ('Pool size', arguments.pool), ('Pool tolerance', arguments.pool_tolerance),
+        ('Pool time budget', arguments.pool_time), ('Pool schedules found', len(pool))])
+else:
+    ExportSolverSettings(config, solution, arguments.output)
+ExportTelemetry(telemetry, arguments.output)
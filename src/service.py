@@ -0,0 +1,61 @@
+from utils.service import *
+from utils.y2y_classes import SolverConfig
+import argparse
+import json
+import time
+
+# Read the service settings from the command line
+parser = argparse.ArgumentParser(description='Serve the schedule over HTTP, keeping the model in memory.')
+parser.add_argument('--host', default='127.0.0.1', help='address to listen on')
+parser.add_argument('--port', type=int, default=8765, help='port to listen on')
+parser.add_argument('--preferences', default='../data/Updated Preferences.csv', help='individual preference csv')
+parser.add_argument('--groups', default='../data/Group Volunteers.csv', help='volunteer group csv')
+parser.add_argument('--periods', default='../data/Shift Periods.csv', help='shift period csv')
+parser.add_argument('--min-rest', type=float, default=1, help='least rest in hours between two shifts')
+parser.add_argument('--time-limit', type=float, help='maximum solve time in seconds')
+parser.add_argument('--workers', type=int, help='number of parallel search workers')
+parser.add_argument('--demo', action='store_true',
+                    help='drive the service with a few edits through a local client, without opening a socket')
+arguments = parser.parse_args()
+
+config = SolverConfig()
+config.MaxTimeInSeconds = arguments.time_limit
+config.NumSearchWorkers = arguments.workers
+config.MinRestHours = arguments.min_rest
+
+# Load the roster and solve it once
+start = time.perf_counter()
+service = SchedulingService(SchedulingSession(config, arguments.preferences, arguments.groups, arguments.periods))
+print('Loaded and solved the roster in %1.3fs.' % (time.perf_counter() - start))
+
+if arguments.demo:
+    client = LocalClient(service)
+
+    (code, schedule) = client.Get('/schedule')
+    print('GET /schedule --> %d, objective %s' % (code, schedule['objective']))
+
+    requests = [
+        [{'op': 'add_volunteer', 'name': 'New Volunteer', 'shifts': ['Monday Overnight', 'Tuesday Dinner']}],
+        [{'op': 'remove_volunteer', 'name': schedule['shifts']['Sunday Breakfast'][0]}],
+        [{'op': 'set_requirement', 'shift': 'Saturday Overnight', 'required': 2}],
+        [{'op': 'change_preferences', 'name': 'New Volunteer', 'shifts': ['Saturday Overnight']}],
+        [{'op': 'remove_volunteer', 'name': 'Nobody'}],
+    ]
+    for edits in requests:
+        (code, response) = client.Post('/edits', {'edits': edits})
+        print('POST /edits %s --> %d, %s' % (
+            json.dumps(edits), code, response.get('error') or 'objective %s' % response['objective']))
+
+    # Check a hand-edited schedule, which moves a volunteer onto a shift they did not list
+    (_, schedule) = client.Get('/schedule')
+    edited = schedule['assignments']
+    edited[0][1] = ['Saturday Overnight']
+    (code, response) = client.Post('/validate', {'schedule': edited})
+    print('POST /validate --> %d, %s' % (code, json.dumps(response)))
+
+    print(json.dumps(client.Get('/metrics')[1], indent=2))
+
+else:
+    print('Serving on http://%s:%d (GET /schedule, GET /metrics, POST /edits, POST /solve, POST /validate)' % (
+        arguments.host, arguments.port))
+    ServeHTTP(service, arguments.host, arguments.port)
@@ -0,0 +1,74 @@
+from utils.export_data import *
+from utils.cp_model import *
+from utils.data_processing import *
+from utils.sweep import *
+import argparse
+import itertools
+import os
+
+if __name__ == '__main__':
+
+    # Read the sweep settings from the command line
+    parser = argparse.ArgumentParser(description='Re-solve the schedule across a grid of objective weights.')
+    parser.add_argument('--coverage-weights', type=int, nargs='+', default=[10],
+                        help='weights of the shift coverage objective')
+    parser.add_argument('--preference-weights', type=int, nargs='+', default=[0, 1, 2, 5, 10, 20, 50, 100],
+                        help='weights of the volunteer preference objective')
+    parser.add_argument('--preferences', default='../data/Updated Preferences.csv', help='individual preference csv')
+    parser.add_argument('--groups', default='../data/Group Volunteers.csv', help='volunteer group csv')
+    parser.add_argument('--periods', default='../data/Shift Periods.csv', help='shift period csv')
+    parser.add_argument('--min-rest', type=float, default=1, help='least rest in hours between two shifts')
+    parser.add_argument('--output', default='../exported_files/sweep', help='directory for the sweep output')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count(), help='number of worker processes')
+    parser.add_argument('--time-limit', type=float, help='maximum time per solve in seconds')
+    parser.add_argument('--workers', type=int, default=1, help='number of search workers per solve')
+    parser.add_argument('--seed', type=int, help='random seed for the search')
+    arguments = parser.parse_args()
+
+    config = SolverConfig()
+    config.MaxTimeInSeconds = arguments.time_limit
+    config.NumSearchWorkers = arguments.workers
+    config.RandomSeed = arguments.seed
+    config.MinRestHours = arguments.min_rest
+
+    # Read in the roster and build the model once
+    shifts = BuildShiftDictionary(arguments.periods)
+    individual_volunteers = ReadInIndividualVolunteerData(arguments.preferences)
+    group_volunteers = ReadInGroupVolunteerData(arguments.groups)
+    CapVolunteerGroups(group_volunteers, shifts)
+    points = CalculatePreferencePoints(individual_volunteers + group_volunteers, shifts)
+    (model, _) = BuildModel(individual_volunteers, shifts, group_volunteers, Points=points,
+                            MinRestHours=config.MinRestHours)
+
+    # Build the grid of weights, leaving out the all-zero objective
+    grid = []
+    for (coverage, preference) in itertools.product(arguments.coverage_weights, arguments.preference_weights):
+        if coverage != 0 or preference != 0:
+            grid.append({'Maximize the shift coverage': coverage, 'Respect the volunteer preferences': preference})
+
+    # Solve the grid
+    results = SweepObjectiveWeights(model, points, shifts, grid, config, arguments.jobs)
+    front = FindParetoFront(results)
+
+    # Print the results
+    print('%10s %10s %10s %12s %10s %7s' % ('Coverage', 'Preference', 'Covered', 'Pref points', 'Assigned', 'Front'))
+    for p in results:
+        print('%10d %10d %10.3f %12d %10d %7s' % (
+            p.Weights['Maximize the shift coverage'], p.Weights['Respect the volunteer preferences'],
+            p.Coverage, p.PreferencePoints, p.AssignmentsRealized, '*' if p in front else ''))
+
+    # Export a schedule for each point of the front, and the front itself
+    exported = []
+    for (PointIndex, p) in enumerate(front):
+        directory = os.path.join(arguments.output, 'point_%d' % (PointIndex + 1))
+        os.makedirs(directory, exist_ok=True)
+
+        counts = {}
+        for k in np.flatnonzero(p.Values).tolist():
+            counts[(points.Entities[points.EntityIds[k]], points.ShiftNames[points.ShiftIds[k]])] = int(p.Values[k])
+        solution = BuildSolution(counts, shifts, individual_volunteers, group_volunteers, p.ObjectiveValue)
+
+        ExportSchedules(solution, shifts, directory)
+        exported.append((p, directory))
+
+    ExportParetoFront(exported, arguments.output)
@@ -0,0 +1,103 @@
+import hashlib
+import os
+import pickle
+import tempfile
+
+# Bump this whenever the cached objects or the way results are computed change, so old entries stop matching
+CACHE_VERSION = 3
+
+
+class ScheduleCache():
+    # This class is an on-disk cache of parsed rosters and solved schedules. Entries are named by a hash of
+    # everything that determines their content, so a changed input simply misses the cache. Each entry is one pickle
+    # file; reading an entry refreshes its modification time, and the least recently used entries are deleted once
+    # the cache grows past its size limit.
+
+    def __init__(self, Directory='../cache', MaxBytes=100 * 1024 * 1024):
+        # Inputs:
+        #   Directory = the directory holding the cache entries
+        #   MaxBytes = the most disk space the entries may take up
+        self.Directory = Directory
+        self.MaxBytes = MaxBytes
+        os.makedirs(Directory, exist_ok=True)
+
+    def Load(self, Key):
+        # Return the object stored under a key, or None on a miss
+        file_name = os.path.join(self.Directory, Key + '.pkl')
+        try:
+            with open(file_name, mode='rb') as f:
+                value = pickle.load(f)
+        except OSError:  # missing
+            return None
+        except Exception:
+            # Left incomplete by a crash, or pickled from classes that have since changed; unpickling can fail with
+            # almost any exception, so treat them all as a miss and delete the entry
+            try:
+                os.remove(file_name)
+            except OSError:
+                pass
+            return None
+
+        # Mark the entry as recently used
+        try:
+            os.utime(file_name)
+        except OSError:
+            pass
+
+        return value
+
+    def Store(self, Key, Value):
+        # Store an object under a key, then evict the least recently used entries if the cache is too large
+
+        # Write to a temporary file first, so a reader never sees a partial entry
+        (handle, temporary_name) = tempfile.mkstemp(dir=self.Directory, suffix='.tmp')
+        with os.fdopen(handle, mode='wb') as f:
+            pickle.dump(Value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporary_name, os.path.join(self.Directory, Key + '.pkl'))
+
+        self.Evict()
+
+    def Evict(self):
+        # Delete the least recently used entries until the cache fits in its size limit
+        entries = []
+        for name in os.listdir(self.Directory):
+            if name.endswith('.pkl'):
+                stat = os.stat(os.path.join(self.Directory, name))
+                entries.append((stat.st_mtime, stat.st_size, name))
+
+        total = sum(size for (_, size, _) in entries)
+        for (_, size, name) in sorted(entries):
+            if total <= self.MaxBytes:
+                break
+            try:
+                os.remove(os.path.join(self.Directory, name))
+            except OSError:
+                pass
+            total -= size
+
+
+def HashInputs(Files, *Values):
+    # This function hashes the inputs that determine a cache entry
+    # Inputs:
+    #   Files = a list of file paths, whose contents are hashed
+    #   Values = plain values such as settings, whose repr is hashed
+    # Outputs:
+    #   key = a hex digest
+
+    digest = hashlib.sha256(b'%d' % CACHE_VERSION)
+    for file_name in Files:
+        with open(file_name, mode='rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+        digest.update(b'\0')
+
+    for value in Values:
+        digest.update(repr(value).encode())
+        digest.update(b'\0')
+
+    return digest.hexdigest()
+
+
+def DescribeShifts(Shifts):
+    # This function lists the properties of the shifts that affect the solution, for hashing
+    return [(s.shift_name, s.required_volunteers, s.start_hour, s.duration_hours) for s in Shifts.values()]
@@ -1,126 +1,663 @@
-from ortools.sat.python import cp_model
+import math
+import numpy as np
+from utils.y2y_classes import PreferencePoints, PresolveResult, Solution, VolunteerGroup
 
-def BuildModel(IndividualVolunteers, Shifts):
+# CP-SAT rejects objectives whose value could overflow an int64, so keep the largest possible objective value a
+# factor of two below that limit
+MAX_OBJECTIVE_MAGNITUDE = 2 ** 62
+
+# The weekly schedule repeats, so shift times wrap around after a week
+HOURS_PER_WEEK = 7 * 24
+
+
+class SparseAssignment():
+    # This class stores the assignment decision variables, which only exist for eligible (volunteer, shift) pairs.
+    # Volunteers, groups and shifts are referred to by integer IDs: their positions in Entities and ShiftNames. The
+    # variables are stored in the order of the PreferencePoints they were built from, i.e. grouped by volunteer.
+
+    def __init__(self, Points):
+        # Inputs:
+        #   Points = the PreferencePoints object listing the eligible pairs
+        self.Entities = Points.Entities
+        self.ShiftNames = Points.ShiftNames
+        self.EntityIds = Points.EntityIds  # array of the volunteer or group ID of each variable
+        self.ShiftIds = Points.ShiftIds  # array of the shift ID of each variable
+        self.Indptr = Points.Indptr  # the variables of entity e are at positions Indptr[e] to Indptr[e + 1]
+        self.Variables = []  # list of decision variables
+        self.Coefficients = None  # array of the integer objective coefficient of each variable
+        self.ShiftConstraints = {}  # shift name --> index of the shift's staffing constraint in the model
+        self.FixedCounts = {}  # (volunteer or group, shift name) --> number of people fixed by the presolve
+        self.FixedObjective = 0  # objective value of the fixed assignments
+
+        # Index the variable positions by shift
+        order = np.argsort(self.ShiftIds, kind='stable')
+        bounds = np.searchsorted(self.ShiftIds[order], np.arange(len(self.ShiftNames) + 1))
+        self.ByShift = [order[bounds[i]:bounds[i + 1]] for i in range(len(self.ShiftNames))]
+
+        # Find the ID of each volunteer and shift
+        self.EntityIndex = dict((e, i) for (i, e) in enumerate(self.Entities))
+        self.ShiftIndex = dict((s, i) for (i, s) in enumerate(self.ShiftNames))
+
+    def ForShift(self, ShiftName):
+        # Return the (volunteer, variable) tuples for the given shift
+        return [(self.Entities[self.EntityIds[k]], self.Variables[k]) for k in self.ByShift[self.ShiftIndex[ShiftName]]]
+
+    def ForVolunteer(self, Volunteer):
+        # Return the (shift name, variable) tuples for the given volunteer or group
+        e = self.EntityIndex[Volunteer]
+        return [(self.ShiftNames[self.ShiftIds[k]], self.Variables[k]) for k in range(self.Indptr[e], self.Indptr[e + 1])]
+
+    def Keys(self):
+        # Return the (volunteer or group, shift name) tuple of each variable
+        return [(self.Entities[e], self.ShiftNames[s]) for (e, s) in zip(self.EntityIds.tolist(), self.ShiftIds.tolist())]
+
+    def __len__(self):
+        return len(self.EntityIds)
+
+
+def BuildModel(IndividualVolunteers, Shifts, VolunteerGroups=(), PriorAssignments=None, Points=None,
+               Presolve=None, MinRestHours=1):
     # This function builds the constraint programming model for the problem
     # Inputs:
     #   IndividualVolunteers = a list of volunteer objects.
     #   Shifts = a dictionary of shift objects, indexed by shift names
+    #   VolunteerGroups = a list of VolunteerGroup objects, already capped by CapVolunteerGroups
+    #   PriorAssignments = an optional dictionary mapping volunteer names to the shift names they were assigned to in
+    #                      an earlier solution (see ReadInPriorSchedule and Solution.AssignmentsByName), used to warm
+    #                      start the solver
+    #   Points = the PreferencePoints of the volunteers followed by the groups; calculated if not given
+    #   Presolve = an optional PresolveResult from PresolveAssignment; the model then only covers the pairs left to
+    #              solve, and the fixed assignments are added back when the solution is extracted
+    #   MinRestHours = the least rest in hours between two shifts of a volunteer who works several
     # Outputs:
     #   model = a CP model object populated with decision variables, constraints, and an objective.
+    #   assignment = a SparseAssignment holding the decision variables for the eligible (volunteer, shift) pairs and
+    #                the member counts for the (group, shift) pairs
+
+    # Import the CP-SAT wrapper only once a model is built, since it takes most of the start up time
+    from ortools.sat.python import cp_model
+
+    # Find the eligible pairs and their objective coefficients
+    assignment = BuildAssignment(IndividualVolunteers, Shifts, VolunteerGroups, Points, Presolve)
+
+    # Find the number of people each shift can take
+    room = dict((s, Shifts[s].required_volunteers) for s in Shifts) if Presolve is None else Presolve.Room
 
     # Instantiate the CP model
     model = cp_model.CpModel()
 
     # Create the model variables
-    # Primary decision variables
-    assignment = {}
-    for v in IndividualVolunteers:
-        for s in Shifts:
-            assignment[(v, s)] = model.NewBoolVar('Volunteer %s assigned to %s shift' % (v.ID_Number, s))
+    # Primary decision variables. A volunteer can only be assigned to one of the shifts they indicated in their
+    # preference list, so variables are only created for those pairs. Group members are interchangeable, so each
+    # group gets a single integer variable counting the members assigned to its shift, rather than one Bool
+    # variable per member.
+    for (e, s) in zip(assignment.EntityIds.tolist(), assignment.ShiftIds.tolist()):
+        v = assignment.Entities[e]
+        if isinstance(v, VolunteerGroup):
+            x = model.NewIntVar(0, v.Volunteers, 'Members of group %s assigned to %s shift' % (
+                v.ID_Number, assignment.ShiftNames[s]))
+        else:
+            x = model.NewBoolVar('Volunteer %s assigned to %s shift' % (v.ID_Number, assignment.ShiftNames[s]))
+        assignment.Variables.append(x)
 
     # Create the constraints
     # Each shift has a maximum number of volunteers assigned to it
-    for s in Shifts:
-        model.Add(
-            sum(assignment[(v, s)] for v in IndividualVolunteers) <= Shifts[s].required_volunteers
-        )
-
-    # Each volunteer is assigned to at most one shift
-    for v in IndividualVolunteers:
-        model.Add(
-            sum(assignment[(v, s)] for s in Shifts) <= 1
-        )
-
-    # Each volunteer can only be assigned to the one of the shifts they indicated in their preference list
-    for v in IndividualVolunteers:
-        for s in Shifts:
-            if not s in v.PreferredShifts:
-                model.Add(
-                    assignment[(v, s)] == 0
-                )
+    for (i, s) in enumerate(assignment.ShiftNames):
+        if len(assignment.ByShift[i]) > 0:
+            assignment.ShiftConstraints[s] = model.Add(
+                sum(assignment.Variables[k] for k in assignment.ByShift[i].tolist()) <= room[s]
+            ).Index()
+
+    # Each volunteer is assigned to at most their maximum number of shifts, and never to two shifts too close
+    # together; most volunteers work one shift, so the conflicts are only found when someone works more
+    conflicts = FindShiftConflicts(Shifts, MinRestHours) if any(v.MaxShifts > 1 for v in IndividualVolunteers) else []
+    indptr = assignment.Indptr.tolist()
+    for e in range(len(IndividualVolunteers)):
+        AddVolunteerLimits(model, IndividualVolunteers[e], [(assignment.ShiftNames[assignment.ShiftIds[k]],
+                           assignment.Variables[k]) for k in range(indptr[e], indptr[e + 1])], conflicts)
 
     # Set the objective
-    # Define the weights of the various objectives
+    # Define the objective: maximize the shift coverage and the realized shift preference points
+    SetMaximizeObjective(model, assignment.Variables, assignment.Coefficients, assignment.FixedObjective)
+
+    # Warm start the solver from the earlier solution
+    if PriorAssignments is not None:
+        ApplySolutionHints(model, assignment, PriorAssignments)
+
+    # Return the model
+    return (model, assignment)
+
+
+def FindShiftConflicts(Shifts, MinRestHours=1):
+    # This function finds the sets of shifts no volunteer can work more than one of, because they overlap or leave
+    # less than MinRestHours between them. Two shifts conflict exactly when their intervals, each extended by the
+    # rest, overlap, so the sets are the maximal cliques of an interval graph and one sweep over the start and end
+    # times finds them all. The week wraps around, so Saturday Overnight is followed by Sunday Breakfast.
+    # Inputs:
+    #   Shifts = a dictionary of shift objects, indexed by shift names
+    #   MinRestHours = the least rest in hours between two shifts
+    # Outputs:
+    #   conflicts = a list of sets of two or more shift names
+
+    # List the start and end of every shift, and of a copy a week later so the sweep sees the wrap around
+    events = []
+    for s in Shifts.values():
+        for offset in (0, HOURS_PER_WEEK):
+            end = s.start_hour + s.duration_hours + MinRestHours
+            if end > s.start_hour:
+                events.append((s.start_hour + offset, 1, s.shift_name))
+                events.append((end + offset, 0, s.shift_name))
+
+    # Sweep through time, with the ends before the starts at the same time; the shifts running just before the
+    # first end after a start form a maximal clique
+    cliques = []
+    active = []
+    opened = False
+    for (_, is_start, name) in sorted(events):
+        if is_start:
+            active.append(name)
+            opened = True
+        else:
+            if opened:
+                cliques.append(frozenset(active))
+            active.remove(name)
+            opened = False
+
+    # Keep the distinct cliques of two or more shifts that are not part of a larger one
+    cliques = set(c for c in cliques if len(c) > 1)
+    return [set(c) for c in cliques if not any(c < d for d in cliques)]
+
+
+def AddVolunteerLimits(model, Volunteer, Pairs, Conflicts=()):
+    # This function limits the shifts a volunteer is assigned to
+    # Inputs:
+    #   model = the CP model object
+    #   Volunteer = the volunteer object
+    #   Pairs = a list of the volunteer's (shift name, decision variable) tuples
+    #   Conflicts = the list of sets of conflicting shift names returned by FindShiftConflicts
+
+    variables = [x for (_, x) in Pairs]
+
+    # A volunteer who works one shift needs no conflict constraints
+    if Volunteer.MaxShifts == 1:
+        if len(variables) > 1:
+            model.AddAtMostOne(variables)
+        return
+
+    # Limit the number of shifts
+    if len(variables) > Volunteer.MaxShifts:
+        model.Add(sum(variables) <= max(Volunteer.MaxShifts, 0))
+
+    # Work at most one shift of each set of conflicting shifts
+    for c in Conflicts:
+        clique = [x for (s, x) in Pairs if s in c]
+        if len(clique) > 1:
+            model.AddAtMostOne(clique)
+
+
+def BuildAssignment(IndividualVolunteers, Shifts, VolunteerGroups=(), Points=None, Presolve=None):
+    # This function lists the eligible (volunteer, shift) pairs and their objective coefficients, without creating
+    # any decision variables. BuildModel adds the variables to it; the min-cost flow backend solves it directly.
+    # Inputs:
+    #   see BuildModel
+    # Outputs:
+    #   assignment = a SparseAssignment with no variables
+
+    # Calculate the preference points of every eligible (volunteer, shift) pair
+    if Presolve is not None:
+        Points = Presolve.Points
+    elif Points is None:
+        Points = CalculatePreferencePoints(list(IndividualVolunteers) + list(VolunteerGroups), Shifts)
+
+    # List the pairs, along with the assignments fixed by the presolve
+    assignment = SparseAssignment(Points)
+    if Presolve is not None:
+        assignment.FixedCounts = dict(Presolve.FixedCounts)
+        assignment.FixedObjective = Presolve.FixedObjective
+
+    # Calculate the integer objective coefficient of each pair
+    assignment.Coefficients = CalcObjectiveCoefficients(Points, Shifts)
+
+    # Return the pairs
+    return assignment
+
+
+def SetMaximizeObjective(model, Variables, Coefficients, Offset=0):
+    # This function sets the objective to maximize a weighted sum of the decision variables. It is equivalent to
+    # model.Maximize(cp_model.LinearExpr.WeightedSum(Variables, Coefficients)), but writes the coefficients straight
+    # into the model, which is an order of magnitude faster for large rosters. The model stores a maximization as
+    # the minimization of the negated objective, with a scaling factor of -1 to report the value with its sign.
+    # Inputs:
+    #   model = the CP model object
+    #   Variables = a list of decision variables
+    #   Coefficients = an array of their integer objective coefficients
+    #   Offset = a constant added to the objective
+
+    model.ClearObjective()
+    objective = model.Proto().objective
+    objective.vars.extend([x.Index() for x in Variables])
+    objective.coeffs.extend((-np.asarray(Coefficients, dtype=np.int64)).tolist())
+    objective.offset = -Offset
+    objective.scaling_factor = -1
+
+
+def CalculatePreferencePoints(Entities, Shifts):
+    # This function calculates the preference points of every eligible (volunteer or group, shift) pair at once.
+    # A volunteer's k-th listed shift (counting from 0) is worth (length of their list - k) points, doubled for
+    # preferred volunteers; unknown shifts still count towards the length of the list, and only the first listing
+    # of a shift counts. Group members are scored as if the group's shift were the first choice in a list of
+    # VolunteerGroup.PreferenceListLength shifts, as preferred volunteers.
+    # Inputs:
+    #   Entities = a list of volunteer and VolunteerGroup objects
+    #   Shifts = a dictionary of shift objects, indexed by shift names
+    # Outputs:
+    #   points = a PreferencePoints object
+
+    # Number the shifts
+    shift_names = list(Shifts)
+    shift_index = dict((s, i) for (i, s) in enumerate(shift_names))
+
+    # Flatten the preference lists
+    listed = []
+    counts = []
+    lengths = []
+    preferred = []
+    for v in Entities:
+        if isinstance(v, VolunteerGroup):
+            shifts = [v.AssignedShift] if v.Volunteers > 0 else []
+            lengths.append(v.PreferenceListLength)
+        else:
+            shifts = v.PreferredShifts
+            lengths.append(len(shifts))
+        listed.extend(shifts)
+        counts.append(len(shifts))
+        preferred.append(v.IsPreferredVolunteer == True)
+
+    shift_ids = np.array([shift_index.get(s, -1) for s in listed], dtype=np.int64)
+    counts = np.array(counts, dtype=np.int64)
+    entity_ids = np.repeat(np.arange(len(Entities), dtype=np.int64), counts)
+
+    # Find the position of each listing within its volunteer's list
+    starts = np.cumsum(counts) - counts
+    positions = np.arange(len(listed), dtype=np.int64) - np.repeat(starts, counts)
+
+    # Calculate the points of each listing
+    points = np.repeat(np.array(lengths, dtype=np.int64), counts) - positions
+    points *= np.where(np.repeat(np.array(preferred, dtype=bool), counts), 2, 1)
+
+    # Keep the first listing of each known shift, in the volunteers' preference order
+    keep = np.flatnonzero(shift_ids >= 0)
+    (_, first) = np.unique(entity_ids[keep] * max(len(shift_names), 1) + shift_ids[keep], return_index=True)
+    keep = keep[np.sort(first)]
+
+    # Build the points table
+    table = PreferencePoints()
+    table.Entities = list(Entities)
+    table.ShiftNames = shift_names
+    table.EntityIds = entity_ids[keep].astype(np.int32)
+    table.ShiftIds = shift_ids[keep].astype(np.int32)
+    table.Points = points[keep].astype(np.int32)
+    table.Indptr = np.searchsorted(table.EntityIds, np.arange(len(Entities) + 1)).astype(np.int64)
+
+    # Record the listings that were dropped, for the presolve report
+    table.UnknownListings = [(int(entity_ids[i]), listed[i]) for i in np.flatnonzero(shift_ids < 0).tolist()]
+    table.DuplicateListings = int(np.count_nonzero(shift_ids >= 0)) - len(keep)
+
+    return table
+
+
+def SelectPairs(Points, Mask):
+    # This function returns a PreferencePoints object holding only the selected pairs of another one
+    # Inputs:
+    #   Points = a PreferencePoints object
+    #   Mask = a boolean array with one entry per pair, True for the pairs to keep
+    table = PreferencePoints()
+    table.Entities = Points.Entities
+    table.ShiftNames = Points.ShiftNames
+    table.EntityIds = Points.EntityIds[Mask]
+    table.ShiftIds = Points.ShiftIds[Mask]
+    table.Points = Points.Points[Mask]
+    table.Indptr = np.searchsorted(table.EntityIds, np.arange(len(table.Entities) + 1)).astype(np.int64)
+    table.UnknownListings = Points.UnknownListings
+    table.DuplicateListings = Points.DuplicateListings
+
+    return table
+
+
+def PresolveAssignment(Points, Shifts):
+    # This function simplifies the assignment problem before the model is built, and records what it changed:
+    #   - listings of unknown shifts (misspellings, empty cells, shifts not run this week) and repeated listings are
+    #     dropped; CalculatePreferencePoints has already left them out of the pairs
+    #   - volunteers and groups left without a single shift they can work, and shifts nobody can work, get no
+    #     variables or constraints
+    #   - forced assignments are fixed. A shift is uncontested when all of its candidates fit into it. A volunteer
+    #     whose best option (by objective coefficient) is an uncontested shift can be moved there from any other
+    #     assignment without lowering the objective or displacing anyone, so some optimal schedule assigns them
+    #     there. Fixing them takes them out of the other shifts' candidates, so the pass repeats until nothing
+    #     changes. Only volunteers who work a single shift are fixed; the argument does not hold for the others.
+    # Inputs:
+    #   Points = the PreferencePoints of the volunteers followed by the groups
+    #   Shifts = a dictionary of shift objects, indexed by shift names
+    # Outputs:
+    #   presolve = a PresolveResult object
+
+    presolve = PresolveResult()
+    presolve.PairsBefore = len(Points)
+
+    # Report the dropped listings
+    for (e, s) in Points.UnknownListings:
+        presolve.UnknownShifts.setdefault(Points.Entities[e], []).append(s)
+    presolve.DuplicateListings = Points.DuplicateListings
+
+    # Report the volunteers and shifts without a possible assignment
+    listings = np.diff(Points.Indptr)
+    presolve.Unmatchable = [Points.Entities[e] for e in np.flatnonzero(listings == 0).tolist()]
+    candidates = np.bincount(Points.ShiftIds, minlength=len(Points.ShiftNames))
+    presolve.UnlistedShifts = [Points.ShiftNames[i] for i in np.flatnonzero(candidates == 0).tolist()]
+
+    # Find the number of people behind each pair, and each pair's objective coefficient
+    supply = np.array(
+        [v.Volunteers if isinstance(v, VolunteerGroup) else 1 for v in Points.Entities], dtype=np.int64)
+    pair_supply = supply[Points.EntityIds]
+    coefficients = CalcObjectiveCoefficients(Points, Shifts)
+    room = np.array([Shifts[s].required_volunteers for s in Points.ShiftNames], dtype=np.int64)
+
+    # Find each volunteer's best coefficient
+    best = np.full(len(Points.Entities), np.iinfo(np.int64).min)
+    np.maximum.at(best, Points.EntityIds, coefficients)
+    is_best = coefficients == best[Points.EntityIds]
+
+    # Only the groups and the volunteers who work a single shift can be fixed
+    single = np.array(
+        [isinstance(v, VolunteerGroup) or v.MaxShifts == 1 for v in Points.Entities], dtype=bool)
+    is_best &= single[Points.EntityIds]
+
+    # Fix the volunteers whose best option is uncontested, until no more can be fixed
+    free = np.ones(len(Points), dtype=bool)
+    fixed = np.zeros(len(Points), dtype=bool)
+    while True:
+        demand = np.bincount(Points.ShiftIds[free], weights=pair_supply[free], minlength=len(room))
+        uncontested = demand <= room
+        candidates = np.flatnonzero(free & is_best & uncontested[Points.ShiftIds])
+        if len(candidates) == 0:
+            break
+
+        # Take each volunteer's first qualifying pair
+        (_, first) = np.unique(Points.EntityIds[candidates], return_index=True)
+        chosen = candidates[first]
+        fixed[chosen] = True
+        np.subtract.at(room, Points.ShiftIds[chosen], pair_supply[chosen])
+
+        # The fixed volunteers' other pairs are no longer free
+        settled = np.zeros(len(Points.Entities), dtype=bool)
+        settled[Points.EntityIds[chosen]] = True
+        free &= ~settled[Points.EntityIds]
+
+    # Record the fixed assignments
+    for k in np.flatnonzero(fixed).tolist():
+        presolve.FixedCounts[(Points.Entities[Points.EntityIds[k]], Points.ShiftNames[Points.ShiftIds[k]])] = \
+            int(pair_supply[k])
+    presolve.FixedObjective = int(np.dot(coefficients[fixed], pair_supply[fixed]))
+    presolve.Room = dict(zip(Points.ShiftNames, room.tolist()))
+
+    # Keep the free pairs
+    presolve.Points = SelectPairs(Points, free)
+    presolve.PairsAfter = len(presolve.Points)
+
+    return presolve
+
+
+def ApplySolutionHints(model, Assignment, PriorAssignments):
+    # This function hints the solver with the assignments of an earlier solution
+    # Inputs:
+    #   model = the CP model object
+    #   Assignment = a SparseAssignment holding the decision variables
+    #   PriorAssignments = a dictionary mapping volunteer names to the shift names they were assigned to
+    # Outputs:
+    #   hinted = the number of decision variables hinted to a non-zero value
+
+    # Match names regardless of case and spacing; names that no longer appear on the roster are dropped
+    prior = {}
+    for (name, shifts) in PriorAssignments.items():
+        prior[NormalizeName(name)] = set(shifts)
+
+    # Hint every decision variable, so the hint describes a complete solution
+    hinted = 0
+    for ((v, s), x) in zip(Assignment.Keys(), Assignment.Variables):
+        if isinstance(v, VolunteerGroup):  # count the group's placeholder members who worked the shift
+            value = 0
+            for VolunteerIndex in range(v.Volunteers):
+                if s in prior.get(NormalizeName('%s Volunteer %d' % (v.GroupName, VolunteerIndex + 1)), ()):
+                    value += 1
+        else:
+            value = 1 if s in prior.get(NormalizeName(v.Name), ()) else 0
+
+        model.AddHint(x, value)
+        if value > 0:
+            hinted += 1
+
+    return hinted
+
+
+def NormalizeName(Name):
+    # This function puts a volunteer's name into a canonical form for matching
+    return ' '.join(str(Name).split()).lower()
+
+
+def GetObjectiveWeights():
+    # This function returns the weights of the various objectives
     weight = {
         'Maximize the shift coverage': 10,
         'Respect the volunteer preferences': 1,
     }
 
+    return weight
+
+
+def CalcObjectiveCoefficients(Points, Shifts, Weights=None):
+    # This function calculates the integer objective coefficients of all the decision variables
+    # Inputs:
+    #   Points = a PreferencePoints object listing the (volunteer or group, shift) pairs of the decision variables
+    #   Shifts = a dictionary of shift objects, indexed by shift names
+    #   Weights = a dictionary of integer objective weights, keyed like GetObjectiveWeights; defaults to those weights
+    # Outputs:
+    #   coefficients = an array of the integer objective coefficient of each pair
+
+    # Define the weights of the various objectives
+    weight = GetObjectiveWeights() if Weights is None else Weights
+
     # Calculate the scalar required to make everything integer
     scalar = CalcObjectiveScalar(
         Shifts)  # This is multiplied in because the CP solver insists on the data being integer.
 
-    # Define the objective
-    model.Maximize(
-
-        # Maximize the number of covered shifts
-        weight['Maximize the shift coverage'] *
-        sum(
-            int(scalar / Shifts[s].required_volunteers) *
-            sum(
-                assignment[(v, s)]
-                for v in IndividualVolunteers
-            )
-            for s in Shifts
-        )
-
-        +
-
-        # Maximize the number of realized shift preference points
-        weight['Respect the volunteer preferences'] *
-        scalar *
-        sum(
-            sum(
-                assignment[(v, s)] * v.ShiftPreferencePoints[s]
-                for v in IndividualVolunteers
-            )
-            for s in Shifts
-        )
-    )
+    # Find the common factor of every possible coefficient: it divides each shift's coverage term and the preference
+    # term's multiplier, whatever the volunteers' preference points. Dividing it out leaves the optimal assignments
+    # unchanged, and the coefficients of any subset of the variables match those of the full model.
+    coverage = [weight['Maximize the shift coverage'] * (scalar // Shifts[s].required_volunteers) for s in Shifts]
+    preference = weight['Respect the volunteer preferences'] * scalar
+    divisor = max(math.gcd(preference, *coverage), 1)
 
-    # Return the model
-    return (model, assignment)
+    # Check that the terms fit in 64-bit integers before doing the arithmetic on arrays
+    largest = (max(coverage, default=0) + preference * int(Points.Points.max(initial=0))) // divisor
+    if largest > MAX_OBJECTIVE_MAGNITUDE:
+        RaiseObjectiveOverflow(largest)
 
+    # Each assignment covers 1 / required_volunteers of its shift and realizes the volunteer's preference points
+    coverage = np.array([c // divisor for c in coverage], dtype=np.int64)
+    coefficients = coverage[Points.ShiftIds] + (preference // divisor) * Points.Points.astype(np.int64)
 
-def CalcObjectiveScalar(Shifts):
-    # Get the list of unique "Required Volunteer" numbers
-    unique_list = GetUniqueListElements(
-        [Shifts[s].required_volunteers for s in Shifts]
+    # Check that the objective fits in CP-SAT's integer range; a group's variable counts up to all of its members
+    upper_bounds = np.array(
+        [v.Volunteers if isinstance(v, VolunteerGroup) else 1 for v in Points.Entities], dtype=np.int64)
+    ValidateObjectiveCoefficients(coefficients, upper_bounds[Points.EntityIds])
+
+    return coefficients
+
+
+def ValidateObjectiveCoefficients(Coefficients, UpperBounds):
+    # This function checks that the objective value cannot overflow CP-SAT's integer range
+    # Inputs:
+    #   Coefficients = an array of integer objective coefficients
+    #   UpperBounds = an array of the largest value of each decision variable
+
+    # The decision variables are non-negative, so the objective is bounded by the sum of the absolute coefficients
+    # times the variables' upper bounds; sum in floating point so the check itself cannot overflow
+    magnitude = float(np.sum(np.abs(Coefficients).astype(np.float64) * UpperBounds))
+
+    if magnitude > MAX_OBJECTIVE_MAGNITUDE:
+        RaiseObjectiveOverflow(magnitude)
+
+
+def RaiseObjectiveOverflow(Magnitude):
+    # This function reports an objective that is too large for the solver
+    raise ValueError(
+        'The objective can reach %d, which exceeds the solver limit of %d. Reduce the objective weights or the '
+        'number of distinct shift sizes.' % (Magnitude, MAX_OBJECTIVE_MAGNITUDE)
     )
 
-    # Calculate the product of this list
-    p = ListProd(unique_list)
 
-    # Round the product to an integer
-    scalar = int(p)
+def CalcObjectiveScalar(Shifts):
+    # This function calculates the smallest integer that every shift's "Required Volunteers" number divides,
+    # i.e. the least common multiple of those numbers
+
+    # Every shift's coverage is divided by its size, so a shift must take at least one volunteer
+    empty = [s for s in Shifts if Shifts[s].required_volunteers < 1]
+    if empty:
+        raise ValueError('Every shift must require at least one volunteer, but %s require%s %s.' % (
+            ', '.join(empty), 's' if len(empty) == 1 else '',
+            ', '.join(str(Shifts[s].required_volunteers) for s in empty)))
+
+    # Get the set of unique "Required Volunteer" numbers
+    unique_sizes = set(Shifts[s].required_volunteers for s in Shifts)
+
+    # Calculate the least common multiple of these numbers
+    scalar = math.lcm(*unique_sizes)
 
     # Return the scalar
     return scalar
 
 
-def ListProd(List):
-    # Initialize the product
-    p = 1
+def ExtractSolution(solver, Assignment, Shifts, IndividualVolunteers, VolunteerGroups=()):
+    # This function reads the solved decision variables once and collects everything the reports and exports need
+    # Inputs:
+    #   solver = the solver object, which has already solved the model.
+    #   Assignment = a SparseAssignment holding the decision variables
+    #   Shifts = a dictionary of shift objects, indexed by shift names
+    #   IndividualVolunteers = a list of volunteer objects.
+    #   VolunteerGroups = a list of VolunteerGroup objects
+    # Outputs:
+    #   solution = a Solution object
+
+    # Read each decision variable exactly once; an assignment solved without a CP model has no variables, and the
+    # solver holds the value of each pair instead
+    if Assignment.Variables:
+        values = np.array([solver.Value(x) for x in Assignment.Variables], dtype=np.int64)
+    else:
+        values = solver.PairValues
+
+    # Keep the non-zero ones, along with the assignments fixed by the presolve
+    counts = dict(Assignment.FixedCounts)
+    for k in np.flatnonzero(values).tolist():
+        counts[(Assignment.Entities[Assignment.EntityIds[k]], Assignment.ShiftNames[Assignment.ShiftIds[k]])] = \
+            int(values[k])
 
-    # Loop over the elements of the list
-    for e in List:
-        p = p * e
+    # Build the solution
+    return BuildSolution(counts, Shifts, IndividualVolunteers, VolunteerGroups, solver.ObjectiveValue())
 
-    return p
 
+def BuildSolution(Counts, Shifts, IndividualVolunteers, VolunteerGroups=(), ObjectiveValue=0):
+    # This function builds a Solution object from the solved assignment counts
+    # Inputs:
+    #   Counts = a dictionary mapping (volunteer or group, shift name) tuples to the number of people assigned; zero
+    #            entries may be left out
+    #   Shifts = a dictionary of shift objects, indexed by shift names
+    #   IndividualVolunteers = a list of volunteer objects.
+    #   VolunteerGroups = a list of VolunteerGroup objects
+    #   ObjectiveValue = the objective value of the solution
+    # Outputs:
+    #   solution = a Solution object
 
-def GetUniqueListElements(List):
-    # Initialize the list of unique elements
-    unique_list = []
+    # Instantiate the solution
+    solution = Solution()
+    solution.Volunteers = list(IndividualVolunteers)
+    solution.ObjectiveValue = ObjectiveValue
+    solution.ShiftCount = len(Shifts)
+    solution.Counts = dict(Counts)
+
+    # Expand each group into named placeholder volunteers, listed after the individual volunteers
+    for g in VolunteerGroups:
+        solution.GroupMembers[g] = g.CreateMembers(len(solution.Volunteers))
+        solution.Volunteers.extend(solution.GroupMembers[g])
+
+    # Initialize the assignment lists
+    for s in Shifts:
+        solution.ShiftAssignments[s] = []
+
+    for v in solution.Volunteers:
+        solution.VolunteerAssignments[v] = []
+
+        # Count the number of preferred volunteers
+        if v.IsPreferredVolunteer == True:
+            solution.PreferredVolunteers += 1
+
+    # Collect the shifts of each volunteer and group
+    entity_shifts = {}
+    for ((v, s), count) in Counts.items():
+        if count > 0:
+            entity_shifts.setdefault(v, []).append((s, count))
+
+    # Fill in the assignments, in roster order
+    for v in list(IndividualVolunteers) + list(VolunteerGroups):
+        for (s, count) in entity_shifts.get(v, []):
+
+            # Find the volunteers behind this assignment
+            if isinstance(v, VolunteerGroup):  # the count is the number of group members assigned to the shift
+                assigned = solution.GroupMembers[v][:count]
+            else:
+                assigned = [v]
+
+            for m in assigned:
+                solution.ShiftAssignments[s].append(m)
+                solution.VolunteerAssignments[m].append(s)
+
+                # Check if this is a preferred volunteer
+                if m.IsPreferredVolunteer == True:
+                    solution.PreferredAssignmentsRealized += 1
+
+    # Count the volunteers assigned to at least one shift
+    for v in solution.Volunteers:
+        if solution.VolunteerAssignments[v]:
+            solution.VolunteersAssigned += 1
+            if v.IsPreferredVolunteer == True:
+                solution.PreferredVolunteersAssigned += 1
+
+    # Calculate the summary counts
+    for s in Shifts:
+        solution.AssignmentsRequired += Shifts[s].required_volunteers
+        solution.AssignmentsRealized += len(solution.ShiftAssignments[s])
+
+        # Check if this shift is under-staffed
+        if len(solution.ShiftAssignments[s]) < Shifts[s].required_volunteers:
+            solution.UnderStaffedShifts += 1
+
+    # Return the solution
+    return solution
+
+
+def ConfigureSolver(solver, Config):
+    # This function applies the solver settings to a CP solver
+    # Inputs:
+    #   solver = a cp_model.CpSolver object
+    #   Config = a SolverConfig object
 
-    # Loop over the list
-    for e in List:
+    if Config.MaxTimeInSeconds is not None:
+        solver.parameters.max_time_in_seconds = Config.MaxTimeInSeconds
 
-        # Check if it's in the Unique list
-        if not e in unique_list:  # it's not there
+    if Config.NumSearchWorkers is not None:
+        solver.parameters.num_workers = Config.NumSearchWorkers
 
-            # Add it
-            unique_list.append(e)
+    if Config.RandomSeed is not None:
+        solver.parameters.random_seed = Config.RandomSeed
 
-    # Return the unique list
-    return unique_list
\ No newline at end of file
+    if Config.RelativeGapLimit is not None:
+        solver.parameters.relative_gap_limit = Config.RelativeGapLimit
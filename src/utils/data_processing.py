@@ -1,51 +1,150 @@
-import pandas as pd
+import csv
+import re
 from utils.y2y_classes import *
 
-def ReadInIndividualVolunteerData():
-    # This function reads the preferences into a data frame
+# The cell texts pandas.read_csv treats as missing, which the csv loaders below treat as empty cells so that a roster
+# reads the same as it did with pandas
+MISSING_VALUES = {
+    '', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN', '<NA>', 'N/A', 'NA',
+    'NULL', 'NaN', 'None', 'n/a', 'nan', 'null',
+}
 
-    # Specify the name of the csv file
-    csv_name = '../data/Updated Preferences.csv'
 
-    # Read in the data
-    data = pd.read_csv(csv_name)
+def ReadInCsvRows(csv_name):
+    # This function reads a csv file with the standard library, which loads far faster than pandas on small files
+    # Inputs:
+    #   csv_name = the path of the csv file
+    # Outputs:
+    #   (header, rows) = the list of column names and a list of rows, each a list of cell texts as long as the header
+    #                    with the missing cells set to None
 
-    # Instantiate the list of volunteers
-    volunteers = []
+    with open(csv_name, newline='', encoding='utf-8-sig') as f:
+        reader = csv.reader(f)
+        header = next(reader, [])
 
-    # Loop over the rows of data
-    for (_, row) in data.iterrows():
-        # Instantiate a new volunteer
-        v = Volunteer()
+        rows = []
+        for line in reader:
+            # Skip the blank lines
+            if not line:
+                continue
 
-        # Assign an ID Number to the volunteer
-        v.ID_Number = len(volunteers)
+            # Pad the short lines out to the header
+            line = line[:len(header)] + [''] * (len(header) - len(line))
+            rows.append([None if cell in MISSING_VALUES else cell for cell in line])
 
-        # Read in most of the volunteer's properties
-        v.Name = row['Name']
-        v.IsPreferredVolunteer = row['Preferred Applicants']
+    return (header, rows)
 
-        columns = data.columns
 
-        shift_pref = []
+def ParseNumber(text, description):
+    # This function reads a number out of a csv cell
+    # Inputs:
+    #   text = the cell text, or None for an empty cell
+    #   description = what the cell holds, used in the error message
+    # Outputs:
+    #   number = the cell's value as a float
+
+    if text is None:
+        raise ValueError('%s is blank.' % description)
+    try:
+        number = float(text)
+    except ValueError:
+        raise ValueError('%s must be a number, not %r.' % (description, text))
+    if number != number or number in (float('inf'), float('-inf')):
+        raise ValueError('%s must be a finite number, not %r.' % (description, text))
+    return number
+
+
+def ReadInPreferenceTable(csv_name='../data/Updated Preferences.csv'):
+    # This function reads the wide preference sheet (one row per volunteer, one column per shift, cells such as
+    # "2nd choice") into a compact PreferenceTable
+    # Inputs:
+    #   csv_name = the path of the preference csv file
+    # Outputs:
+    #   table = a PreferenceTable object
+
+    # Read in the data as text
+    (header, rows) = ReadInCsvRows(csv_name)
+
+    # Every column other than the name, the preferred applicant flag and the shift limit is a shift
+    shift_columns = [i for (i, c) in enumerate(header) if c not in ('Name', 'Preferred Applicants', 'Max Shifts')]
+
+    # Parse the numeric rank out of each distinct cell text, e.g. "10th choice" --> 10
+    label_ranks = {}
+    for row in rows:
+        for i in shift_columns:
+            if row[i] is not None and row[i] not in label_ranks:
+                match = re.search(r'\d+', row[i])
+                label_ranks[row[i]] = int(match.group()) if match else None
+
+    # Cells without a number still count as a preference, ranked after all the numbered ones
+    unranked = max([r for r in label_ranks.values() if r is not None], default=0) + 1
+    for (label, rank) in label_ranks.items():
+        if rank is None:
+            label_ranks[label] = unranked
+
+    # Build the table; empty cells get the rank 0
+    table = PreferenceTable()
+    table.ShiftNames = [header[i] for i in shift_columns]
+    for row in rows:
+        table.Ranks.append([0 if row[i] is None else label_ranks[row[i]] for i in shift_columns])
+
+    # Read in the names, writing the missing ones as pandas did
+    name_column = header.index('Name')
+    table.Names = ['nan' if row[name_column] is None else row[name_column] for row in rows]
+
+    # Read in the preferred applicant flags
+    if 'Preferred Applicants' in header:
+        flag_column = header.index('Preferred Applicants')
+        table.IsPreferred = [(row[flag_column] or '').strip().upper() in ('TRUE', '1', '1.0', 'YES') for row in rows]
+    else:
+        table.IsPreferred = [False] * len(rows)
+
+    # Read in the most shifts each volunteer works in a week; a missing limit means one shift
+    if 'Max Shifts' in header:
+        limit_column = header.index('Max Shifts')
+        table.MaxShifts = []
+        for (name, row) in zip(table.Names, rows):
+            if row[limit_column] is None:
+                table.MaxShifts.append(1)
+                continue
+            limit = ParseNumber(row[limit_column], 'The Max Shifts of %s' % name)
+            if limit != int(limit) or limit < 1:
+                raise ValueError('The Max Shifts of %s must be a whole number of at least 1, not %r.' % (
+                    name, row[limit_column]))
+            table.MaxShifts.append(int(limit))
+    else:
+        table.MaxShifts = [1] * len(rows)
+
+    # Return the table
+    return table
+
+
+def ReadInIndividualVolunteerData(csv_name='../data/Updated Preferences.csv'):
+    # This function reads the preferences into a list of volunteer objects
+    # Inputs:
+    #   csv_name = the path of the preference csv file
+    # Outputs:
+    #   volunteers = a list of volunteer objects, with their preferred shifts in rank order
 
-        # list of all preferences
-        for i in columns:
-            shift_pref.append(str(row[i]))
+    # Read in the preference table
+    table = ReadInPreferenceTable(csv_name)
 
-        shift_pref.remove(shift_pref[0]) # remove the name of the person
+    # Instantiate the list of volunteers
+    volunteers = []
+    for (i, ranks) in enumerate(table.Ranks):
+        # Instantiate a new volunteer
+        v = Volunteer()
 
-        shift_pref = [x for x in shift_pref if x != 'nan']
+        # Assign an ID Number to the volunteer
+        v.ID_Number = i
 
-        shift_pref.sort()
+        # Read in the volunteer's properties
+        v.Name = table.Names[i]
+        v.IsPreferredVolunteer = table.IsPreferred[i]
+        v.MaxShifts = table.MaxShifts[i]
 
-        # until all preferences are found
-        while len(shift_pref) != 0:
-            for c in columns:  # go through all items in the row
-                if row[c] == shift_pref[0]:  # check to see if it is the next preference
-                    v.PreferredShifts.append(c)  # add to the list
-                    shift_pref.remove(shift_pref[0])  # remove that preference
-                    break
+        # Order the listed shifts by rank, then by column
+        v.PreferredShifts = [table.ShiftNames[j] for (_, j) in sorted((r, j) for (j, r) in enumerate(ranks) if r > 0)]
 
         volunteers.append(v)
 
@@ -53,28 +152,26 @@ def ReadInIndividualVolunteerData():
     return volunteers
 
 
-def ReadInGroupVolunteerData():
-    # This function reads the preferences into a data frame
-
-    # Specify the name of the csv file
-    csv_name = '../data/Group Volunteers.csv'
+def ReadInGroupVolunteerData(csv_name='../data/Group Volunteers.csv'):
+    # This function reads the group volunteers into a list of VolunteerGroup objects
 
     # Read in the data
-    data = pd.read_csv(csv_name)
+    (header, rows) = ReadInCsvRows(csv_name)
+    columns = dict((c, i) for (i, c) in enumerate(header))
 
     # Instantiate the list of volunteer groups
     volunteer_groups = []
 
     # Loop over the rows of data
-    for (_, row) in data.iterrows():
+    for row in rows:
         # Instantiate a new volunteer group
         v = VolunteerGroup()
 
         # Populate the volunteer's properties
         v.ID_Number = len(volunteer_groups) + 1
-        v.GroupName = row['Group']
-        v.AssignedShift = row['Shift']
-        v.Volunteers = row['Volunteers']
+        v.GroupName = row[columns['Group']]
+        v.AssignedShift = row[columns['Shift']]
+        v.Volunteers = int(float(row[columns['Volunteers']]))
 
         # Add this volunteer group to the growing list
         volunteer_groups.append(v)
@@ -83,47 +180,111 @@ def ReadInGroupVolunteerData():
     return volunteer_groups
 
 
-def DisaggregateVolunteerGroups(GroupVolunteers, IndividualVolunteers, shifts):
+def ReadInPriorSchedule(csv_name='../exported_files/Volunteer-Focused Schedule.csv'):
+    # This function reads a previously exported volunteer-focused schedule
+    # Inputs:
+    #   csv_name = the path of the volunteer-focused schedule csv file
+    # Outputs:
+    #   assignments = a dictionary mapping each volunteer's name to the list of shift names they were assigned to
+
+    return dict(ReadInScheduleRows(csv_name))
+
+
+def ReadInScheduleRows(csv_name='../exported_files/Volunteer-Focused Schedule.csv'):
+    # This function reads a volunteer-focused schedule line by line, keeping the volunteers who share a name apart
+    # Inputs:
+    #   csv_name = the path of the volunteer-focused schedule csv file
+    # Outputs:
+    #   rows = a list of (volunteer name, list of shift names) tuples, in file order
+
+    # Instantiate the list of assignments
+    rows = []
+
+    with open(csv_name, newline='') as f:
+        reader = csv.reader(f)
+
+        # Skip the header line
+        next(reader, None)
+
+        # Read the line for each volunteer
+        for line in reader:
+            if not line:
+                continue
+
+            # Hand-edited files may have spaces around the shift names
+            shifts = [s.strip() for s in line[1:]]
+            rows.append((line[0], [s for s in shifts if s and s != 'Unassigned']))
+
+    # Return the list of assignments
+    return rows
+
+
+def CapVolunteerGroups(GroupVolunteers, shifts):
     # Inputs:
     #   GroupVolunteers = a list of VolunteerGroup objects
-    #   IndividualVolunteers = a list of individual volunteer objects
+    #   shifts = a dictionary of shift objects, indexed by shift names
     # Outputs:
-    #   Creates a number of individual volunteers for each VolunteerGroup and adds these individuals to the list of individual volunteers
+    #   Caps the number of volunteers in each group at the number required by the group's shift. The groups are
+    #   modeled as a single "members assigned" count each, and only expanded back into named placeholder
+    #   volunteers when the solution is extracted.
 
     # Loop over the volunteer groups
     for g in GroupVolunteers:
 
-        # Cap the number of volunteers in this group at the number required by their preferred shift
-        g.Volunteers = min(g.Volunteers, shifts[g.AssignedShift].required_volunteers)
+        # Cap the number of volunteers in this group at the number required by their preferred shift; a group whose
+        # shift does not exist is left for the presolve to report
+        if g.AssignedShift in shifts:
+            g.Volunteers = min(int(g.Volunteers), shifts[g.AssignedShift].required_volunteers)
+
+
+def ReadInShiftPeriods(csv_name='../data/Shift Periods.csv'):
+    # This function reads the daily periods, each run on every day of the week
+    # Inputs:
+    #   csv_name = the path of the period csv file, with the columns Period, Required Volunteers, Start Hour (the
+    #              hour of the day the period starts) and Hours
+    # Outputs:
+    #   periods = a list of Period objects, in file order
 
-        # Create an individual volunteer object for each volunteer in this group
-        for VolunteerIndex in range(g.Volunteers):
+    # Read in the data
+    (header, rows) = ReadInCsvRows(csv_name)
+    columns = dict((c, i) for (i, c) in enumerate(header))
 
-            # Instantiate a new individual volunteer
-            v = Volunteer()
+    missing = [c for c in ('Period', 'Required Volunteers', 'Start Hour', 'Hours') if c not in columns]
+    if missing:
+        raise ValueError('The period file %s has no %s column.' % (csv_name, ', '.join(missing)))
 
-            # Assign an ID Number to the volunteer
-            v.ID_Number = len(IndividualVolunteers)
+    # Create the list of periods, checking each row so that a bad one is reported by name
+    periods = []
+    for (line, row) in enumerate(rows, start=2):
+        name = row[columns['Period']]
+        if name is None:
+            raise ValueError('The period on line %d of %s has no name.' % (line, csv_name))
 
-            # Create a placeholder for the name of the volunteer
-            v.Name = str(g.GroupName + ' Volunteer %d' % (VolunteerIndex + 1))
+        required = ParseNumber(row[columns['Required Volunteers']], 'The Required Volunteers of the %s period' % name)
+        if required != int(required) or required < 1:
+            raise ValueError('The %s period must require a whole number of at least 1 volunteer, not %r.' % (
+                name, row[columns['Required Volunteers']]))
 
-            # Specify them as a preferred volunteer
-            v.IsPreferredVolunteer = True
+        start_hour = ParseNumber(row[columns['Start Hour']], 'The Start Hour of the %s period' % name)
+        if not 0 <= start_hour < 24:
+            raise ValueError('The %s period must start between hour 0 and hour 23, not at hour %r.' % (
+                name, row[columns['Start Hour']]))
 
-            # Specify their first preference for a shift as the group's preference
-            v.PreferredShifts = [g.AssignedShift]
+        hours = ParseNumber(row[columns['Hours']], 'The Hours of the %s period' % name)
+        if hours <= 0:
+            raise ValueError('The %s period must last a positive number of hours, not %r.' % (
+                name, row[columns['Hours']]))
 
-            # Specify their other preferences as empty
-            for _ in range(4):
-                v.PreferredShifts.append('')
+        periods.append(Period(Name=name, RequiredVolunteers=int(required), StartHour=start_hour, Hours=hours))
 
-            # Add this individual to the list of volunteers
-            IndividualVolunteers.append(v)
+    # Return the list of periods
+    return periods
 
 
-def BuildShiftDictionary():
+def BuildShiftDictionary(PeriodsFile='../data/Shift Periods.csv'):
     # This function builds a dictionary of shift objects, where the dictionary keys are the shift names
+    # Inputs:
+    #   PeriodsFile = the path of the csv file defining the daily periods (see ReadInShiftPeriods)
 
     # Specify the days of the week
     weekdays = [
@@ -136,17 +297,12 @@ def BuildShiftDictionary():
         'Saturday'
     ]
 
-    # Create the list of periods
-    periods = [
-        Period(Name='Breakfast', RequiredVolunteers=3),
-        Period(Name='Dinner', RequiredVolunteers=3),
-        Period(Name='Evening', RequiredVolunteers=3),
-        Period(Name='Overnight', RequiredVolunteers=1),
-    ]
+    # Read in the list of periods
+    periods = ReadInShiftPeriods(PeriodsFile)
 
     # Initialize the dictionary of shifts
     shifts = {}
-    for w in weekdays:
+    for (DayIndex, w) in enumerate(weekdays):
         for p in periods:
             # Construct the shift name corresponding to this weekday and period
             ShiftName = '%s %s' % (w, p.Name)
@@ -157,9 +313,11 @@ def BuildShiftDictionary():
             # Add the shift's properties
             s.shift_name = ShiftName
             s.required_volunteers = p.RequiredVolunteers
+            s.start_hour = DayIndex * 24 + p.StartHour
+            s.duration_hours = p.Hours
 
             # Add the shift to the growing dictionary of shifts
             shifts[ShiftName] = s
 
     # Return the list of shifts
-    return shifts
\ No newline at end of file
+    return shifts
@@ -1,237 +1,438 @@
-def PrintShiftAssignments(solver, assignment, shifts, individual_volunteers):
+def PrintShiftAssignments(solution):
     # This function prints out a shift-centric view of the shift assignments
     # Inputs:
-    #   solver = the CP solver object, which has already solved the model.
-    #   Assignment = a dictionary mapping (volunteer, shift) tuples to binary assignment decision variables
-    #   Shifts = a dictionary of Shift objects
+    #   solution = the Solution object returned by ExtractSolution
 
     # Loop over the shifts
-    for s in shifts:
+    for s in solution.ShiftAssignments:
 
         # Print the name of the shift
         print(s)
 
-        for v in individual_volunteers:
+        for v in solution.ShiftAssignments[s]:
+            # Print the volunteer's first and last name
+            print('\t' + v.Name)
+
 
-            if solver.Value(assignment[(v, s)]) == 1:
-                # Print the volunteer's first and last name
-                print('\t' + v.Name)
+def FormatPercentage(Numerator, Denominator):
+    # This function formats a fraction as a percentage, or as 'n/a' when there is nothing to divide by
+    return '%1.1f%%' % (Numerator / Denominator * 100) if Denominator > 0 else 'n/a'
 
 
-def PrintSummaryStatistics(solver, assignment, shifts, individual_volunteers):
+def PrintSummaryStatistics(solution):
     # This function prints out several statistics summarizing the quality of the shift assignment found by the optimizer
     # Inputs:
-    #   solver = the CP solver object, which has already solved the model.
-    #   Assignment = a dictionary mapping (volunteer, shift) tuples to binary assignment decision variables
-    #   Shifts = a dictionary of Shift objects
+    #   solution = the Solution object returned by ExtractSolution
 
-    # Calculate the fraction of the staffing requirements that have been fulfilled
-    # Initialize the count of desired assignments
-    assignments_required = 0
+    # Print the fraction of required assignments that were realized
+    print('\nStaffing requirements covered: %s.' % FormatPercentage(solution.AssignmentsRealized,
+                                                                     solution.AssignmentsRequired))
 
-    # Initialize the count of assignments realized
-    assignments_realized = 0
+    # Print the fraction of fully staffed shifts
+    print('Shifts fully covered: %s.' % FormatPercentage(solution.ShiftCount - solution.UnderStaffedShifts,
+                                                         solution.ShiftCount))
 
-    # Initialize the count of preferred assignments realized
-    preferred_assignments_realized = 0
+    # Print the fraction of volunteers assigned; a volunteer may work several shifts, so count the volunteers rather
+    # than the assignments
+    print('Volunteers assigned to a shift: %s.' % FormatPercentage(solution.VolunteersAssigned,
+                                                                   len(solution.Volunteers)))
 
-    # Count the number of preferred volunteers
-    preferred_volunteers = 0
-    for v in individual_volunteers:
+    # Print the fraction of preferred volunteers assigned; a roster may have none
+    print('Preferred volunteers assigned to a shift: %s.' % FormatPercentage(solution.PreferredVolunteersAssigned,
+                                                                             solution.PreferredVolunteers))
 
-        # Check if this is a preferred volunteer
-        if v.IsPreferredVolunteer == True:
-            # Increment the count of preferred volunteers
-            preferred_volunteers += 1
 
-    # Initialize the count of under-staffed shifts
-    under_staffed_shifts = 0
+def PrintValidationReport(report, MaxViolations=20):
+    # This function prints out the constraint violations and the quality scores of a schedule
+    # Inputs:
+    #   report = the ValidationReport returned by ValidateSchedule
+    #   MaxViolations = the most violations to list; the rest are only counted
+
+    if report.IsValid():
+        print('The schedule satisfies every constraint.')
+    else:
+        # Count the violations of each constraint
+        counts = {}
+        for (constraint, _) in report.Violations:
+            counts[constraint] = counts.get(constraint, 0) + 1
+
+        print('The schedule violates %d constraint(s): %s.' % (len(report.Violations), ', '.join(
+            '%s (%d)' % (constraint, count) for (constraint, count) in counts.items())))
+        for (constraint, description) in report.Violations[:MaxViolations]:
+            print('\t%s: %s' % (constraint, description))
+        if len(report.Violations) > MaxViolations:
+            print('\t... and %d more.' % (len(report.Violations) - MaxViolations))
+
+    # Print the scores
+    print('\nStaffing requirements covered: %s.' % FormatPercentage(report.AssignmentsRealized,
+                                                                     report.AssignmentsRequired))
+    print('Shifts fully covered: %s.' % FormatPercentage(report.ShiftCount - report.UnderStaffedShifts,
+                                                         report.ShiftCount))
+    print('Volunteers assigned to a shift: %s.' % FormatPercentage(report.VolunteersAssigned, report.Volunteers))
+    print('Preferred volunteers assigned to a shift: %s.' % FormatPercentage(report.PreferredVolunteersAssigned,
+                                                                             report.PreferredVolunteers))
+    print('Preference points: %d.' % report.PreferencePoints)
+    print('Objective value: %d.' % report.ObjectiveValue)
+
+
+def PrintPresolveReport(presolve):
+    # This function prints out what the presolve pass removed from or fixed in the model
+    # Inputs:
+    #   presolve = the PresolveResult returned by PresolveAssignment
 
-    # Loop over the shifts
-    for s in shifts:
+    print('\nPresolve: %d of %d volunteer-shift pairs left to solve.' % (presolve.PairsAfter, presolve.PairsBefore))
 
-        # Increment the staffing requirements
-        assignments_required += shifts[s].required_volunteers
+    # Print the listings of shifts that do not exist
+    for (v, names) in presolve.UnknownShifts.items():
+        print('\tIgnored unknown shifts listed by %s: %s' % (
+            getattr(v, 'GroupName', None) or v.Name, ', '.join(repr(s) for s in names)))
 
-        # Initialize the count of volunteers assigned to this shift
-        assignments_for_shift = 0
+    if presolve.DuplicateListings > 0:
+        print('\tIgnored %d repeated listings of a shift.' % presolve.DuplicateListings)
 
-        # Loop over each of the volunteers
-        for v in individual_volunteers:
+    # Print the volunteers and shifts that cannot be matched
+    for v in presolve.Unmatchable:
+        print('\tNo shift can be assigned to %s.' % (getattr(v, 'GroupName', None) or v.Name))
 
-            # Check if they were assigned to the current shift
-            if solver.Value(assignment[(v, s)]) == 1:  # They were assigned to the current shfit
+    if presolve.UnlistedShifts:
+        print('\tNobody can work: %s.' % ', '.join(presolve.UnlistedShifts))
 
-                # Increment the count of assignments realized
-                assignments_realized += 1
+    # Print the forced assignments
+    print('\tFixed %d forced assignments.' % len(presolve.FixedCounts))
 
-                # Increment the count of assignments for this particular shift
-                assignments_for_shift += 1
 
-                # Check if this is a preferred volunteer
-                if v.IsPreferredVolunteer == True:
-                    # Increment the count of preferred assignments realized
-                    preferred_assignments_realized += 1
+# The columns of the long-form assignment table, and the file name of each format it can be exported in
+ASSIGNMENT_COLUMNS = ['Volunteer ID', 'Volunteer', 'Shift', 'Rank', 'Points']
+ASSIGNMENT_FORMATS = {'jsonl': 'Assignments.jsonl', 'parquet': 'Assignments.parquet', 'arrow': 'Assignments.arrow'}
 
-        # Check if this shift is under-staffed
-        if assignments_for_shift < shifts[s].required_volunteers:  # this shift is under-staffed
 
-            # Increment the count of under-staffed shifts
-            under_staffed_shifts += 1
+def BuildAssignmentTable(solution):
+    # This function builds the long-form table of a schedule: one row per (volunteer, shift) assignment, in roster
+    # order, with the shift's rank in the volunteer's preference list and the preference points it is worth (see
+    # CalculatePreferencePoints). A volunteer without a shift gets a single row whose shift and rank are None, and a
+    # shift the volunteer does not list, e.g. one assigned by hand, a rank of None and no points. Names need not be
+    # unique, so each row also carries the volunteer's ID number.
+    # Inputs:
+    #   solution = the Solution object returned by ExtractSolution
+    # Outputs:
+    #   table = a dictionary mapping each column name to the list of the column's values
+
+    # Group members are scored as if the group's shift were their first choice in a list of
+    # VolunteerGroup.PreferenceListLength shifts
+    members = {}
+    for (g, group_members) in solution.GroupMembers.items():
+        for m in group_members:
+            members[m] = g
+
+    table = dict((column, []) for column in ASSIGNMENT_COLUMNS)
+    for v in solution.Volunteers:
+        shifts = solution.VolunteerAssignments[v]
+
+        # Add the row of a volunteer without a shift
+        if not shifts:
+            table['Volunteer ID'].append(v.ID_Number)
+            table['Volunteer'].append(v.Name)
+            table['Shift'].append(None)
+            table['Rank'].append(None)
+            table['Points'].append(0)
+            continue
+
+        # Rank each shift by its first listing
+        if v in members:
+            (length, ranks) = (members[v].PreferenceListLength, dict((s, 1) for s in shifts))
+        else:
+            length = len(v.PreferredShifts)
+            ranks = dict((s, length - i) for (i, s) in enumerate(reversed(v.PreferredShifts)))
 
-    # Calculate the fraction of required assignments that were realized
-    fraction_of_requirements_realized = assignments_realized / assignments_required
+        for s in shifts:
+            rank = ranks.get(s)
+            table['Volunteer ID'].append(v.ID_Number)
+            table['Volunteer'].append(v.Name)
+            table['Shift'].append(s)
+            table['Rank'].append(rank)
+            table['Points'].append(0 if rank is None else
+                                   (length - rank + 1) * (2 if v.IsPreferredVolunteer == True else 1))
 
-    # Calculate the fraction of under-staffed shifts
-    fraction_of_under_staffed_shifts = under_staffed_shifts / len(shifts)
+    return table
 
-    # Calculate the fraction of volunteers assigned
-    fraction_of_volunteers_assigned = assignments_realized / len(individual_volunteers)
 
-    # Calculate the fraction of preferred volunteers assigned
-    fraction_of_preferred_volunteers_assigned = preferred_assignments_realized / preferred_volunteers
+def BuildScheduleViews(Table, Shifts=None):
+    # This function lays out the rows of the volunteer-centric and shift-centric schedules in one pass over the
+    # assignment table
+    # Inputs:
+    #   Table = the assignment table returned by BuildAssignmentTable
+    #   Shifts = a dictionary of Shift objects; when None, only the volunteer-centric rows are laid out
+    # Outputs:
+    #   (volunteer_rows, shift_rows) = the lists of csv rows of each schedule, header lines included; shift_rows is
+    #                                  None when Shifts is None
 
-    # Print the results
-    print('\nStaffing requirements covered: %1.1f%%.' % (fraction_of_requirements_realized * 100))
+    # Collect the shifts of each volunteer and the volunteers of each shift, keeping the roster order. A volunteer's
+    # rows are consecutive, so a new volunteer starts wherever the volunteer changes.
+    volunteer_rows = [['Volunteer', 'Assignment']]
+    shift_volunteers = dict((s, []) for s in Shifts) if Shifts is not None else None
+    previous = None
+    for (ID_Number, name, s) in zip(Table['Volunteer ID'], Table['Volunteer'], Table['Shift']):
+        if (ID_Number, name) != previous:
+            volunteer_rows.append([name])
+            previous = (ID_Number, name)
 
-    print('Shifts fully covered: %1.1f%%.' % ((1 - fraction_of_under_staffed_shifts) * 100))
+        if s is None:  # no assignment was found
+            volunteer_rows[-1].append('Unassigned')
+            continue
 
-    print('Volunteers assigned to a shift: %1.1f%%.' % (fraction_of_volunteers_assigned * 100))
+        volunteer_rows[-1].append(s)
+        if shift_volunteers is not None:
+            shift_volunteers[s].append(name)
 
-    print('Preferred volunteers assigned to a shift: %1.1f%%.' % (fraction_of_preferred_volunteers_assigned * 100))
+    if Shifts is None:
+        return (volunteer_rows, None)
 
+    # Add a column for each volunteer the largest shift requires, and one for notes
+    max_volunteers_per_shift = max([s.required_volunteers for s in Shifts.values()])
+    shift_rows = [['Shift'] + ['Volunteer %d' % v for v in range(1, max_volunteers_per_shift + 1)] + ['Notes']]
 
-def ExportVolunteerFocusedSchedule(solver, Assignment, Shifts, IndividualVolunteers):
-    # This function exports a shift-centric CSV of the shift assignments
+    for (s, names) in shift_volunteers.items():
+        line = [s] + names
+
+        # Pad an under-staffed shift out to the notes column and add the warning
+        if len(names) < Shifts[s].required_volunteers:
+            line += [' '] * (max_volunteers_per_shift - len(names))
+            line.append('Warning: this shift is under-staffed.')
+
+        shift_rows.append(line)
+
+    return (volunteer_rows, shift_rows)
+
+
+def WriteCsvRows(file_name, Header, Rows):
+    # This function writes a header line and a list of rows to a csv file, buffering the whole file in memory and
+    # writing it at once
     # Inputs:
-    #   solver = the CP solver object, which has already solved the model.
-    #   Assignment = a dictionary mapping (volunteer, shift) tuples to binary assignment decision variables
-    #   Shifts = a dictionary of Shift objects
+    #   file_name = the path of the file to write
+    #   Header = the list of column names
+    #   Rows = a list of rows, each a list of values
 
     # Import the necessary libraries
     import csv
+    import io
     import sys
 
-    # Specify the name of the file to be exported
-    file_name = '../exported_files/Volunteer-Focused Schedule.csv'
+    buffer = io.StringIO()
 
-    # Create the file
-    with open(file_name, mode='w') as f:
+    # Instantiate the csv writer
+    if 'win' in sys.platform:  # Check for windows
+        writer = csv.writer(buffer, delimiter=',', lineterminator='\n')
+    else:
+        writer = csv.writer(buffer, delimiter=',')
 
-        # Instantiate the csv writer
-        if 'win' in sys.platform:  # Check for windows
-            writer = csv.writer(f, delimiter=',', lineterminator='\n')
-        else:
-            writer = csv.writer(f, delimiter=',')
+    writer.writerow(Header)
+    writer.writerows(Rows)
 
-        # Add the header line
-        # Initialize the header line
-        header_line = ['Volunteer', 'Assignment']
+    with open(file_name, mode='w') as f:
+        f.write(buffer.getvalue())
 
-        # Write the header line to the csv
-        writer.writerow(header_line)
 
-        # Add the line for each volunteer
-        for v in IndividualVolunteers:
+def ExportVolunteerFocusedSchedule(Table, OutputDirectory='../exported_files'):
+    # This function exports a volunteer-centric CSV of the shift assignments
+    # Inputs:
+    #   Table = the assignment table returned by BuildAssignmentTable
+    #   OutputDirectory = the directory to write the file to
 
-            # Initialize the line with the volunteer's first and last name
-            line = ['%s' % (v.Name)]
+    # Import the necessary libraries
+    import os
 
-            # Initialize the flag indicating whether an assignment has been found
-            assignment_found = False
+    (volunteer_rows, _) = BuildScheduleViews(Table)
+    WriteCsvRows(os.path.join(OutputDirectory, 'Volunteer-Focused Schedule.csv'), volunteer_rows[0], volunteer_rows[1:])
 
-            # Loop over each shift
-            for s in Shifts:
 
-                # Check if the volunteer was assigned to the current shift
-                if solver.Value(Assignment[(v, s)]) == 1:  # They were assigned to the current shift
+def ExportShiftFocusedSchedule(Table, Shifts, OutputDirectory='../exported_files'):
+    # This function exports a shift-centric CSV of the shift assignments
+    # Inputs:
+    #   Table = the assignment table returned by BuildAssignmentTable
+    #   Shifts = a dictionary of Shift objects
+    #   OutputDirectory = the directory to write the file to
 
-                    # Print the shift's name
-                    line.append('%s' % s)
+    # Import the necessary libraries
+    import os
 
-                    # Raise the flag indicating that an assignment has been found
-                    assignment_found = True
+    (_, shift_rows) = BuildScheduleViews(Table, Shifts)
+    WriteCsvRows(os.path.join(OutputDirectory, 'Shift-Focused Schedule.csv'), shift_rows[0], shift_rows[1:])
 
-            # Check if an assignment was found
-            if not assignment_found:
-                # Print a message indicating that no assignment was found
-                line.append('Unassigned')
 
-            # Write out the line for the current volunteer
-            writer.writerow(line)
+def ExportAssignmentTable(Table, Format, OutputDirectory='../exported_files'):
+    # This function exports the long-form assignment table as JSON lines, Parquet or an Arrow IPC file. The Parquet
+    # and Arrow formats need pyarrow, which is only imported when one of them is asked for.
+    # Inputs:
+    #   Table = the assignment table returned by BuildAssignmentTable
+    #   Format = 'jsonl', 'parquet' or 'arrow'
+    #   OutputDirectory = the directory to write the file to
 
+    # Import the necessary libraries
+    import json
+    import os
 
-def ExportShiftFocusedSchedule(solver, Assignment, Shifts, IndividualVolunteers):
-    # This function exports a shift-centric CSV of the shift assignments
+    # Specify the name of the file to be exported
+    file_name = os.path.join(OutputDirectory, ASSIGNMENT_FORMATS[Format])
+
+    # Write one JSON object per row
+    if Format == 'jsonl':
+        with open(file_name, mode='w') as f:
+            f.write(''.join(json.dumps(dict(zip(ASSIGNMENT_COLUMNS, row))) + '\n'
+                            for row in zip(*[Table[column] for column in ASSIGNMENT_COLUMNS])))
+        return
+
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as error:
+        raise ImportError('Exporting %s files requires pyarrow (pip install pyarrow).' % Format) from error
+
+    # Build the columnar table; the rank of a volunteer without a shift is null
+    schema = pyarrow.schema([('Volunteer ID', pyarrow.int64()), ('Volunteer', pyarrow.string()),
+                             ('Shift', pyarrow.string()), ('Rank', pyarrow.int32()), ('Points', pyarrow.int32())])
+    arrow_table = pyarrow.Table.from_pydict(Table, schema=schema)
+
+    if Format == 'parquet':
+        pyarrow.parquet.write_table(arrow_table, file_name)
+    else:
+        with pyarrow.OSFile(file_name, 'wb') as sink:
+            with pyarrow.ipc.new_file(sink, schema) as writer:
+                writer.write_table(arrow_table)
+
+
+def ExportSchedules(solution, Shifts, OutputDirectory='../exported_files', Formats=()):
+    # This function exports a schedule: it builds the long-form assignment table once, writes the volunteer-centric
+    # and shift-centric CSVs from it, and exports the table itself in each of the requested formats
     # Inputs:
-    #   solver = the CP solver object, which has already solved the model.
-    #   Assignment = a dictionary mapping (volunteer, shift) tuples to binary assignment decision variables
+    #   solution = the Solution object returned by ExtractSolution
     #   Shifts = a dictionary of Shift objects
+    #   OutputDirectory = the directory to write the files to
+    #   Formats = a list of the formats to export the assignment table in; see ExportAssignmentTable
+    # Outputs:
+    #   table = the assignment table
 
     # Import the necessary libraries
-    import csv
-    import sys
+    import os
 
-    # Specify the name of the file to be exported
-    file_name = '../exported_files/Shift-Focused Schedule.csv'
+    table = BuildAssignmentTable(solution)
 
-    # Create the file
-    with open(file_name, mode='w') as f:
+    (volunteer_rows, shift_rows) = BuildScheduleViews(table, Shifts)
+    WriteCsvRows(os.path.join(OutputDirectory, 'Volunteer-Focused Schedule.csv'), volunteer_rows[0], volunteer_rows[1:])
+    WriteCsvRows(os.path.join(OutputDirectory, 'Shift-Focused Schedule.csv'), shift_rows[0], shift_rows[1:])
 
-        # Instantiate the csv writer
-        if 'win' in sys.platform:  # Check for windows
-            writer = csv.writer(f, delimiter=',', lineterminator='\n')
-        else:
-            writer = csv.writer(f, delimiter=',')
+    for f in Formats:
+        ExportAssignmentTable(table, f, OutputDirectory)
+
+    return table
+
+
+def ExportSolverSettings(Config, solution, OutputDirectory='../exported_files', Extra=()):
+    # This function exports the solver settings used to produce the exported schedules
+    # Inputs:
+    #   Config = the SolverConfig object used for the solve
+    #   solution = the Solution object returned by ExtractSolution
+    #   OutputDirectory = the directory to write the file to
+    #   Extra = a list of (name, value) tuples of further settings of the run, e.g. those of a solution pool
+
+    # Import the necessary libraries
+    import os
+
+    # Add the line for each setting, leaving the solver defaults blank, and the objective value reached with them
+    rows = [[name, '' if value is None else value] for (name, value) in list(Config.Settings()) + list(Extra)]
+    rows.append(['Objective value', solution.ObjectiveValue])
+
+    WriteCsvRows(os.path.join(OutputDirectory, 'Solver Settings.csv'), ['Setting', 'Value'], rows)
+
+
+def ExportBatchSummary(Summaries, OutputDirectory='../exported_files/batch'):
+    # This function exports one line per site summarizing the results of a batch run
+    # Inputs:
+    #   Summaries = a list of dictionaries of site results, as returned by SolveSite in batch.py
+    #   OutputDirectory = the directory to write the file to
+
+    # Import the necessary libraries
+    import os
+
+    # The columns of the summary, in order
+    header_line = ['Site', 'Status', 'Objective Value', 'Volunteers', 'Assignments Required', 'Assignments Realized',
+                   'Under-staffed Shifts', 'Preferred Volunteers', 'Preferred Volunteers Assigned', 'Seconds',
+                   'Output Directory']
 
-        # Construct the header line
-        # Intialize the header line
-        HeaderLine = ['Shift']
+    # Add the line for each site, leaving the results of a failed site blank
+    WriteCsvRows(os.path.join(OutputDirectory, 'Batch Summary.csv'), header_line,
+                 [[summary.get(column, '') for column in header_line] for summary in Summaries])
 
-        # Calculate the maximum number of volunteers required in any given shift
-        max_volunteers_per_shift = max([s.required_volunteers for s in Shifts.values()])
 
-        # Add a column for each possible volunteer
-        for v in range(1, max_volunteers_per_shift + 1):
-            # Add the header for the vth volunteer
-            HeaderLine.append('Volunteer %s' % str(v))
+def ExportParetoFront(Front, OutputDirectory='../exported_files/sweep'):
+    # This function exports one line per non-dominated point of a weight sweep
+    # Inputs:
+    #   Front = a list of (SweepPoint object, schedule directory) tuples
+    #   OutputDirectory = the directory to write the file to
+
+    # Import the necessary libraries
+    import os
+
+    # Add a column per objective weight
+    weight_names = list(Front[0][0].Weights) if Front else []
+    header_line = ['Weight: %s' % w for w in weight_names] + \
+        ['Objective Value', 'Shift Coverage', 'Preference Points', 'Assignments Realized', 'Schedule Directory']
+
+    # Add the line for each point
+    rows = [[point.Weights[w] for w in weight_names] +
+            [point.ObjectiveValue, '%1.4f' % point.Coverage, point.PreferencePoints, point.AssignmentsRealized,
+             directory]
+            for (point, directory) in Front]
+
+    WriteCsvRows(os.path.join(OutputDirectory, 'Pareto Front.csv'), header_line, rows)
+
+
+def ExportScheduleDiff(Differences, OutputDirectory):
+    # This function exports the volunteers whose shifts differ from the first schedule of a solution pool
+    # Inputs:
+    #   Differences = the list of (volunteer name, first shift names, shift names) tuples returned by DiffSchedules
+    #   OutputDirectory = the directory to write the file to
 
-        # Add a column for notes
-        HeaderLine.append('Notes')
+    # Import the necessary libraries
+    import os
 
-        # Write the header line to the csv
-        writer.writerow(HeaderLine)
+    # Add the line for each volunteer who moved, joining several shifts with semicolons
+    rows = [[name, '; '.join(first) or 'Unassigned', '; '.join(this) or 'Unassigned']
+            for (name, first, this) in Differences]
 
-        # Add the line for each shift
-        for s in Shifts:
+    WriteCsvRows(os.path.join(OutputDirectory, 'Schedule Diff.csv'), ['Volunteer', 'First Schedule', 'This Schedule'],
+                 rows)
 
-            # Initialize the line with the name of the shift
-            line = [s]
 
-            # Initialize the count of volunteers assigned to this shift
-            volunteers_assigned = 0
+def ExportSolutionPool(Pool, OutputDirectory='../exported_files/pool'):
+    # This function exports one line per schedule of a solution pool
+    # Inputs:
+    #   Pool = a list of (PoolSchedule object, schedule directory) tuples
+    #   OutputDirectory = the directory to write the file to
 
-            # Loop over the volunteers
-            for v in IndividualVolunteers:
+    # Import the necessary libraries
+    import os
 
-                # Check if they were assigned to the current shift
-                if solver.Value(Assignment[(v, s)]) == 1:  # They were assigned to the current shfit
+    # Add the line for each schedule
+    rows = [[ScheduleIndex + 1, schedule.ObjectiveValue, schedule.Changes, directory]
+            for (ScheduleIndex, (schedule, directory)) in enumerate(Pool)]
 
-                    # Print the volunteer's first and last name
-                    line.append('%s' % (v.Name))
+    WriteCsvRows(os.path.join(OutputDirectory, 'Solution Pool.csv'),
+                 ['Schedule', 'Objective Value', 'Volunteers Moved From First', 'Schedule Directory'], rows)
 
-                    # Increment the count of volunteers assigned
-                    volunteers_assigned += 1
 
-            # Check for under-staffing
-            if volunteers_assigned < Shifts[s].required_volunteers:  # this is an under-staffed shift
+def ExportTelemetry(telemetry, OutputDirectory='../exported_files'):
+    # This function exports the stage timings, model size and solver statistics of a run as a JSON report
+    # Inputs:
+    #   telemetry = the Telemetry object the run was recorded with
+    #   OutputDirectory = the directory to write the file to
 
-                # Add the appropriate number of empty strings
-                for _ in range(max_volunteers_per_shift - volunteers_assigned):
-                    line.append(' ')
+    # Import the necessary libraries
+    import json
+    import os
 
-                # Add the warning about under-staffing
-                line.append('Warning: this shift is under-staffed.')
+    # Specify the name of the file to be exported
+    file_name = os.path.join(OutputDirectory, 'Telemetry.json')
 
-            # Write out the line for the current shift
-            writer.writerow(line)
+    # Write the report
+    with open(file_name, mode='w') as f:
+        json.dump(telemetry.Report(), f, indent=2)
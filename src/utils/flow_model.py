@@ -0,0 +1,134 @@
+import numpy as np
+from ortools.graph.python import min_cost_flow
+from ortools.sat import cp_model_pb2
+from utils.y2y_classes import VolunteerGroup
+
+
+class MinCostFlowSolver():
+    # This class solves the assignment problem as a min-cost flow instead of with the CP-SAT solver.
+    # Each volunteer works at most one shift and each shift takes at most its required number of volunteers, so
+    # the problem is a bipartite b-matching, which a min-cost flow solves exactly in polynomial time.
+    # It mirrors the parts of the cp_model.CpSolver interface used by main.py and the exporters, so it can be
+    # swapped in for the CP solver without any other changes.
+
+    def __init__(self, IndividualVolunteers, Shifts, Assignment, VolunteerGroups=()):
+        # Inputs:
+        #   IndividualVolunteers = a list of volunteer objects.
+        #   Shifts = a dictionary of shift objects, indexed by shift names
+        #   Assignment = the SparseAssignment returned by BuildModel or BuildAssignment
+        #   VolunteerGroups = the list of VolunteerGroup objects passed to BuildModel
+        self.IndividualVolunteers = IndividualVolunteers
+        self.VolunteerGroups = VolunteerGroups
+        self.Shifts = Shifts
+        self.Assignment = Assignment
+        self.Values = {}  # decision variable index --> solved value
+        self.PairValues = None  # array of the solved value of each eligible pair
+        self.Objective = 0
+
+    def Solve(self, model=None):
+        # This function builds and solves the flow network. The model argument is accepted (and ignored) so that
+        # the call matches cp_model.CpSolver.Solve; the assignment may come from BuildAssignment, without a model.
+        # The statuses are read from the CP-SAT protocol buffers, which load without the CP-SAT python wrapper.
+
+        # The network gives each volunteer one shift, and cannot keep a volunteer's shifts apart
+        RaiseIfMultipleShifts(self.Assignment.Entities)
+
+        # Find the number of people behind each volunteer and group node
+        supply = np.array(
+            [v.Volunteers if isinstance(v, VolunteerGroup) else min(v.MaxShifts, 1) for v in self.Assignment.Entities],
+            dtype=np.int64)
+
+        # Find the number of people each shift can take, after any assignments fixed by the presolve
+        room = np.array([self.Shifts[s].required_volunteers for s in self.Assignment.ShiftNames], dtype=np.int64)
+        for ((v, s), count) in self.Assignment.FixedCounts.items():
+            room[self.Assignment.ShiftIndex[s]] -= count
+
+        # Solve the network, valuing each assignment with the objective coefficients calculated by BuildModel
+        result = SolveAssignmentFlow(
+            supply, room, self.Assignment.EntityIds, self.Assignment.ShiftIds, self.Assignment.Coefficients)
+        if result is None:
+            return cp_model_pb2.MODEL_INVALID
+
+        # Store the solution
+        (self.PairValues, self.Objective) = result
+        self.Objective += self.Assignment.FixedObjective
+        self.Values = dict(zip([x.Index() for x in self.Assignment.Variables], self.PairValues.tolist()))
+
+        return cp_model_pb2.OPTIMAL
+
+    def Value(self, Variable):
+        # Return the solved value of a decision variable
+        return self.Values.get(Variable.Index(), 0)
+
+    def ObjectiveValue(self):
+        # Return the objective value of the solution
+        return self.Objective
+
+
+def RaiseIfMultipleShifts(Entities):
+    # This function rejects a roster with volunteers who work several shifts, which only the CP-SAT backend models
+    for v in Entities:
+        if not isinstance(v, VolunteerGroup) and v.MaxShifts > 1:
+            raise ValueError(
+                'Volunteer %r works up to %d shifts, but the min-cost flow backend assigns each volunteer at most '
+                'one shift. Solve this roster with the cp-sat backend.' % (v.Name, v.MaxShifts)
+            )
+
+
+def SolveAssignmentFlow(Supply, Room, EntityIds, ShiftIds, Values):
+    # This function solves an assignment problem exactly as a min-cost flow
+    # Network: source --> volunteer (capacity = supply) --> shift (cost = -value per person) --> sink
+    #          (capacity = room), plus a zero-cost source --> sink bypass arc so that volunteers are only routed
+    #          through a shift when it improves the objective. A volunteer group is a single node whose supply is the
+    #          number of members in the group.
+    # Inputs:
+    #   Supply = an integer array of the number of people each volunteer or group stands for
+    #   Room = an integer array of the number of people each shift can take
+    #   EntityIds = an integer array of the volunteer or group of each eligible pair
+    #   ShiftIds = an integer array of the shift of each eligible pair
+    #   Values = an integer array of the objective value of assigning one person of each eligible pair
+    # Outputs:
+    #   (flows, objective) = an integer array of the number of people assigned for each eligible pair, and the
+    #                        objective value; None if the network could not be solved
+
+    Supply = np.asarray(Supply, dtype=np.int64)
+    Room = np.asarray(Room, dtype=np.int64)
+    EntityIds = np.asarray(EntityIds, dtype=np.int64)
+    ShiftIds = np.asarray(ShiftIds, dtype=np.int64)
+
+    # Number the nodes: the source, the sink, the volunteers and then the shifts
+    source = 0
+    sink = 1
+    first_volunteer = 2
+    first_shift = first_volunteer + len(Supply)
+
+    people = int(Supply.sum())
+
+    # Build the network, adding each layer of arcs in one call; the assignment arcs come first so that their arc
+    # indices match the positions of the eligible pairs
+    flow = min_cost_flow.SimpleMinCostFlow()
+
+    flow.add_arcs_with_capacity_and_unit_cost(
+        first_volunteer + EntityIds, first_shift + ShiftIds, Supply[EntityIds], -np.asarray(Values, dtype=np.int64))
+
+    flow.add_arcs_with_capacity_and_unit_cost(
+        np.full(len(Supply), source), first_volunteer + np.arange(len(Supply)), Supply,
+        np.zeros(len(Supply), dtype=np.int64))
+
+    flow.add_arcs_with_capacity_and_unit_cost(
+        first_shift + np.arange(len(Room)), np.full(len(Room), sink), np.maximum(Room, 0),
+        np.zeros(len(Room), dtype=np.int64))
+
+    flow.add_arc_with_capacity_and_unit_cost(source, sink, people, 0)
+
+    flow.set_node_supply(source, people)
+    flow.set_node_supply(sink, -people)
+
+    # Solve the network
+    if flow.solve() != flow.OPTIMAL:
+        return None
+
+    # Read out the assignments
+    flows = flow.flows(np.arange(len(EntityIds)))
+
+    return (flows, -flow.optimal_cost())
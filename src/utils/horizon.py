@@ -0,0 +1,219 @@
+import time
+import numpy as np
+from ortools.sat.python import cp_model
+from utils.cp_model import HOURS_PER_WEEK, BuildSolution, CalcObjectiveCoefficients, CalculatePreferencePoints, \
+    ConfigureSolver, SetMaximizeObjective
+from utils.y2y_classes import Shift, VolunteerGroup
+
+
+class HorizonPairs():
+    # This class describes the eligible (volunteer or group, shift) pairs of a multi-week model, with the shifts
+    # numbered across the whole horizon: shift ID = week * (shifts per week) + weekly shift ID
+
+    def __init__(self):
+        self.EntityIds = None  # integer array of the volunteer or group of each pair
+        self.ShiftIds = None  # integer array of the horizon shift of each pair
+        self.Weeks = None  # integer array of the week of each pair, counting from 0
+        self.Coefficients = None  # integer array of the objective coefficient of each pair
+        self.EndHours = None  # array of the hour each pair's shift ends, counted from the start of the horizon
+
+
+def BuildHorizonShifts(Shifts, Weeks):
+    # This function repeats the weekly shifts over a horizon of several weeks
+    # Inputs:
+    #   Shifts = a dictionary of the weekly shift objects, indexed by shift names
+    #   Weeks = the number of weeks in the horizon
+    # Outputs:
+    #   horizon_shifts = a dictionary of shift objects indexed by names such as 'Week 2 Monday Dinner', in week order
+
+    horizon_shifts = {}
+    for WeekIndex in range(Weeks):
+        for (ShiftName, s) in Shifts.items():
+
+            # Instantiate a copy of the weekly shift, moved to its week
+            h = Shift()
+            h.shift_name = 'Week %d %s' % (WeekIndex + 1, ShiftName)
+            h.required_volunteers = s.required_volunteers
+            h.start_hour = WeekIndex * HOURS_PER_WEEK + s.start_hour
+            h.duration_hours = s.duration_hours
+
+            horizon_shifts[h.shift_name] = h
+
+    return horizon_shifts
+
+
+def BuildHorizonModel(Points, Coefficients, HorizonShifts, FirstWeek, Weeks, Horizon, Load, LastEnd):
+    # This function builds the CP model of a window of consecutive weeks. A volunteer can be assigned to any of their
+    # preferred shifts in every week, subject to the limits on shifts per week and per season and to the minimum rest
+    # between shifts. A volunteer's weekly limit is the lower of Horizon.MaxShiftsPerWeek and their own MaxShifts.
+    # Groups are assigned to their shift every week and are not subject to the limits.
+    # Inputs:
+    #   Points = the PreferencePoints of the volunteers followed by the groups, over the weekly shifts
+    #   Coefficients = the array of the weekly objective coefficient of each pair in Points
+    #   HorizonShifts = the dictionary of shift objects returned by BuildHorizonShifts
+    #   FirstWeek = the first week of the window, counting from 0
+    #   Weeks = the number of weeks in the window
+    #   Horizon = the HorizonConfig object
+    #   Load = an integer array of the number of shifts each volunteer was assigned to before the window
+    #   LastEnd = an array of the hour each volunteer's last shift before the window ends, or -inf
+    # Outputs:
+    #   (model, variables, pairs) = the CP model object, the list of decision variables and the HorizonPairs object
+    #                               describing them
+
+    shift_count = len(Points.ShiftNames)
+    horizon_names = list(HorizonShifts)
+    is_group = np.array([isinstance(v, VolunteerGroup) for v in Points.Entities], dtype=bool)
+
+    # Repeat the weekly pairs for each week of the window
+    weeks = np.repeat(np.arange(FirstWeek, FirstWeek + Weeks, dtype=np.int64), len(Points))
+    entity_ids = np.tile(Points.EntityIds.astype(np.int64), Weeks)
+    shift_ids = np.tile(Points.ShiftIds.astype(np.int64), Weeks) + weeks * shift_count
+    coefficients = np.tile(Coefficients, Weeks)
+    start_hours = np.array([HorizonShifts[s].start_hour for s in horizon_names], dtype=float)[shift_ids]
+    end_hours = start_hours + np.array([HorizonShifts[s].duration_hours for s in horizon_names], dtype=float)[shift_ids]
+
+    # Drop the shifts that start too soon after a volunteer's last shift, and the volunteers who have used up their
+    # season's shifts
+    keep = is_group[entity_ids] | (start_hours >= LastEnd[entity_ids] + Horizon.MinRestHours)
+    if Horizon.MaxShiftsPerSeason is not None:
+        keep &= is_group[entity_ids] | (Load[entity_ids] < Horizon.MaxShiftsPerSeason)
+
+    pairs = HorizonPairs()
+    pairs.EntityIds = entity_ids[keep]
+    pairs.ShiftIds = shift_ids[keep]
+    pairs.Weeks = weeks[keep]
+    pairs.Coefficients = coefficients[keep]
+    pairs.EndHours = end_hours[keep]
+    start_hours = start_hours[keep]
+
+    # Instantiate the CP model
+    model = cp_model.CpModel()
+
+    # Create the decision variables: a Bool variable per volunteer and shift, and a member count per group and shift
+    variables = []
+    for (e, s) in zip(pairs.EntityIds.tolist(), pairs.ShiftIds.tolist()):
+        v = Points.Entities[e]
+        if is_group[e]:
+            variables.append(model.NewIntVar(0, v.Volunteers, 'Members of group %s assigned to %s shift' % (
+                v.ID_Number, horizon_names[s])))
+        else:
+            variables.append(model.NewBoolVar('Volunteer %s assigned to %s shift' % (v.ID_Number, horizon_names[s])))
+
+    # Each shift has a maximum number of volunteers assigned to it
+    order = np.argsort(pairs.ShiftIds, kind='stable')
+    bounds = np.flatnonzero(np.diff(pairs.ShiftIds[order])) + 1
+    for positions in np.split(order, bounds):
+        if len(positions) > 0:
+            model.Add(cp_model.LinearExpr.Sum([variables[k] for k in positions.tolist()])
+                      <= HorizonShifts[horizon_names[pairs.ShiftIds[positions[0]]]].required_volunteers)
+
+    # Go through each volunteer's shifts in time order
+    individual = np.flatnonzero(~is_group[pairs.EntityIds])
+    order = individual[np.lexsort((start_hours[individual], pairs.EntityIds[individual]))]
+    bounds = np.flatnonzero(np.diff(pairs.EntityIds[order])) + 1
+    for positions in np.split(order, bounds):
+        if len(positions) == 0:
+            continue
+        positions = positions.tolist()
+        e = pairs.EntityIds[positions[0]]
+
+        # Limit the number of shifts in each week, to the volunteer's own limit if that is lower
+        week_limit = Points.Entities[e].MaxShifts
+        if Horizon.MaxShiftsPerWeek is not None:
+            week_limit = min(week_limit, Horizon.MaxShiftsPerWeek)
+        for w in set(pairs.Weeks[positions].tolist()):
+            week_positions = [k for k in positions if pairs.Weeks[k] == w]
+            if len(week_positions) > week_limit:
+                model.Add(cp_model.LinearExpr.Sum([variables[k] for k in week_positions]) <= week_limit)
+
+        # Limit the number of shifts left in the season
+        if Horizon.MaxShiftsPerSeason is not None and len(positions) > Horizon.MaxShiftsPerSeason - Load[e]:
+            model.Add(cp_model.LinearExpr.Sum([variables[k] for k in positions])
+                      <= int(Horizon.MaxShiftsPerSeason - Load[e]))
+
+        # A volunteer cannot work two shifts that overlap or leave less than the minimum rest between them
+        for (i, k) in enumerate(positions):
+            for j in positions[i + 1:]:
+                if start_hours[j] >= pairs.EndHours[k] + Horizon.MinRestHours:
+                    break
+                model.AddAtMostOne([variables[k], variables[j]])
+
+    # Maximize the shift coverage and the realized shift preference points, as in the single-week model
+    SetMaximizeObjective(model, variables, pairs.Coefficients)
+
+    return (model, variables, pairs)
+
+
+def SolveHorizon(IndividualVolunteers, Shifts, VolunteerGroups, Horizon, Config, Points=None):
+    # This function schedules a horizon of several weeks. With a Window, it solves a rolling horizon: each solve covers
+    # Window weeks but only commits its first week, and each volunteer's accumulated load and last shift are carried
+    # forward into the next solve. Without a Window it solves the whole horizon in one model. The horizon is always
+    # solved with CP-SAT, because the rest constraints do not fit the min-cost flow.
+    # Inputs:
+    #   IndividualVolunteers = a list of volunteer objects
+    #   Shifts = a dictionary of the weekly shift objects, indexed by shift names
+    #   VolunteerGroups = a list of VolunteerGroup objects, already capped by CapVolunteerGroups
+    #   Horizon = the HorizonConfig object
+    #   Config = the SolverConfig object used for each solve
+    #   Points = the PreferencePoints of the volunteers followed by the groups; calculated if not given
+    # Outputs:
+    #   (solution, horizon_shifts, report) = the Solution object over the horizon shifts, the dictionary of horizon
+    #                                        shift objects, and a list of (first week, weeks solved, seconds, status)
+    #                                        tuples, one per solve
+
+    entities = list(IndividualVolunteers) + list(VolunteerGroups)
+
+    # Calculate the weekly objective coefficients
+    if Points is None:
+        Points = CalculatePreferencePoints(entities, Shifts)
+    coefficients = CalcObjectiveCoefficients(Points, Shifts)
+
+    # Build the shifts of the whole horizon
+    horizon_shifts = BuildHorizonShifts(Shifts, Horizon.Weeks)
+    horizon_names = list(horizon_shifts)
+
+    # Nobody has worked yet
+    load = np.zeros(len(entities), dtype=np.int64)
+    last_end = np.full(len(entities), -np.inf)
+
+    # Solve the windows in turn
+    window = Horizon.Weeks if Horizon.Window is None else max(Horizon.Window, 1)
+    counts = {}
+    objective = 0
+    report = []
+    week = 0
+    while week < Horizon.Weeks:
+        start = time.perf_counter()
+
+        # Build and solve the window's model
+        span = min(window, Horizon.Weeks - week)
+        (model, variables, pairs) = BuildHorizonModel(
+            Points, coefficients, horizon_shifts, week, span, Horizon, load, last_end)
+
+        solver = cp_model.CpSolver()
+        ConfigureSolver(solver, Config)
+        status = solver.Solve(model)
+
+        # Commit the first week of the window, or the whole window when solving the horizon at once
+        commit = span if Horizon.Window is None else 1
+        if status in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+            values = np.array([solver.Value(x) for x in variables], dtype=np.int64)
+        else:  # no solution was found in time, so the window's weeks stay empty
+            values = np.zeros(len(variables), dtype=np.int64)
+        committed = np.flatnonzero((pairs.Weeks < week + commit) & (values > 0))
+
+        for k in committed.tolist():
+            counts[(entities[pairs.EntityIds[k]], horizon_names[pairs.ShiftIds[k]])] = int(values[k])
+        objective += int(np.dot(pairs.Coefficients[committed], values[committed]))
+
+        # Carry each volunteer's load and last shift forward
+        np.add.at(load, pairs.EntityIds[committed], values[committed])
+        np.maximum.at(last_end, pairs.EntityIds[committed], pairs.EndHours[committed])
+
+        report.append((week + 1, span, time.perf_counter() - start, status))
+        week += commit
+
+    # Build the solution over the whole horizon
+    solution = BuildSolution(counts, horizon_shifts, IndividualVolunteers, VolunteerGroups, objective)
+
+    return (solution, horizon_shifts, report)
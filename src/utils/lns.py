@@ -0,0 +1,332 @@
+import random
+import time
+import numpy as np
+from ortools.sat.python import cp_model
+from utils.cp_model import BuildSolution, FindShiftConflicts, SetMaximizeObjective
+from utils.progress import SolveProgress
+from utils.y2y_classes import VolunteerGroup
+
+
+class LNSSolver():
+    # This class solves large rosters by large neighborhood search instead of one monolithic CP-SAT solve. It starts
+    # from a greedy schedule, then repeatedly frees a small neighborhood of the schedule (one day's shifts, or a
+    # random set of volunteers), re-solves just that part as a small CP-SAT model with everything else held fixed,
+    # and keeps the result whenever it is better. Every step keeps the schedule feasible, so the search can be
+    # stopped at any time. Without a time limit, it stops once a full pass of neighborhoods (every day once, each
+    # followed by a set of volunteers) brings no improvement, or at SolverConfig.LNSTimeLimit. A pass without
+    # improvement only means no neighborhood could be improved, not that the schedule is optimal, so the search
+    # reports its schedules as feasible and records why it stopped in StopReason.
+    # It mirrors the parts of the cp_model.CpSolver interface used by main.py and the exporters, like
+    # MinCostFlowSolver.
+
+    def __init__(self, IndividualVolunteers, Shifts, Assignment, VolunteerGroups=(), Config=None, Hooks=(),
+                 NeighborhoodPairs=2000, SubSolveSeconds=1.0):
+        # Inputs:
+        #   IndividualVolunteers = a list of volunteer objects.
+        #   Shifts = a dictionary of shift objects, indexed by shift names
+        #   Assignment = the SparseAssignment returned by BuildModel or BuildAssignment
+        #   VolunteerGroups = the list of VolunteerGroup objects passed to BuildModel
+        #   Config = the SolverConfig object; MaxTimeInSeconds is the wall-clock budget (when not set, the search
+        #            stops after a pass of neighborhoods without improvement, or at LNSTimeLimit), and
+        #            NoImprovementSeconds, RandomSeed, NumSearchWorkers and MinRestHours are used as usual
+        #   Hooks = a list of functions, each called with a SolveProgress object for every improving schedule
+        #   NeighborhoodPairs = the most eligible pairs freed in one neighborhood
+        #   SubSolveSeconds = the time limit of each neighborhood's solve
+        self.IndividualVolunteers = IndividualVolunteers
+        self.VolunteerGroups = VolunteerGroups
+        self.Shifts = Shifts
+        self.Assignment = Assignment
+        self.Config = Config
+        self.Hooks = list(Hooks)
+        self.NeighborhoodPairs = NeighborhoodPairs
+        self.SubSolveSeconds = SubSolveSeconds
+        self.Values = {}  # decision variable index --> solved value
+        self.PairValues = None  # array of the solved value of each eligible pair
+        self.Objective = 0
+        self.Trajectory = []  # list of (seconds, objective value) tuples, one per improving schedule
+        self.Neighborhoods = 0  # number of neighborhoods solved
+        self.StopReason = None  # 'converged' after a pass without improvement, 'time limit' or 'no improvement'
+
+    def Solve(self, model=None):
+        # This function runs the search. The model argument is accepted (and ignored) so that the call matches
+        # cp_model.CpSolver.Solve.
+        start = time.perf_counter()
+        converge = self.Config is None or self.Config.MaxTimeInSeconds is None
+        if converge:
+            budget = 60.0 if self.Config is None or self.Config.LNSTimeLimit is None else self.Config.LNSTimeLimit
+        else:
+            budget = self.Config.MaxTimeInSeconds
+        stall = None if self.Config is None else self.Config.NoImprovementSeconds
+        rng = random.Random(0 if self.Config is None or self.Config.RandomSeed is None else self.Config.RandomSeed)
+
+        a = self.Assignment
+        entity_ids = a.EntityIds.astype(np.int64)
+        shift_ids = a.ShiftIds.astype(np.int64)
+        coefficients = np.asarray(a.Coefficients, dtype=np.int64)
+
+        # Find the number of people behind each pair, and the most shifts each volunteer or group works
+        is_group = np.array([isinstance(v, VolunteerGroup) for v in a.Entities], dtype=bool)
+        self.Supply = np.array([v.Volunteers if g else 1 for (v, g) in zip(a.Entities, is_group)], dtype=np.int64)
+        self.Capacity = np.array([1 if g else v.MaxShifts for (v, g) in zip(a.Entities, is_group)], dtype=np.int64)
+
+        # Find the number of people each shift can take, after any assignments fixed by the presolve
+        self.Room = np.array([self.Shifts[s].required_volunteers for s in a.ShiftNames], dtype=np.int64)
+        for ((v, s), count) in a.FixedCounts.items():
+            self.Room[a.ShiftIndex[s]] -= count
+
+        # Number the sets of shifts no volunteer can work more than one of; they only matter for volunteers who work
+        # several shifts
+        self.Cliques = []
+        if (self.Capacity[~is_group] > 1).any():
+            self.Cliques = [sorted(a.ShiftIndex[s] for s in c if s in a.ShiftIndex)
+                            for c in FindShiftConflicts(self.Shifts, self.Config.MinRestHours if self.Config else 1)]
+
+        # Start from the greedy schedule
+        values = GreedySchedule(entity_ids, shift_ids, coefficients, self.Supply, self.Capacity, self.Room,
+                                self.Cliques)
+        objective = int(np.dot(coefficients, values)) + a.FixedObjective
+        self.Record(values, objective, time.perf_counter() - start)
+        last_improvement = time.perf_counter()
+
+        # The days of the week, for the day neighborhoods; a pass visits each day once, in random order
+        days = np.array([int(self.Shifts[s].start_hour // 24) for s in a.ShiftNames], dtype=np.int64)
+        day_order = []
+        pass_length = 2 * len(set(days.tolist()))
+        unimproved = 0
+
+        # Re-solve neighborhoods until the time runs out, or a whole pass finds nothing better
+        while True:
+            remaining = budget - (time.perf_counter() - start)
+            if remaining <= 0.05:
+                self.StopReason = 'time limit'
+                break
+            if stall is not None and time.perf_counter() - last_improvement >= stall:
+                self.StopReason = 'no improvement'
+                break
+            if converge and unimproved >= pass_length:
+                self.StopReason = 'converged'
+                break
+
+            # Alternate between a day's shifts and a random set of volunteers
+            if self.Neighborhoods % 2 == 0:
+                if not day_order:
+                    day_order = sorted(set(days.tolist()))
+                    rng.shuffle(day_order)
+                free = self.DayNeighborhood(values, entity_ids, shift_ids, days, day_order.pop(), rng)
+            else:
+                free = self.VolunteerNeighborhood(values, entity_ids, rng)
+            self.Neighborhoods += 1
+
+            improved = self.SolveNeighborhood(values, free, entity_ids, shift_ids, coefficients,
+                                              min(self.SubSolveSeconds, remaining))
+            unimproved += 1
+            if improved is not None:
+                unimproved = 0
+                values = improved
+                objective = int(np.dot(coefficients, values)) + a.FixedObjective
+                self.Record(values, objective, time.perf_counter() - start)
+                last_improvement = time.perf_counter()
+
+        # Store the solution
+        self.PairValues = values
+        self.Objective = objective
+        self.Values = dict(zip([x.Index() for x in a.Variables], values.tolist()))
+
+        return cp_model.FEASIBLE
+
+    def Record(self, Values, Objective, Seconds):
+        # This function records an improving schedule and passes it to the hooks
+        self.Trajectory.append((Seconds, Objective))
+        if not self.Hooks:
+            return
+
+        progress = SolveProgress()
+        progress.SolutionNumber = len(self.Trajectory)
+        progress.ObjectiveValue = Objective
+        progress.BestBound = float('nan')  # the search proves no bound
+        progress.Gap = float('nan')
+        progress.Seconds = Seconds
+
+        a = self.Assignment
+        counts = dict(a.FixedCounts)
+        for k in np.flatnonzero(Values).tolist():
+            counts[(a.Entities[a.EntityIds[k]], a.ShiftNames[a.ShiftIds[k]])] = int(Values[k])
+        progress.Solution = BuildSolution(counts, self.Shifts, self.IndividualVolunteers, self.VolunteerGroups,
+                                          Objective)
+
+        for hook in self.Hooks:
+            hook(progress)
+
+    def DayNeighborhood(self, Values, EntityIds, ShiftIds, Days, Day, Rng):
+        # This function frees one day's pairs for the volunteers working that day and for a random sample of the
+        # day's other candidates
+        on_day = Days[ShiftIds] == Day
+
+        # Everyone working the day can move, along with as many other candidates as the neighborhood allows
+        working = np.unique(EntityIds[on_day & (Values > 0)])
+        chosen = np.zeros(len(self.Supply), dtype=bool)
+        chosen[working] = True
+        others = np.unique(EntityIds[on_day & ~chosen[EntityIds]]).tolist()
+        Rng.shuffle(others)
+        budget = max(self.NeighborhoodPairs - int(np.count_nonzero(on_day & chosen[EntityIds])), 0)
+        per_entity = max(int(np.count_nonzero(on_day)) // max(len(np.unique(EntityIds[on_day])), 1), 1)
+        chosen[others[:budget // per_entity]] = True
+
+        return on_day & chosen[EntityIds]
+
+    def VolunteerNeighborhood(self, Values, EntityIds, Rng):
+        # This function frees all the pairs of a random set of volunteers, half of them currently working and half
+        # not, so the ones not working can take over from the others
+        pairs_per_entity = max(len(EntityIds) // max(len(self.Supply), 1), 1)
+        size = max(self.NeighborhoodPairs // pairs_per_entity, 2)
+
+        working = np.zeros(len(self.Supply), dtype=bool)
+        working[EntityIds[Values > 0]] = True
+        chosen = np.zeros(len(self.Supply), dtype=bool)
+        for group in (np.flatnonzero(working).tolist(), np.flatnonzero(~working).tolist()):
+            chosen[Rng.sample(group, min(size // 2, len(group)))] = True
+
+        return chosen[EntityIds]
+
+    def SolveNeighborhood(self, Values, Free, EntityIds, ShiftIds, Coefficients, Seconds):
+        # This function re-solves the free pairs with the rest of the schedule held fixed
+        # Outputs:
+        #   values = the improved array of pair values, or None if no improvement was found
+
+        fixed = ~Free & (Values > 0)
+
+        # Find the room, and each volunteer's shifts, left over by the fixed pairs
+        room = self.Room - np.bincount(
+            ShiftIds[fixed], weights=Values[fixed], minlength=len(self.Room)).astype(np.int64)
+        load = self.Capacity - np.bincount(EntityIds[fixed], minlength=len(self.Capacity))
+
+        # A free pair cannot conflict with one of the volunteer's fixed shifts
+        free = np.flatnonzero(Free)
+        blocked = set()
+        if self.Cliques:
+            fixed_shifts = set(zip(EntityIds[fixed].tolist(), ShiftIds[fixed].tolist()))
+            for c in self.Cliques:
+                members = set(c)
+                for (e, s) in fixed_shifts:
+                    if s in members:
+                        blocked.update((e, t) for t in c if t != s)
+        free = [k for k in free.tolist() if not (EntityIds[k], ShiftIds[k]) in blocked]
+        if not free:
+            return None
+
+        # Build the neighborhood's model
+        model = cp_model.CpModel()
+        variables = []
+        for k in free:
+            e = EntityIds[k]
+            if self.Supply[e] > 1:  # a group's member count
+                variables.append(model.NewIntVar(0, int(self.Supply[e]), ''))
+            else:
+                variables.append(model.NewBoolVar(''))
+
+        by_shift = {}
+        by_entity = {}
+        for (i, k) in enumerate(free):
+            by_shift.setdefault(int(ShiftIds[k]), []).append(i)
+            by_entity.setdefault(int(EntityIds[k]), []).append(i)
+
+        # Each shift takes at most the room it has left
+        for (s, members) in by_shift.items():
+            model.Add(sum(variables[i] for i in members) <= max(int(room[s]), 0))
+
+        # Each volunteer works at most their shifts left, and at most one shift of each conflicting set
+        for (e, members) in by_entity.items():
+            if len(members) > load[e]:
+                if load[e] == 1:
+                    model.AddAtMostOne([variables[i] for i in members])
+                else:
+                    model.Add(sum(variables[i] for i in members) <= max(int(load[e]), 0))
+            if self.Cliques and len(members) > 1:
+                shifts = dict((int(ShiftIds[free[i]]), i) for i in members)
+                for c in self.Cliques:
+                    clique = [variables[shifts[s]] for s in c if s in shifts]
+                    if len(clique) > 1:
+                        model.AddAtMostOne(clique)
+
+        # Maximize the objective of the free pairs, starting from their current values
+        current = Values[free]
+        SetMaximizeObjective(model, variables, Coefficients[free])
+        for (x, value) in zip(variables, current.tolist()):
+            model.AddHint(x, value)
+
+        solver = cp_model.CpSolver()
+        solver.parameters.max_time_in_seconds = Seconds
+        if self.Config is not None and self.Config.NumSearchWorkers is not None:
+            solver.parameters.num_workers = self.Config.NumSearchWorkers
+        status = solver.Solve(model)
+        if not status in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+            return None
+
+        # Keep the new values if they are better
+        new = np.array([solver.Value(x) for x in variables], dtype=np.int64)
+        if np.dot(Coefficients[free], new) <= np.dot(Coefficients[free], current):
+            return None
+
+        values = Values.copy()
+        values[free] = new
+        return values
+
+    def Value(self, Variable):
+        # Return the solved value of a decision variable
+        return self.Values.get(Variable.Index(), 0)
+
+    def ObjectiveValue(self):
+        # Return the objective value of the solution
+        return self.Objective
+
+
+def GreedySchedule(EntityIds, ShiftIds, Coefficients, Supply, Capacity, Room, Cliques=()):
+    # This function builds a feasible schedule quickly. It fills the most constrained shifts first, i.e. the ones
+    # with the fewest candidates per open place, giving each place to the candidate the objective values most who is
+    # still free to take it.
+    # Inputs:
+    #   EntityIds = an integer array of the volunteer or group of each eligible pair
+    #   ShiftIds = an integer array of the shift of each eligible pair
+    #   Coefficients = an integer array of the objective coefficient of each pair
+    #   Supply = an integer array of the number of people behind each volunteer or group
+    #   Capacity = an integer array of the most shifts each volunteer or group works
+    #   Room = an integer array of the number of people each shift can take
+    #   Cliques = a list of lists of shift IDs no volunteer can work more than one of
+    # Outputs:
+    #   values = an integer array of the number of people assigned for each pair
+
+    values = np.zeros(len(EntityIds), dtype=np.int64)
+    room = Room.copy()
+    load = np.zeros(len(Supply), dtype=np.int64)
+
+    # Find the conflicting sets of each shift
+    shift_cliques = [[] for _ in range(len(Room))]
+    for (c, members) in enumerate(Cliques):
+        for s in members:
+            shift_cliques[s].append(c)
+    used = [set() for _ in range(len(Supply))] if Cliques else None
+
+    # Order the shifts by the number of candidates per open place, and each shift's candidates best first
+    candidates = np.bincount(ShiftIds, weights=Supply[EntityIds], minlength=len(Room))
+    shift_order = np.argsort(candidates / np.maximum(Room, 1), kind='stable')
+    pair_order = np.lexsort((-Coefficients, ShiftIds))
+    bounds = np.searchsorted(ShiftIds[pair_order], np.arange(len(Room) + 1))
+
+    for s in shift_order.tolist():
+        for k in pair_order[bounds[s]:bounds[s + 1]].tolist():
+            if room[s] <= 0:
+                break
+
+            e = EntityIds[k]
+            if load[e] >= Capacity[e] or Coefficients[k] <= 0:
+                continue
+            if used is not None and any(c in used[e] for c in shift_cliques[s]):
+                continue
+
+            values[k] = min(Supply[e], room[s])
+            room[s] -= values[k]
+            load[e] += 1
+            if used is not None:
+                used[e].update(shift_cliques[s])
+
+    return values
@@ -0,0 +1,142 @@
+from ortools.sat import cp_model_pb2
+from utils.cache import DescribeShifts, HashInputs
+from utils.cp_model import BuildAssignment, BuildModel, BuildSolution, CalculatePreferencePoints, ConfigureSolver, \
+    ExtractSolution, GetObjectiveWeights, PresolveAssignment
+from utils.data_processing import BuildShiftDictionary, CapVolunteerGroups, ReadInGroupVolunteerData, \
+    ReadInIndividualVolunteerData
+from utils.telemetry import TimeStage
+
+# The names of the solver statuses, for reports. They are read from the protocol buffers rather than the CP-SAT
+# python wrapper, which is only imported by the backend that needs it.
+STATUS_NAMES = {
+    cp_model_pb2.OPTIMAL: 'Optimal',
+    cp_model_pb2.FEASIBLE: 'Feasible',
+    cp_model_pb2.INFEASIBLE: 'Infeasible',
+    cp_model_pb2.MODEL_INVALID: 'Model invalid',
+    cp_model_pb2.UNKNOWN: 'Unknown',
+}
+
+
+def SolveRoster(Config, PreferencesFile='../data/Updated Preferences.csv', GroupsFile='../data/Group Volunteers.csv',
+                PeriodsFile='../data/Shift Periods.csv', PriorAssignments=None, Cache=None, Hooks=(), Telemetry=None):
+    # This function runs the whole pipeline on one roster: it reads in the volunteers, builds the model and solves it
+    # Inputs:
+    #   Config = the SolverConfig object to solve with
+    #   PreferencesFile = the path of the individual preference csv file
+    #   GroupsFile = the path of the volunteer group csv file
+    #   PeriodsFile = the path of the shift period csv file
+    #   PriorAssignments = an optional dictionary mapping volunteer names to the shift names they were assigned to in
+    #                      an earlier solution, used to warm start the solver
+    #   Cache = an optional ScheduleCache object. A schedule solved from the same input files, shifts, weights,
+    #           solver settings and hint is returned straight from the cache, and a parsed roster is reused when only
+    #           the other settings changed.
+    #   Hooks = a list of functions, each called with a SolveProgress object for every improving solution found by
+    #           CP-SAT (see utils/progress.py)
+    #   Telemetry = an optional Telemetry object, which records the time and memory of each stage, the model size and
+    #               the solver statistics (see utils/telemetry.py)
+    # Outputs:
+    #   (solution, shifts, status) = the Solution object, the dictionary of shift objects and the solver status. The
+    #                                solution is None when the solver found no schedule (e.g. it ran out of time).
+
+    # Build the list of shifts
+    with TimeStage(Telemetry, 'BuildShiftDictionary'):
+        shifts = BuildShiftDictionary(PeriodsFile)
+
+    # Return the cached schedule if nothing has changed
+    if Cache is not None:
+        files = [PreferencesFile, GroupsFile]
+        roster_key = 'roster-' + HashInputs(files)
+        schedule_key = 'schedule-' + HashInputs(
+            files, DescribeShifts(shifts), GetObjectiveWeights(), Config.Settings(),
+            sorted((name, sorted(s)) for (name, s) in PriorAssignments.items()) if PriorAssignments else None)
+
+        cached = Cache.Load(schedule_key)
+        if cached is not None:
+            (individual_volunteers, group_volunteers, counts, objective, status, presolve) = cached
+            if Telemetry is not None:
+                Telemetry.Solver = {'status': STATUS_NAMES.get(status, str(status)), 'objective': objective,
+                                    'cached': True}
+            solution = BuildSolution(counts, shifts, individual_volunteers, group_volunteers, objective)
+            solution.Presolve = presolve
+            return (solution, shifts, status)
+
+        roster = Cache.Load(roster_key)
+    else:
+        roster = None
+
+    # Read in the individual volunteer and volunteer group data
+    if roster is None:
+        with TimeStage(Telemetry, 'Load'):
+            individual_volunteers = ReadInIndividualVolunteerData(PreferencesFile)
+            group_volunteers = ReadInGroupVolunteerData(GroupsFile)
+        if Cache is not None:
+            Cache.Store(roster_key, (individual_volunteers, group_volunteers))
+    else:
+        (individual_volunteers, group_volunteers) = roster
+
+    # Cap the size of each volunteer group at the number of volunteers its shift requires
+    with TimeStage(Telemetry, 'CapVolunteerGroups'):
+        CapVolunteerGroups(group_volunteers, shifts)
+
+    # Calculate the number of preference points each volunteer and group associates with each of their shifts
+    with TimeStage(Telemetry, 'CalculatePreferencePoints'):
+        points = CalculatePreferencePoints(individual_volunteers + group_volunteers, shifts)
+
+    # Drop what cannot be assigned and fix the forced assignments
+    with TimeStage(Telemetry, 'PresolveAssignment'):
+        presolve = PresolveAssignment(points, shifts) if Config.Presolve else None
+
+    # Build the constraint programming model; the min-cost flow and LNS backends solve the eligible pairs directly,
+    # without the monolithic model
+    with TimeStage(Telemetry, 'BuildModel'):
+        if Config.Backend in ('min-cost-flow', 'lns'):
+            model = None
+            assignment = BuildAssignment(individual_volunteers, shifts, group_volunteers, points, presolve)
+        else:
+            (model, assignment) = BuildModel(individual_volunteers, shifts, group_volunteers, PriorAssignments,
+                                             points, presolve, Config.MinRestHours)
+    if Telemetry is not None and model is not None:
+        Telemetry.RecordModel(model)
+
+    # Create the solver and solve
+    with TimeStage(Telemetry, 'Solve'):
+        if Config.Backend == 'min-cost-flow':
+            from utils.flow_model import MinCostFlowSolver
+
+            solver = MinCostFlowSolver(individual_volunteers, shifts, assignment, group_volunteers)
+            status = solver.Solve(model)
+        elif Config.Backend == 'lns':
+            from utils.lns import LNSSolver
+
+            solver = LNSSolver(individual_volunteers, shifts, assignment, group_volunteers, Config, Hooks)
+            status = solver.Solve(model)
+        else:
+            from ortools.sat.python import cp_model
+            from utils.progress import ProgressCallback
+
+            solver = cp_model.CpSolver()
+            ConfigureSolver(solver, Config)
+
+            # Stream the improving solutions when asked to, or when the search has to stop once it stalls
+            if Hooks or Config.NoImprovementSeconds is not None:
+                callback = ProgressCallback(solver, assignment, shifts, individual_volunteers, group_volunteers,
+                                            Hooks, Config.RelativeGapLimit, Config.NoImprovementSeconds)
+                status = callback.Solve(model)
+            else:
+                status = solver.Solve(model)
+    if Telemetry is not None:
+        Telemetry.RecordSolver(solver, STATUS_NAMES.get(status, str(status)))
+
+    # Read the assignments out of the solver, if it found any
+    if not status in (cp_model_pb2.OPTIMAL, cp_model_pb2.FEASIBLE):
+        return (None, shifts, status)
+    with TimeStage(Telemetry, 'ExtractSolution'):
+        solution = ExtractSolution(solver, assignment, shifts, individual_volunteers, group_volunteers)
+    solution.Presolve = presolve
+
+    # Store the schedule and its presolve report, along with the roster their volunteer objects belong to
+    if Cache is not None:
+        Cache.Store(schedule_key, (individual_volunteers, group_volunteers, solution.Counts, solution.ObjectiveValue,
+                                   status, presolve))
+
+    return (solution, shifts, status)
@@ -0,0 +1,138 @@
+import os
+import threading
+import time
+import numpy as np
+from ortools.sat.python import cp_model
+from utils.cp_model import BuildSolution
+from utils.export_data import ExportSchedules
+
+
+class SolveProgress():
+    # This class describes an improving solution found during the search
+
+    def __init__(self):
+        self.SolutionNumber = 0  # 1 for the first solution found, 2 for the next improvement, ...
+        self.ObjectiveValue = 0
+        self.BestBound = 0  # the best bound on the objective proved so far
+        self.Gap = 0.0  # (best bound - objective) / objective
+        self.Seconds = 0.0  # wall time since the search started
+        self.Solution = None  # the Solution object of this schedule
+
+
+class ProgressCallback(cp_model.CpSolverSolutionCallback):
+    # This class passes each improving solution to a list of hooks while CP-SAT is still searching, and stops the
+    # search once the gap is small enough or the objective has stopped improving.
+    # A hook is any function taking a SolveProgress object; LogProgress and ProvisionalScheduleWriter are provided.
+
+    def __init__(self, solver, Assignment, Shifts, IndividualVolunteers, VolunteerGroups=(), Hooks=(), GapLimit=None,
+                 NoImprovementSeconds=None):
+        # Inputs:
+        #   solver = the cp_model.CpSolver object that will run the search
+        #   Assignment = the SparseAssignment returned by BuildModel
+        #   Shifts = a dictionary of shift objects, indexed by shift names
+        #   IndividualVolunteers = a list of volunteer objects
+        #   VolunteerGroups = a list of VolunteerGroup objects
+        #   Hooks = a list of functions, each called with a SolveProgress object for every improving solution
+        #   GapLimit = stop as soon as a solution is within this relative gap of the best bound
+        #   NoImprovementSeconds = stop once this long has passed without an improving solution, counted from the
+        #                          first solution
+        cp_model.CpSolverSolutionCallback.__init__(self)
+        self.Solver = solver
+        self.Assignment = Assignment
+        self.Shifts = Shifts
+        self.IndividualVolunteers = IndividualVolunteers
+        self.VolunteerGroups = VolunteerGroups
+        self.Hooks = list(Hooks)
+        self.GapLimit = GapLimit
+        self.NoImprovementSeconds = NoImprovementSeconds
+        self.Indices = np.array([x.Index() for x in Assignment.Variables], dtype=np.int64)
+        self.Progress = []  # list of SolveProgress objects, one per improving solution
+        self.StopReason = None
+        self.Start = time.perf_counter()
+        self.LastImprovement = self.Start
+        self.Done = threading.Event()
+
+    def on_solution_callback(self):
+        # This function is called by CP-SAT for each improving solution
+        self.LastImprovement = time.perf_counter()
+
+        progress = SolveProgress()
+        progress.SolutionNumber = len(self.Progress) + 1
+        progress.ObjectiveValue = self.ObjectiveValue()
+        progress.BestBound = self.BestObjectiveBound()
+        progress.Gap = abs(progress.BestBound - progress.ObjectiveValue) / max(abs(progress.ObjectiveValue), 1)
+        progress.Seconds = self.LastImprovement - self.Start
+
+        # Read the whole solution at once, then keep the assignment variables
+        if self.Hooks:
+            values = np.asarray(self.Response().solution, dtype=np.int64)[self.Indices]
+            counts = dict(self.Assignment.FixedCounts)
+            for k in np.flatnonzero(values).tolist():
+                counts[(self.Assignment.Entities[self.Assignment.EntityIds[k]],
+                        self.Assignment.ShiftNames[self.Assignment.ShiftIds[k]])] = int(values[k])
+            progress.Solution = BuildSolution(counts, self.Shifts, self.IndividualVolunteers, self.VolunteerGroups,
+                                              progress.ObjectiveValue)
+
+        self.Progress.append(progress)
+        for hook in self.Hooks:
+            hook(progress)
+
+        # Stop once the schedule is good enough
+        if self.GapLimit is not None and progress.Gap <= self.GapLimit:
+            self.StopReason = 'gap'
+            self.StopSearch()
+
+    def WatchForStall(self):
+        # This function runs in a separate thread and stops the search once it has gone too long without improving.
+        # The clock starts at the first solution, so a long presolve cannot end the search empty-handed.
+        while not self.Done.wait(0.05):
+            if self.Progress and time.perf_counter() - self.LastImprovement >= self.NoImprovementSeconds:
+                self.StopReason = 'no improvement'
+                self.Solver.StopSearch()
+                return
+
+    def Solve(self, model):
+        # This function solves the model, streaming the improving solutions to the hooks
+        # Outputs:
+        #   status = the solver status
+
+        self.Start = self.LastImprovement = time.perf_counter()
+        self.Done.clear()
+        watcher = None
+        if self.NoImprovementSeconds is not None:
+            watcher = threading.Thread(target=self.WatchForStall, daemon=True)
+            watcher.start()
+
+        try:
+            status = self.Solver.Solve(model, self)
+        finally:
+            self.Done.set()
+            if watcher is not None:
+                watcher.join()
+
+        return status
+
+
+def LogProgress(Progress):
+    # This function prints one line per improving solution
+    if Progress.BestBound != Progress.BestBound:  # no bound is known, as in the LNS backend
+        print('Solution %d: objective %s, %1.3fs' % (Progress.SolutionNumber, Progress.ObjectiveValue, Progress.Seconds))
+        return
+
+    print('Solution %d: objective %s, bound %s, gap %1.2f%%, %1.3fs' % (
+        Progress.SolutionNumber, Progress.ObjectiveValue, Progress.BestBound, Progress.Gap * 100, Progress.Seconds))
+
+
+class ProvisionalScheduleWriter():
+    # This class is a hook that exports each improving schedule, so the best schedule so far is always on disk
+
+    def __init__(self, Shifts, OutputDirectory='../exported_files/provisional'):
+        # Inputs:
+        #   Shifts = a dictionary of shift objects, indexed by shift names
+        #   OutputDirectory = the directory to write the provisional schedules to
+        os.makedirs(OutputDirectory, exist_ok=True)
+        self.Shifts = Shifts
+        self.OutputDirectory = OutputDirectory
+
+    def __call__(self, Progress):
+        ExportSchedules(Progress.Solution, self.Shifts, self.OutputDirectory)
@@ -0,0 +1,118 @@
+import numpy as np
+from utils.cp_model import BuildSolution, CalcObjectiveCoefficients, CalculatePreferencePoints
+from utils.flow_model import RaiseIfMultipleShifts, SolveAssignmentFlow
+from utils.y2y_classes import VolunteerGroup
+
+
+def Reoptimize(solution, Shifts, IndividualVolunteers, VolunteerGroups=(), RemovedVolunteers=(), AddedVolunteers=(),
+               ChangedShifts=(), MovePenalty=None):
+    # This function repairs an existing solution after a small change to the roster, re-solving only the shifts and
+    # volunteers affected by the change. Everyone outside that neighborhood keeps their assignment, and volunteers
+    # inside it are penalized for moving away from their current shift. The neighborhood is itself an assignment
+    # problem, so it is solved exactly with a min-cost flow. The repair has no other backend, so a roster in which a
+    # volunteer works more than one shift is refused with a ValueError (see RaiseIfMultipleShifts) and must be solved
+    # again in full.
+    # Inputs:
+    #   solution = the current Solution object
+    #   Shifts = a dictionary of shift objects, indexed by shift names, with any changed required_volunteers
+    #            numbers already updated
+    #   IndividualVolunteers = the list of volunteer objects the current solution was built from
+    #   VolunteerGroups = the list of VolunteerGroup objects the current solution was built from
+    #   RemovedVolunteers = a list of volunteer objects that have dropped out
+    #   AddedVolunteers = a list of new volunteer objects
+    #   ChangedShifts = a list of names of shifts whose required_volunteers number has changed
+    #   MovePenalty = the objective penalty for moving a currently assigned volunteer; defaults to the largest
+    #                 objective coefficient, so a volunteer only moves when that frees room for a better assignment
+    # Outputs:
+    #   (solution, volunteers) = the repaired Solution object and the updated list of individual volunteers
+
+    # Apply the change to the roster
+    removed = set(RemovedVolunteers)
+    volunteers = [v for v in IndividualVolunteers if not v in removed] + list(AddedVolunteers)
+    entities = volunteers + list(VolunteerGroups)
+
+    # The repair is a min-cost flow, which gives each volunteer one shift
+    RaiseIfMultipleShifts(volunteers)
+
+    # Calculate the eligible (volunteer or group, shift) pairs and their objective coefficients exactly as BuildModel
+    # does, so the repaired objective value is comparable with a full solve
+    points = CalculatePreferencePoints(entities, Shifts)
+    coefficients = CalcObjectiveCoefficients(points, Shifts)
+    shift_count = len(points.ShiftNames)
+    entity_index = dict((v, i) for (i, v) in enumerate(entities))
+    shift_index = dict((s, i) for (i, s) in enumerate(points.ShiftNames))
+    pair_index = dict((code, k) for (k, code) in enumerate((points.EntityIds.astype(np.int64) * shift_count +
+                                                             points.ShiftIds).tolist()))
+
+    # Find the affected shifts, starting with the ones the removed volunteers worked and the ones whose requirements
+    # changed
+    affected_shifts = set(shift_index[s] for s in ChangedShifts if s in Shifts)
+    for ((v, s), count) in solution.Counts.items():
+        if v in removed and s in Shifts:
+            affected_shifts.add(shift_index[s])
+
+    # Carry over the current assignments of everyone still on the roster. An assignment that is no longer eligible,
+    # e.g. after a volunteer changed their preferences, is dropped, and its shift and the volunteer's eligible shifts
+    # are re-solved. A group's count is cut to the group's current size.
+    current = np.zeros(len(points), dtype=np.int64)
+    reassigned = list(AddedVolunteers)
+    for ((v, s), count) in solution.Counts.items():
+        if v in removed or not s in Shifts:
+            continue
+
+        k = pair_index.get(entity_index[v] * shift_count + shift_index[s]) if v in entity_index else None
+        if k is None:
+            affected_shifts.add(shift_index[s])
+            if v in entity_index:
+                reassigned.append(v)
+            continue
+
+        if isinstance(v, VolunteerGroup) and count > v.Volunteers:
+            count = v.Volunteers
+            affected_shifts.add(shift_index[s])
+        current[k] = count
+
+    # The new volunteers and the ones who lost their assignment may take any shift they are eligible for
+    for v in reassigned:
+        e = entity_index[v]
+        affected_shifts.update(points.ShiftIds[points.Indptr[e]:points.Indptr[e + 1]].tolist())
+
+    # The neighborhood is every volunteer or group eligible for an affected shift; everyone else keeps their
+    # assignment
+    in_neighborhood = np.zeros(len(entities), dtype=bool)
+    in_neighborhood[points.EntityIds[np.isin(points.ShiftIds, list(affected_shifts))]] = True
+    free = in_neighborhood[points.EntityIds]
+    fixed = ~free & (current > 0)
+    if MovePenalty is None:
+        MovePenalty = int(coefficients[free | fixed].max(initial=0))
+
+    # Find the room left on each shift by the volunteers outside the neighborhood, whose assignments are fixed
+    room = np.array([Shifts[s].required_volunteers for s in points.ShiftNames], dtype=np.int64)
+    room -= np.bincount(points.ShiftIds[fixed], weights=current[fixed], minlength=shift_count).astype(np.int64)
+
+    # Only the neighborhood's volunteers and groups are routed through the network
+    supply = np.array([v.Volunteers if isinstance(v, VolunteerGroup) else min(v.MaxShifts, 1) for v in entities],
+                      dtype=np.int64)
+    supply[~in_neighborhood] = 0
+
+    # Value each neighborhood assignment with the usual objective, plus a bonus for staying on the current shift
+    values = coefficients[free] + np.where(current[free] > 0, MovePenalty, 0)
+
+    # Solve the neighborhood, keeping the current assignments if the network cannot be solved
+    counts = np.where(fixed, current, 0)
+    result = SolveAssignmentFlow(supply, room, points.EntityIds[free], points.ShiftIds[free], values)
+    if result is None:
+        counts[free] = current[free]
+    else:
+        counts[free] = result[0]
+
+    # Calculate the objective value of the repaired solution
+    objective = int(np.dot(coefficients, counts))
+
+    # Collect the non-zero assignments
+    assigned = {}
+    for k in np.flatnonzero(counts).tolist():
+        assigned[(entities[points.EntityIds[k]], points.ShiftNames[points.ShiftIds[k]])] = int(counts[k])
+
+    # Build the repaired solution
+    return (BuildSolution(assigned, Shifts, volunteers, VolunteerGroups, objective), volunteers)
@@ -0,0 +1,465 @@
+import json
+import logging
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from ortools.sat.python import cp_model
+from utils.cp_model import AddVolunteerLimits, BuildModel, BuildSolution, CalcObjectiveCoefficients, \
+    CalculatePreferencePoints, ConfigureSolver, FindShiftConflicts, NormalizeName, SetMaximizeObjective
+from utils.data_processing import BuildShiftDictionary, CapVolunteerGroups, ReadInGroupVolunteerData, \
+    ReadInIndividualVolunteerData
+from utils.pipeline import STATUS_NAMES
+from utils.validation import ValidateSchedule
+from utils.y2y_classes import Volunteer
+
+# The edits the service accepts, and the fields each one needs
+EDIT_FIELDS = {
+    'add_volunteer': ('name', 'shifts'),
+    'remove_volunteer': ('name',),
+    'change_preferences': ('name', 'shifts'),
+    'set_requirement': ('shift', 'required'),
+}
+
+
+class EditError(ValueError):
+    # This class describes a request the client got wrong, such as an edit missing a field or naming an unknown
+    # volunteer. The service answers it with a 400; any other error is a fault of the service and answered with a 500.
+    pass
+
+
+def IsInteger(Value):
+    # Return True for a JSON integer; JSON true and false decode to bool, which Python counts as int
+    return isinstance(Value, int) and not isinstance(Value, bool)
+
+
+class SchedulingSession():
+    # This class keeps a roster and its CP model in memory, and applies edits to the model in place instead of
+    # rebuilding it:
+    #   - a new volunteer gets new decision variables, which are added to their shifts' staffing constraints
+    #   - a removed volunteer's variables are fixed to zero and forgotten
+    #   - changed preferences replace the volunteer's variables
+    #   - a changed shift requirement updates the bound of the shift's staffing constraint
+    # Every solve recalculates the objective and is hinted with the previous schedule. The model is rebuilt from
+    # scratch once the retired variables outnumber the live ones. Group sizes are capped at their shift's requirement,
+    # and re-capped from the original sizes whenever that requirement changes. A batch of edits applies in full or not
+    # at all.
+
+    def __init__(self, Config, PreferencesFile='../data/Updated Preferences.csv',
+                 GroupsFile='../data/Group Volunteers.csv', PeriodsFile='../data/Shift Periods.csv'):
+        # Inputs:
+        #   Config = the SolverConfig object to solve with
+        #   PreferencesFile = the path of the individual preference csv file
+        #   GroupsFile = the path of the volunteer group csv file
+        #   PeriodsFile = the path of the shift period csv file
+        self.Config = Config
+        self.Shifts = BuildShiftDictionary(PeriodsFile)
+        self.IndividualVolunteers = ReadInIndividualVolunteerData(PreferencesFile)
+        self.VolunteerGroups = ReadInGroupVolunteerData(GroupsFile)
+        self.GroupSizes = dict((g, int(g.Volunteers)) for g in self.VolunteerGroups)  # group --> uncapped size
+        CapVolunteerGroups(self.VolunteerGroups, self.Shifts)
+        self.Conflicts = FindShiftConflicts(self.Shifts, Config.MinRestHours)  # edits never move a shift
+
+        self.Solution = None
+        self.Status = None
+        self.SolveTimings = {}  # stage name --> seconds, for the most recent solve
+
+        self.Rebuild()
+        self.Solve()
+
+    def Rebuild(self):
+        # This function builds the model from scratch
+        (self.Model, assignment) = BuildModel(self.IndividualVolunteers, self.Shifts, self.VolunteerGroups,
+                                              MinRestHours=self.Config.MinRestHours)
+        self.Variables = dict(zip(assignment.Keys(), assignment.Variables))  # (entity, shift name) --> variable
+        self.ShiftConstraints = dict(assignment.ShiftConstraints)
+        self.RetiredVariables = 0
+
+    def FindVolunteer(self, Name):
+        # Return the individual volunteer with the given name, matched regardless of case and spacing
+        name = NormalizeName(Name)
+        for v in self.IndividualVolunteers:
+            if NormalizeName(v.Name) == name:
+                return v
+
+        raise EditError('There is no volunteer named %r.' % Name)
+
+    def ValidateEdit(self, Edit):
+        # This function checks an edit before any edit of its batch is applied
+        if not isinstance(Edit, dict) or not isinstance(Edit.get('op'), str) or not Edit['op'] in EDIT_FIELDS:
+            raise EditError('Each edit needs an "op" of %s.' % ', '.join(sorted(EDIT_FIELDS)))
+
+        for field in EDIT_FIELDS[Edit['op']]:
+            if not field in Edit:
+                raise EditError('The %s edit needs a "%s" field.' % (Edit['op'], field))
+
+        if 'name' in Edit and not isinstance(Edit['name'], str):
+            raise EditError('The "name" field must be a volunteer name.')
+
+        if 'shifts' in Edit and not (isinstance(Edit['shifts'], list) and all(
+                isinstance(s, str) for s in Edit['shifts'])):
+            raise EditError('The "shifts" field must be a list of shift names in preference order.')
+
+        if 'max_shifts' in Edit and not (IsInteger(Edit['max_shifts']) and Edit['max_shifts'] >= 0):
+            raise EditError('The "max_shifts" field must be a non-negative integer.')
+
+        if Edit['op'] == 'set_requirement':
+            if not isinstance(Edit['shift'], str) or not Edit['shift'] in self.Shifts:
+                raise EditError('There is no shift named %r.' % (Edit['shift'],))
+            if not (IsInteger(Edit['required']) and Edit['required'] >= 1):
+                raise EditError('The "required" field must be a positive integer.')
+
+    def ApplyEdits(self, Edits):
+        # This function applies a batch of edits to the roster and the model
+        # Inputs:
+        #   Edits = a list of edit dictionaries, e.g. {'op': 'add_volunteer', 'name': 'Ann Lee',
+        #           'shifts': ['Monday Dinner', 'Friday Evening'], 'preferred': False, 'max_shifts': 2}
+
+        # Check the whole batch first, so a bad edit is rejected before the roster is touched. Count the volunteers of
+        # each name as the batch goes, so a volunteer removed by an earlier edit cannot be edited by a later one.
+        names = {}
+        for v in self.IndividualVolunteers:
+            names[NormalizeName(v.Name)] = names.get(NormalizeName(v.Name), 0) + 1
+        for edit in Edits:
+            self.ValidateEdit(edit)
+            if edit['op'] == 'set_requirement':
+                continue
+
+            name = NormalizeName(edit['name'])
+            if edit['op'] == 'add_volunteer':
+                names[name] = names.get(name, 0) + 1
+            elif names.get(name, 0) == 0:
+                raise EditError('There is no volunteer named %r.' % edit['name'])
+            elif edit['op'] == 'remove_volunteer':
+                names[name] -= 1
+
+        # Apply the batch, putting the roster and the model back as they were if an edit fails part way
+        snapshot = self.Snapshot()
+        try:
+            for edit in Edits:
+                self.ApplyEdit(edit)
+
+            # Start again once the model is mostly retired variables
+            if self.RetiredVariables > max(len(self.Variables), 1000):
+                self.Rebuild()
+        except Exception:
+            self.Restore(snapshot)
+            raise
+
+    def ApplyEdit(self, Edit):
+        # This function applies one checked edit to the roster and the model
+        if Edit['op'] == 'add_volunteer':
+            v = Volunteer()
+            v.ID_Number = max([u.ID_Number for u in self.IndividualVolunteers], default=-1) + 1
+            v.Name = str(Edit['name'])
+            v.IsPreferredVolunteer = bool(Edit.get('preferred', False))
+            v.MaxShifts = Edit.get('max_shifts', 1)
+            v.PreferredShifts = list(Edit['shifts'])
+            self.IndividualVolunteers.append(v)
+            self.AddVariables(v)
+
+        elif Edit['op'] == 'remove_volunteer':
+            v = self.FindVolunteer(Edit['name'])
+            self.RetireVariables(v)
+            self.IndividualVolunteers.remove(v)
+
+        elif Edit['op'] == 'change_preferences':
+            v = self.FindVolunteer(Edit['name'])
+            self.RetireVariables(v)
+            v.PreferredShifts = list(Edit['shifts'])
+            if 'preferred' in Edit:
+                v.IsPreferredVolunteer = bool(Edit['preferred'])
+            if 'max_shifts' in Edit:
+                v.MaxShifts = Edit['max_shifts']
+            self.AddVariables(v)
+
+        elif Edit['op'] == 'set_requirement':
+            self.Shifts[Edit['shift']].required_volunteers = Edit['required']
+            if Edit['shift'] in self.ShiftConstraints:
+                constraint = self.Model.Proto().constraints[self.ShiftConstraints[Edit['shift']]]
+                constraint.linear.domain[len(constraint.linear.domain) - 1] = Edit['required']
+
+            # Re-cap the groups working this shift, and their member counts' upper bounds
+            for g in self.VolunteerGroups:
+                if g.AssignedShift == Edit['shift']:
+                    g.Volunteers = min(self.GroupSizes[g], Edit['required'])
+                    x = self.Variables.get((g, Edit['shift']))
+                    if x is not None:
+                        domain = self.Model.Proto().variables[x.Index()].domain
+                        domain[len(domain) - 1] = g.Volunteers
+
+    def Snapshot(self):
+        # This function records the roster and the model, for Restore to put back
+        return {
+            'Model': (self.Model, self.Model.Clone()),
+            'Variables': dict(self.Variables),
+            'ShiftConstraints': dict(self.ShiftConstraints),
+            'RetiredVariables': self.RetiredVariables,
+            'IndividualVolunteers': [(v, v.Name, list(v.PreferredShifts), v.IsPreferredVolunteer, v.MaxShifts)
+                                     for v in self.IndividualVolunteers],
+            'Requirements': dict((s, self.Shifts[s].required_volunteers) for s in self.Shifts),
+            'GroupVolunteers': [(g, g.Volunteers) for g in self.VolunteerGroups],
+        }
+
+    def Restore(self, Snapshot):
+        # This function puts back the roster and the model recorded by Snapshot
+        (self.Model, model) = Snapshot['Model']
+        self.Model.Proto().copy_from(model.Proto())
+        self.Variables = Snapshot['Variables']
+        self.ShiftConstraints = Snapshot['ShiftConstraints']
+        self.RetiredVariables = Snapshot['RetiredVariables']
+
+        self.IndividualVolunteers = []
+        for (v, name, shifts, is_preferred, max_shifts) in Snapshot['IndividualVolunteers']:
+            (v.Name, v.PreferredShifts, v.IsPreferredVolunteer, v.MaxShifts) = (name, shifts, is_preferred, max_shifts)
+            self.IndividualVolunteers.append(v)
+        for (s, required) in Snapshot['Requirements'].items():
+            self.Shifts[s].required_volunteers = required
+        for (g, members) in Snapshot['GroupVolunteers']:
+            g.Volunteers = members
+
+    def AddVariables(self, Volunteer):
+        # This function adds a volunteer's decision variables to the model
+        pairs = []
+        for s in Volunteer.PreferredShifts:
+            if not s in self.Shifts or (Volunteer, s) in self.Variables:
+                continue
+
+            x = self.Model.NewBoolVar('Volunteer %s assigned to %s shift' % (Volunteer.ID_Number, s))
+            self.Variables[(Volunteer, s)] = x
+            pairs.append((s, x))
+
+            # Add the variable to the shift's staffing constraint
+            if s in self.ShiftConstraints:
+                constraint = self.Model.Proto().constraints[self.ShiftConstraints[s]]
+                constraint.linear.vars.append(x.Index())
+                constraint.linear.coeffs.append(1)
+            else:
+                self.ShiftConstraints[s] = self.Model.Add(x <= self.Shifts[s].required_volunteers).Index()
+
+        # Limit the volunteer's number of shifts, and keep their shifts apart
+        AddVolunteerLimits(self.Model, Volunteer, pairs, self.Conflicts)
+
+    def RetireVariables(self, Volunteer):
+        # This function fixes a volunteer's decision variables to zero and forgets them
+        for s in list(Volunteer.PreferredShifts):
+            x = self.Variables.pop((Volunteer, s), None)
+            if x is not None:
+                domain = self.Model.Proto().variables[x.Index()].domain
+                domain[0] = 0
+                domain[1] = 0
+                self.RetiredVariables += 1
+
+    def Solve(self):
+        # This function re-solves the model, hinted with the previous schedule, and stores the new schedule
+        timings = {}
+
+        # Recalculate the objective, since new volunteers and changed shift requirements change the coefficients
+        start = time.perf_counter()
+        points = CalculatePreferencePoints(self.IndividualVolunteers + self.VolunteerGroups, self.Shifts)
+        coefficients = CalcObjectiveCoefficients(points, self.Shifts)
+        keys = [(points.Entities[e], points.ShiftNames[s]) for (e, s) in
+                zip(points.EntityIds.tolist(), points.ShiftIds.tolist())]
+        variables = [self.Variables[key] for key in keys]
+        SetMaximizeObjective(self.Model, variables, coefficients)
+        timings['Objective'] = time.perf_counter() - start
+
+        # Hint the previous schedule
+        start = time.perf_counter()
+        self.Model.ClearHints()
+        if self.Solution is not None:
+            for (key, x) in zip(keys, variables):
+                self.Model.AddHint(x, self.Solution.Counts.get(key, 0))
+        timings['Hints'] = time.perf_counter() - start
+
+        # Solve
+        start = time.perf_counter()
+        solver = cp_model.CpSolver()
+        ConfigureSolver(solver, self.Config)
+        self.Status = solver.Solve(self.Model)
+        timings['Solve'] = time.perf_counter() - start
+
+        # Read out the schedule
+        start = time.perf_counter()
+        counts = {}
+        if self.Status in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+            for (key, x) in zip(keys, variables):
+                value = solver.Value(x)
+                if value > 0:
+                    counts[key] = value
+        self.Solution = BuildSolution(counts, self.Shifts, self.IndividualVolunteers, self.VolunteerGroups,
+                                      solver.ObjectiveValue() if counts else 0)
+        timings['Extract'] = time.perf_counter() - start
+
+        self.SolveTimings = timings
+
+    def Validate(self, Schedule):
+        # This function checks and scores a schedule, e.g. one edited by a coordinator, against the current roster
+        # Inputs:
+        #   Schedule = a list of [volunteer name, list of shift names] pairs, like the 'assignments' of Schedule, or
+        #              a dictionary mapping volunteer names to lists of shift names
+        # Outputs:
+        #   response = a JSON-ready dictionary of the scores and the violations
+
+        rows = list(Schedule.items()) if isinstance(Schedule, dict) else Schedule
+        if not isinstance(rows, list) or not all(
+                isinstance(r, (list, tuple)) and len(r) == 2 and isinstance(r[1], list) for r in rows):
+            raise EditError('The schedule must map volunteer names to lists of shift names.')
+
+        report = ValidateSchedule([(str(name), [str(s) for s in shifts]) for (name, shifts) in rows],
+                                  self.IndividualVolunteers, self.Shifts, self.VolunteerGroups,
+                                  self.Config.MinRestHours)
+        response = report.Summary()
+        response['violation_list'] = [{'constraint': c, 'description': d} for (c, d) in report.Violations]
+        return response
+
+    def Schedule(self):
+        # Return the current schedule as a JSON-ready dictionary
+        return {
+            'status': STATUS_NAMES.get(self.Status, str(self.Status)),
+            'objective': self.Solution.ObjectiveValue,
+            'volunteers': self.Solution.AssignmentsByName(),
+            'assignments': [[name, shifts] for (name, shifts) in self.Solution.AssignmentRows()],
+            'shifts': dict((s, [v.Name for v in self.Solution.ShiftAssignments[s]]) for s in self.Shifts),
+            'understaffed': [s for s in self.Shifts if
+                             len(self.Solution.ShiftAssignments[s]) < self.Shifts[s].required_volunteers],
+        }
+
+
+class RequestMetrics():
+    # This class records the number of requests to each route and how long they took
+
+    def __init__(self):
+        self.Routes = {}  # 'METHOD /path' --> dictionary of the request count and timings in milliseconds
+
+    def Record(self, Route, Seconds):
+        m = self.Routes.setdefault(Route, {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'last_ms': 0.0})
+        milliseconds = Seconds * 1000
+        m['count'] += 1
+        m['total_ms'] += milliseconds
+        m['max_ms'] = max(m['max_ms'], milliseconds)
+        m['last_ms'] = milliseconds
+
+    def Report(self):
+        report = {}
+        for (route, m) in self.Routes.items():
+            report[route] = dict(m, mean_ms=m['total_ms'] / m['count'])
+
+        return report
+
+
+class SchedulingService():
+    # This class routes requests to a SchedulingSession. It does not know about HTTP, so the same requests can be
+    # served over a socket by ServeHTTP or sent directly by a LocalClient. Requests are handled one at a time.
+
+    def __init__(self, Session):
+        self.Session = Session
+        self.Metrics = RequestMetrics()
+        self.Lock = threading.Lock()
+
+    def Handle(self, Method, Path, Body=None):
+        # This function handles one request
+        # Inputs:
+        #   Method = 'GET' or 'POST'
+        #   Path = the route, e.g. '/schedule'
+        #   Body = the decoded JSON body of a POST request
+        # Outputs:
+        #   (code, response) = the HTTP status code and a JSON-ready dictionary
+
+        start = time.perf_counter()
+        with self.Lock:
+            try:
+                if Method == 'GET' and Path == '/schedule':
+                    (code, response) = (200, self.Session.Schedule())
+
+                elif Method == 'GET' and Path == '/metrics':
+                    (code, response) = (200, {
+                        'requests': self.Metrics.Report(),
+                        'last_solve_ms': dict((k, v * 1000) for (k, v) in self.Session.SolveTimings.items()),
+                    })
+
+                elif Method == 'POST' and Path == '/edits':
+                    edits = Body.get('edits') if isinstance(Body, dict) else Body
+                    if not isinstance(edits, list):
+                        raise EditError('The body must be a list of edits, or an object with an "edits" list.')
+                    self.Session.ApplyEdits(edits)
+                    self.Session.Solve()
+                    (code, response) = (200, self.Session.Schedule())
+
+                elif Method == 'POST' and Path == '/validate':
+                    schedule = Body.get('schedule') if isinstance(Body, dict) else None
+                    (code, response) = (200, self.Session.Validate(schedule))
+
+                elif Method == 'POST' and Path == '/solve':
+                    self.Session.Solve()
+                    (code, response) = (200, self.Session.Schedule())
+
+                else:
+                    (code, response) = (404, {'error': 'There is no route %s %s.' % (Method, Path)})
+
+            except EditError as error:
+                (code, response) = (400, {'error': str(error)})
+            except Exception as error:
+                logging.getLogger(__name__).exception('%s %s failed', Method, Path)
+                (code, response) = (500, {'error': 'The service failed: %s' % error})
+
+            self.Metrics.Record('%s %s' % (Method, Path), time.perf_counter() - start)
+
+        return (code, response)
+
+
+class LocalClient():
+    # This class sends requests straight to a SchedulingService, without a network. Bodies and responses are
+    # round-tripped through JSON, exactly as they would be over HTTP.
+
+    def __init__(self, Service):
+        self.Service = Service
+
+    def Get(self, Path):
+        return self.Send('GET', Path)
+
+    def Post(self, Path, Body=None):
+        return self.Send('POST', Path, Body)
+
+    def Send(self, Method, Path, Body=None):
+        body = json.loads(json.dumps(Body)) if Body is not None else None
+        (code, response) = self.Service.Handle(Method, Path, body)
+        return (code, json.loads(json.dumps(response)))
+
+
+def ServeHTTP(Service, Host='127.0.0.1', Port=8765):
+    # This function serves a SchedulingService over HTTP until interrupted
+    # Inputs:
+    #   Service = the SchedulingService object
+    #   Host = the address to listen on; the default only accepts connections from this machine
+    #   Port = the port to listen on
+
+    class Handler(BaseHTTPRequestHandler):
+
+        def do_GET(self):
+            self.Reply(*Service.Handle('GET', self.path))
+
+        def do_POST(self):
+            try:
+                length = int(self.headers.get('Content-Length', 0))
+                body = json.loads(self.rfile.read(length) or b'null')
+            except ValueError:
+                self.Reply(400, {'error': 'The body is not valid JSON.'})
+                return
+            self.Reply(*Service.Handle('POST', self.path, body))
+
+        def Reply(self, Code, Response):
+            data = json.dumps(Response).encode()
+            self.send_response(Code)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):  # keep the console quiet
+            pass
+
+    server = ThreadingHTTPServer((Host, Port), Handler)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
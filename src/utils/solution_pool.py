@@ -0,0 +1,166 @@
+import math
+import time
+import numpy as np
+from ortools.sat.python import cp_model
+from utils.cp_model import BuildModel, BuildSolution, CalculatePreferencePoints, ConfigureSolver
+from utils.data_processing import BuildShiftDictionary, CapVolunteerGroups, ReadInGroupVolunteerData, \
+    ReadInIndividualVolunteerData
+
+
+class PoolSchedule():
+    # This class describes one schedule of a solution pool
+
+    def __init__(self):
+        self.Solution = None  # the Solution object of the schedule
+        self.ObjectiveValue = 0
+        self.Changes = 0  # number of volunteers whose shifts differ from the first schedule's
+
+
+class PoolCollector(cp_model.CpSolverSolutionCallback):
+    # This class collects the distinct schedules found while CP-SAT enumerates the solutions of the model, and stops
+    # the search once enough have been found
+
+    def __init__(self, Variables, Coefficients, Count, Seen):
+        # Inputs:
+        #   Variables = the list of decision variables
+        #   Coefficients = the array of the objective coefficient of each variable
+        #   Count = the number of schedules to collect
+        #   Seen = a set of the signatures of the schedules already in the pool
+        cp_model.CpSolverSolutionCallback.__init__(self)
+        self.Indices = np.array([x.Index() for x in Variables], dtype=np.int64)
+        self.Coefficients = Coefficients
+        self.Count = Count
+        self.Seen = Seen
+        self.Found = []  # list of (objective value, values array) tuples
+
+    def on_solution_callback(self):
+        values = np.asarray(self.Response().solution, dtype=np.int64)[self.Indices]
+
+        # Keep the schedule unless the pool already holds it
+        signature = ScheduleSignature(values)
+        if not signature in self.Seen:
+            self.Seen.add(signature)
+            self.Found.append((int(np.dot(self.Coefficients, values)), values))
+
+        if len(self.Found) >= self.Count:
+            self.StopSearch()
+
+
+def ScheduleSignature(Values):
+    # This function returns a hashable key of a schedule. Each group is a single member count per shift, so two
+    # schedules that only swap a group's interchangeable members have the same values and the same key.
+    return np.flatnonzero(Values).tobytes() + Values[Values != 0].tobytes()
+
+
+def EnumerateSchedules(IndividualVolunteers, Shifts, VolunteerGroups, Config, Count=10, Tolerance=0.0,
+                       TimeBudget=None, Points=None):
+    # This function builds a pool of distinct schedules that are all optimal, or within a tolerance of optimal. It
+    # solves the model once for the best objective, then turns the objective into a constraint and has CP-SAT
+    # enumerate the solutions that meet it until the pool is full or the time budget runs out. The model is built
+    # without the presolve pass, whose fixed assignments would hide alternative optima.
+    # Inputs:
+    #   IndividualVolunteers = a list of volunteer objects
+    #   Shifts = a dictionary of shift objects, indexed by shift names
+    #   VolunteerGroups = a list of VolunteerGroup objects, already capped by CapVolunteerGroups
+    #   Config = the SolverConfig object used for the first solve; the enumeration always uses one search worker
+    #   Count = the most schedules to return
+    #   Tolerance = the fraction of the best objective value a schedule may fall short by
+    #   TimeBudget = the most time in seconds for the whole run; None means no limit
+    #   Points = the PreferencePoints of the volunteers followed by the groups; calculated if not given
+    # Outputs:
+    #   (pool, status) = a list of PoolSchedule objects, starting with the optimal schedule and then in decreasing
+    #                    objective order, and the status of the first solve
+
+    start = time.perf_counter()
+    entities = list(IndividualVolunteers) + list(VolunteerGroups)
+    if Points is None:
+        Points = CalculatePreferencePoints(entities, Shifts)
+
+    # Solve for the best objective
+    (model, assignment) = BuildModel(IndividualVolunteers, Shifts, VolunteerGroups, Points=Points,
+                                     MinRestHours=Config.MinRestHours)
+    solver = cp_model.CpSolver()
+    ConfigureSolver(solver, Config)
+    if TimeBudget is not None:
+        solver.parameters.max_time_in_seconds = min(solver.parameters.max_time_in_seconds, TimeBudget)
+    status = solver.Solve(model)
+    if not status in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+        return ([], status)
+
+    first = np.array([solver.Value(x) for x in assignment.Variables], dtype=np.int64)
+    best = int(np.dot(assignment.Coefficients, first))
+    found = [(best, first)]
+    seen = set([ScheduleSignature(first)])
+
+    # Require the objective to reach the best value, less the tolerance, and enumerate the schedules that do
+    remaining = None if TimeBudget is None else TimeBudget - (time.perf_counter() - start)
+    if Count > 1 and (remaining is None or remaining > 0):
+        model.ClearObjective()
+        model.ClearHints()
+        model.Add(cp_model.LinearExpr.WeightedSum(assignment.Variables, assignment.Coefficients.tolist()) >=
+                  best - math.floor(Tolerance * abs(best)))
+
+        solver = cp_model.CpSolver()
+        ConfigureSolver(solver, Config)
+        solver.parameters.enumerate_all_solutions = True
+        solver.parameters.num_workers = 1
+        if remaining is not None:
+            solver.parameters.max_time_in_seconds = min(solver.parameters.max_time_in_seconds, remaining)
+
+        collector = PoolCollector(assignment.Variables, assignment.Coefficients, Count - 1, seen)
+        solver.Solve(model, collector)
+
+        # List the alternatives best first, in the order they were found among equals
+        found += sorted(collector.Found, key=lambda f: -f[0])
+
+    # Build the schedules, counting each one's changes from the first
+    pool = []
+    for (objective, values) in found:
+        counts = {}
+        for k in np.flatnonzero(values).tolist():
+            counts[(entities[assignment.EntityIds[k]], assignment.ShiftNames[assignment.ShiftIds[k]])] = int(values[k])
+
+        schedule = PoolSchedule()
+        schedule.Solution = BuildSolution(counts, Shifts, IndividualVolunteers, VolunteerGroups, objective)
+        schedule.ObjectiveValue = objective
+        if pool:
+            schedule.Changes = len(DiffSchedules(pool[0].Solution, schedule.Solution))
+        pool.append(schedule)
+
+    return (pool, status)
+
+
+def DiffSchedules(Base, Other):
+    # This function lists the volunteers whose shifts differ between two schedules of the same roster. The volunteers
+    # are compared by their position on the roster, so volunteers who share a name are kept apart.
+    # Inputs:
+    #   Base = the Solution object to compare against
+    #   Other = the Solution object to compare
+    # Outputs:
+    #   differences = a list of (volunteer name, base shift names, other shift names) tuples, in roster order
+
+    differences = []
+    for ((name, base), (_, other)) in zip(Base.AssignmentRows(), Other.AssignmentRows()):
+        if sorted(base) != sorted(other):
+            differences.append((name, base, other))
+
+    return differences
+
+
+def SolveSolutionPool(Config, PreferencesFile='../data/Updated Preferences.csv',
+                      GroupsFile='../data/Group Volunteers.csv', Count=10, Tolerance=0.0, TimeBudget=None,
+                      PeriodsFile='../data/Shift Periods.csv'):
+    # This function reads in a roster and builds its solution pool (see EnumerateSchedules)
+    # Outputs:
+    #   (pool, shifts, status) = the list of PoolSchedule objects, the dictionary of shift objects and the status
+    #                            of the first solve
+
+    shifts = BuildShiftDictionary(PeriodsFile)
+    individual_volunteers = ReadInIndividualVolunteerData(PreferencesFile)
+    group_volunteers = ReadInGroupVolunteerData(GroupsFile)
+    CapVolunteerGroups(group_volunteers, shifts)
+
+    (pool, status) = EnumerateSchedules(individual_volunteers, shifts, group_volunteers, Config, Count, Tolerance,
+                                        TimeBudget)
+
+    return (pool, shifts, status)
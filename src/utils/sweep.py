@@ -0,0 +1,154 @@
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from ortools.sat.python import cp_model
+from utils.cp_model import CalcObjectiveCoefficients, ConfigureSolver, SetMaximizeObjective
+
+# The model each sweep worker process re-solves, parsed once when the worker starts
+WorkerModel = None
+
+
+class SweepPoint():
+    # This class describes the solution found for one pair of objective weights
+
+    def __init__(self):
+        self.Weights = {}  # dictionary of the objective weights, keyed like GetObjectiveWeights
+        self.Values = None  # integer array of the solved value of each decision variable
+        self.Status = cp_model.UNKNOWN
+        self.Coverage = 0.0  # sum over the shifts of the fraction of the shift's requirement that is covered
+        self.PreferencePoints = 0  # total preference points realized
+        self.AssignmentsRealized = 0
+        self.ObjectiveValue = 0  # objective value of the solution under the point's own weights, in the integer
+                                 # units CalcObjectiveCoefficients scales those weights to
+
+
+def InitializeSweepWorker(ModelText):
+    # This function parses the model in a sweep worker process
+    # Inputs:
+    #   ModelText = the model in protobuf text format
+    global WorkerModel
+    WorkerModel = cp_model.CpModel()
+    WorkerModel.Proto().parse_text_format(ModelText)
+
+
+def SolveWeightChunk(WeightGrid, Points, Shifts, Config, Model=None):
+    # This function re-solves the model for each pair of weights in turn, changing only the objective, and hints each
+    # solve with the solution of the previous one
+    # Inputs:
+    #   WeightGrid = a list of weight dictionaries, keyed like GetObjectiveWeights
+    #   Points = the PreferencePoints the model's decision variables were built from, in the same order
+    #   Shifts = a dictionary of shift objects, indexed by shift names
+    #   Config = the SolverConfig object used for each solve
+    #   Model = the CP model object; defaults to the model parsed by InitializeSweepWorker
+    # Outputs:
+    #   points = a list of SweepPoint objects, one per pair of weights
+
+    model = WorkerModel if Model is None else Model
+
+    # The decision variables come first in the model, in the order of the pairs in Points
+    variables = [model.GetIntVarFromProtoIndex(k) for k in range(len(Points))]
+
+    points = []
+    previous = None
+    for weights in WeightGrid:
+
+        # Replace the objective
+        coefficients = CalcObjectiveCoefficients(Points, Shifts, weights)
+        SetMaximizeObjective(model, variables, coefficients)
+
+        # Start from the previous solution
+        model.ClearHints()
+        if previous is not None:
+            for (x, value) in zip(variables, previous.tolist()):
+                model.AddHint(x, value)
+
+        # Solve
+        solver = cp_model.CpSolver()
+        ConfigureSolver(solver, Config)
+        status = solver.Solve(model)
+
+        point = SweepPoint()
+        point.Weights = dict(weights)
+        point.Status = status
+        if status in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+            point.Values = np.array([solver.Value(x) for x in variables], dtype=np.int64)
+            previous = point.Values
+        else:  # no solution was found in time
+            point.Values = np.zeros(len(variables), dtype=np.int64)
+        ScoreSweepPoint(point, Points, Shifts)
+        point.ObjectiveValue = int(np.dot(coefficients, point.Values))
+
+        points.append(point)
+
+    return points
+
+
+def ScoreSweepPoint(Point, Points, Shifts):
+    # This function measures the shift coverage and the preference points realized by a sweep point's solution
+    required = np.array([Shifts[s].required_volunteers for s in Points.ShiftNames], dtype=float)
+
+    Point.AssignmentsRealized = int(Point.Values.sum())
+    Point.Coverage = float(np.sum(Point.Values / required[Points.ShiftIds]))
+    Point.PreferencePoints = int(np.dot(Point.Values, Points.Points))
+
+
+def SweepObjectiveWeights(model, Points, Shifts, WeightGrid, Config, Jobs=1):
+    # This function solves the model for every pair of weights in a grid. The grid is split into Jobs contiguous
+    # chunks, which are solved in parallel worker processes; each worker parses the model once and sweeps its chunk
+    # in order, so each solve is hinted with the solution for the neighboring weights.
+    # Inputs:
+    #   model = the CP model object returned by BuildModel
+    #   Points = the PreferencePoints the model was built from
+    #   Shifts = a dictionary of shift objects, indexed by shift names
+    #   WeightGrid = a list of weight dictionaries, keyed like GetObjectiveWeights
+    #   Config = the SolverConfig object used for each solve
+    #   Jobs = the number of worker processes
+    # Outputs:
+    #   points = a list of SweepPoint objects, in the order of the grid
+
+    # Solve in this process when there is nothing to share out
+    Jobs = max(min(Jobs, len(WeightGrid)), 1)
+    if Jobs == 1:
+        return SolveWeightChunk(WeightGrid, Points, Shifts, Config, model.Clone())
+
+    # Split the grid into contiguous chunks
+    chunks = [list(c) for c in np.array_split(np.arange(len(WeightGrid)), Jobs)]
+    chunks = [[WeightGrid[i] for i in c] for c in chunks]
+
+    # Send the model to each worker once, in text form, and solve the chunks in parallel
+    with ProcessPoolExecutor(max_workers=Jobs, initializer=InitializeSweepWorker,
+                             initargs=(str(model.Proto()),)) as pool:
+        results = pool.map(SolveWeightChunk, chunks, [Points] * Jobs, [Shifts] * Jobs, [Config] * Jobs)
+
+        points = []
+        for chunk_points in results:
+            points.extend(chunk_points)
+
+    return points
+
+
+def FindParetoFront(Points):
+    # This function finds the sweep points that no other point beats on both shift coverage and preference points.
+    # Points with the same coverage and preference points as an earlier one are left out.
+    # Inputs:
+    #   Points = a list of SweepPoint objects
+    # Outputs:
+    #   front = the list of non-dominated SweepPoint objects, in order of decreasing coverage
+
+    # Round the coverage, so sums of the same fractions taken in a different order compare equal
+    def Key(p):
+        return (round(p.Coverage, 9), p.PreferencePoints)
+
+    front = []
+    seen = set()
+    for p in sorted(Points, key=lambda p: (-Key(p)[0], -Key(p)[1])):
+        key = Key(p)
+        if key in seen:
+            continue
+        seen.add(key)
+
+        # Sorted by decreasing coverage, a point is dominated if an earlier front point has at least its preference
+        # points
+        if all(q.PreferencePoints < p.PreferencePoints for q in front):
+            front.append(p)
+
+    return front
@@ -0,0 +1,86 @@
+import csv
+import os
+import random
+from utils.data_processing import BuildShiftDictionary
+
+
+def WriteSyntheticRoster(Directory, Volunteers=200, PreferenceListLength=6, Groups=5, GroupSize=3,
+                         PreferredFraction=0.1, MaxShifts=None, Seed=0,
+                         PeriodsFile='../data/Shift Periods.csv'):
+    # This function writes a synthetic roster shaped like the real input files
+    # Inputs:
+    #   Directory = the directory to write 'Updated Preferences.csv' and 'Group Volunteers.csv' to
+    #   Volunteers = the number of individual volunteers
+    #   PreferenceListLength = the longest preference list; each volunteer lists between 1 and this many shifts
+    #   Groups = the number of volunteer groups
+    #   GroupSize = the number of volunteers in each group
+    #   PreferredFraction = the fraction of volunteers flagged as preferred applicants
+    #   MaxShifts = the most shifts each volunteer works in a week, written to a 'Max Shifts' column; when None the
+    #               column is left out and everyone works at most one shift
+    #   Seed = the random seed
+    #   PeriodsFile = the path of the shift period csv file the volunteers pick their shifts from
+
+    # Create the directory
+    os.makedirs(Directory, exist_ok=True)
+
+    # Instantiate the random number generator
+    rng = random.Random(Seed)
+
+    # Get the list of shift names
+    shift_names = list(BuildShiftDictionary(PeriodsFile))
+
+    # Write the individual preferences, one column per shift with cells such as "2nd choice"
+    with open(os.path.join(Directory, 'Updated Preferences.csv'), mode='w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['Name'] + shift_names + ['Preferred Applicants'] + (['Max Shifts'] if MaxShifts else []))
+
+        for VolunteerIndex in range(Volunteers):
+
+            # Pick the volunteer's preferred shifts in rank order
+            count = rng.randint(1, min(PreferenceListLength, len(shift_names)))
+            ranks = {}
+            for (rank, s) in enumerate(rng.sample(shift_names, count)):
+                ranks[s] = '%s choice' % OrdinalName(rank + 1)
+
+            line = ['Volunteer %d' % (VolunteerIndex + 1)]
+            line += [ranks.get(s, '') for s in shift_names]
+            line += ['TRUE' if rng.random() < PreferredFraction else '']
+            line += [MaxShifts] if MaxShifts else []
+            writer.writerow(line)
+
+    # Write the volunteer groups
+    with open(os.path.join(Directory, 'Group Volunteers.csv'), mode='w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['Shift', 'Group', 'Volunteers'])
+
+        for GroupIndex in range(Groups):
+            writer.writerow([rng.choice(shift_names), 'Group %d' % (GroupIndex + 1), GroupSize])
+
+
+def WriteSyntheticRosters(Directory, Sites=1, Weeks=1, Seed=0, **RosterOptions):
+    # This function writes a synthetic roster for every site and week, to <Directory>/site_<i>/week_<j>
+    # Inputs:
+    #   Directory = the top-level directory
+    #   Sites = the number of sites
+    #   Weeks = the number of weeks per site
+    #   Seed = the random seed of the first roster; each roster gets its own seed
+    #   RosterOptions = the keyword arguments passed on to WriteSyntheticRoster
+    # Outputs:
+    #   directories = the list of roster directories written
+
+    directories = []
+    for SiteIndex in range(Sites):
+        for WeekIndex in range(Weeks):
+            d = os.path.join(Directory, 'site_%d' % (SiteIndex + 1), 'week_%d' % (WeekIndex + 1))
+            WriteSyntheticRoster(d, Seed=Seed + len(directories), **RosterOptions)
+            directories.append(d)
+
+    return directories
+
+
+def OrdinalName(Number):
+    # This function returns the ordinal form of a number, e.g. 1 --> '1st', 12 --> '12th', 22 --> '22nd'
+    if Number % 100 in (11, 12, 13):
+        return '%dth' % Number
+
+    return '%d%s' % (Number, {1: 'st', 2: 'nd', 3: 'rd'}.get(Number % 10, 'th'))
@@ -0,0 +1,133 @@
+import contextlib
+import cProfile
+import io
+import os
+import pstats
+import sys
+import time
+
+try:
+    import resource
+except ImportError:  # not available on windows
+    resource = None
+
+
+def PeakMemoryMB():
+    # This function returns the peak resident memory of the process so far, in MB
+    if resource is None:
+        return 0.0
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    # Linux reports kilobytes, macOS reports bytes
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+class Telemetry():
+    # This class collects a structured report of a run: the wall time and memory of each pipeline stage, the size of
+    # the model, and the solver's statistics. Stages named in ProfileStages are also run under cProfile.
+
+    def __init__(self, ProfileStages=(), ProfileDirectory=None):
+        # Inputs:
+        #   ProfileStages = the names of the stages to profile
+        #   ProfileDirectory = the directory to write each profiled stage's '<stage>.prof' file to; when None, only
+        #                      the summary of the hottest functions is kept in the report
+        self.ProfileStages = set(ProfileStages)
+        self.ProfileDirectory = ProfileDirectory
+        self.Stages = []  # list of dictionaries, one per stage run
+        self.Model = {}
+        self.Solver = {}
+        self.Profiles = {}  # stage name --> list of the hottest functions by cumulative time
+        self.Start = time.perf_counter()
+
+    @contextlib.contextmanager
+    def Stage(self, Name):
+        # This function times the stage run inside its with block, e.g. `with telemetry.Stage('Load'): ...`
+        profiler = cProfile.Profile() if Name in self.ProfileStages else None
+        memory = PeakMemoryMB()
+        start = time.perf_counter()
+        if profiler is not None:
+            profiler.enable()
+
+        try:
+            yield
+        finally:
+            if profiler is not None:
+                profiler.disable()
+
+            self.Stages.append({
+                'stage': Name,
+                'seconds': time.perf_counter() - start,
+                'peak_memory_mb': PeakMemoryMB(),
+                'peak_memory_growth_mb': PeakMemoryMB() - memory,
+            })
+
+            if profiler is not None:
+                self.RecordProfile(Name, profiler)
+
+    def RecordProfile(self, Name, Profiler, Lines=25):
+        # This function keeps the hottest functions of a profiled stage, and writes out the full profile
+        if self.ProfileDirectory is not None:
+            os.makedirs(self.ProfileDirectory, exist_ok=True)
+            Profiler.dump_stats(os.path.join(self.ProfileDirectory, '%s.prof' % Name))
+
+        stats = pstats.Stats(Profiler, stream=io.StringIO())
+        hottest = []
+        for (function, (_, calls, own, cumulative, _)) in sorted(
+                stats.stats.items(), key=lambda item: -item[1][3])[:Lines]:
+            hottest.append({
+                'function': '%s:%d(%s)' % function,
+                'calls': calls,
+                'own_seconds': own,
+                'cumulative_seconds': cumulative,
+            })
+        self.Profiles[Name] = hottest
+
+    def RecordModel(self, model):
+        # This function records the size of a CP model
+        proto = model.Proto()
+        self.Model = {
+            'variables': len(proto.variables),
+            'constraints': len(proto.constraints),
+            'objective_terms': len(proto.objective.vars),
+        }
+
+    def RecordSolver(self, solver, StatusName):
+        # This function records the statistics of a finished solve
+        self.Solver = {
+            'status': StatusName,
+            'objective': solver.ObjectiveValue(),
+        }
+
+        # The LNS backend reports how its objective improved over time, and why it stopped
+        if hasattr(solver, 'Trajectory'):
+            self.Solver['trajectory'] = [{'seconds': t, 'objective': o} for (t, o) in solver.Trajectory]
+            self.Solver['neighborhoods'] = solver.Neighborhoods
+            self.Solver['stop_reason'] = solver.StopReason
+
+        # The min-cost flow and LNS backends only report their objective
+        if hasattr(solver, 'BestObjectiveBound'):
+            self.Solver.update({
+                'best_bound': solver.BestObjectiveBound(),
+                'conflicts': solver.NumConflicts(),
+                'branches': solver.NumBranches(),
+                'wall_time': solver.WallTime(),
+                'user_time': solver.UserTime(),
+            })
+
+    def Report(self):
+        # Return the report as a JSON-ready dictionary
+        return {
+            'total_seconds': time.perf_counter() - self.Start,
+            'peak_memory_mb': PeakMemoryMB(),
+            'stages': self.Stages,
+            'model': self.Model,
+            'solver': self.Solver,
+            'profiles': self.Profiles,
+        }
+
+
+def TimeStage(telemetry, Name):
+    # This function returns the context manager timing a stage, or one that does nothing when telemetry is off
+    return telemetry.Stage(Name) if telemetry is not None else contextlib.nullcontext()
+
@@ -0,0 +1,220 @@
+import itertools
+import operator
+import numpy as np
+from utils.cp_model import CalcObjectiveCoefficients, CalculatePreferencePoints, FindShiftConflicts, NormalizeName
+from utils.y2y_classes import ValidationReport
+
+
+class ScheduleValidator():
+    # This class checks schedules against every constraint of the model and scores them. It does not use the
+    # solver, so a schedule read back from a csv file or edited by hand is checked the same way as one just solved.
+    # The roster is indexed once, when the validator is created, and each schedule is then checked with array
+    # operations over its (volunteer, shift) assignments, so the same roster's schedules can be re-checked after
+    # every edit.
+    # Names are matched regardless of case and spacing, and group members by their placeholder names (see
+    # VolunteerGroup.CreateMembers). A name on the roster more than once matches its volunteers in roster order.
+
+    def __init__(self, IndividualVolunteers, Shifts, VolunteerGroups=(), MinRestHours=1, Points=None):
+        # Inputs:
+        #   IndividualVolunteers = a list of volunteer objects
+        #   Shifts = a dictionary of shift objects, indexed by shift names
+        #   VolunteerGroups = a list of VolunteerGroup objects, already capped by CapVolunteerGroups
+        #   MinRestHours = the least rest in hours between two shifts of a volunteer who works several
+        #   Points = the PreferencePoints of the volunteers followed by the groups; calculated if not given
+        self.MinRestHours = MinRestHours
+        self.ShiftNames = list(Shifts)
+        self.ShiftIndex = dict((s, i) for (i, s) in enumerate(self.ShiftNames))
+        self.Required = np.array([Shifts[s].required_volunteers for s in self.ShiftNames], dtype=np.int64)
+
+        # Score the eligible pairs the way the model does, and sort them for looking up assignments
+        if Points is None:
+            Points = CalculatePreferencePoints(list(IndividualVolunteers) + list(VolunteerGroups), Shifts)
+        self.Points = Points.Points.astype(np.int64)
+        self.Coefficients = CalcObjectiveCoefficients(Points, Shifts)
+        pair_keys = Points.EntityIds.astype(np.int64) * max(len(self.ShiftNames), 1) + Points.ShiftIds
+        self.PairOrder = np.argsort(pair_keys, kind='stable')
+        self.PairKeys = pair_keys[self.PairOrder]
+
+        # List the people on the roster, each with the row of their volunteer or group in Points and their shift limit
+        self.Names = [v.Name for v in IndividualVolunteers]
+        rows = list(range(len(IndividualVolunteers)))
+        limits = [v.MaxShifts for v in IndividualVolunteers]
+        preferred = [v.IsPreferredVolunteer == True for v in IndividualVolunteers]
+        for (GroupIndex, g) in enumerate(VolunteerGroups):
+            for m in g.CreateMembers(0):
+                self.Names.append(m.Name)
+                rows.append(len(IndividualVolunteers) + GroupIndex)
+                limits.append(1)
+                preferred.append(m.IsPreferredVolunteer == True)
+
+        self.Rows = np.array(rows, dtype=np.int64)
+        self.Limits = np.array(limits, dtype=np.int64)
+        self.Preferred = np.array(preferred, dtype=bool)
+
+        # Index the people by their normalized names; the roster's own spellings are looked up directly, so only
+        # edited names need normalizing
+        self.People = {}
+        self.Keys = {}
+        for (PersonIndex, name) in enumerate(self.Names):
+            key = self.Keys.setdefault(name, NormalizeName(name))
+            self.People.setdefault(key, []).append(PersonIndex)
+
+        # ... and the people whose name nobody else shares by their roster spelling
+        self.UniqueNames = dict((self.Names[people[0]], people[0]) for people in self.People.values()
+                                if len(people) == 1)
+
+        # Mark the shifts of each set of conflicting shifts
+        self.Conflicts = FindShiftConflicts(Shifts, MinRestHours)
+        self.ConflictMembers = np.zeros((len(self.ShiftNames), len(self.Conflicts)), dtype=bool)
+        for (ConflictIndex, c) in enumerate(self.Conflicts):
+            self.ConflictMembers[[self.ShiftIndex[s] for s in c], ConflictIndex] = True
+
+    def Validate(self, Schedule):
+        # This function checks and scores one schedule
+        # Inputs:
+        #   Schedule = a list of (volunteer name, list of shift names) tuples, e.g. from ReadInScheduleRows or
+        #              Solution.AssignmentRows; volunteers left out are unassigned
+        # Outputs:
+        #   report = a ValidationReport object
+
+        report = ValidationReport()
+        names = self.Names
+        shift_names = self.ShiftNames
+        shift_count = max(len(shift_names), 1)
+
+        # Match the schedule's names to the people on the roster. A line whose name is the roster's name at the same
+        # position is that person, which matches an exported schedule in one pass; a line with a name only one
+        # person has is that person, which matches a reordered schedule; the other lines take the remaining people
+        # of their name in roster order.
+        lines = list(map(operator.itemgetter(0), Schedule))
+        shift_lists = list(map(operator.itemgetter(1), Schedule))
+        line_people = np.full(len(lines), -1, dtype=np.int64)
+        n = min(len(lines), len(names))
+        same = np.fromiter(map(operator.eq, lines[:n], names[:n]), dtype=bool, count=n)
+        line_people[:n][same] = np.flatnonzero(same)
+
+        rest = np.flatnonzero(line_people < 0)
+        unique = np.fromiter(map(self.UniqueNames.get, [lines[i] for i in rest.tolist()], itertools.repeat(-1)),
+                             dtype=np.int64, count=len(rest))
+        taken = np.zeros(len(names), dtype=bool)
+        taken[line_people[line_people >= 0]] = True
+
+        # A person listed more than once keeps their first line
+        (unique_people, first) = np.unique(unique, return_index=True)
+        first = first[(unique_people >= 0) & ~taken[np.maximum(unique_people, 0)]]
+        line_people[rest[first]] = unique[first]
+        taken[unique[first]] = True
+
+        # Match the lines left one at a time
+        next_person = {}
+        for i in np.flatnonzero(line_people < 0).tolist():
+            key = self.Keys.get(lines[i])
+            if key is None:
+                key = NormalizeName(lines[i])
+
+            people = self.People.get(key)
+            if people is None:
+                report.Violations.append(('Unknown volunteer', '%s is not on the roster.' % lines[i]))
+                continue
+
+            k = next_person.get(key, 0)
+            while k < len(people) and taken[people[k]]:
+                k += 1
+            next_person[key] = k + 1
+            if k >= len(people):
+                report.Violations.append((
+                    'Unknown volunteer', '%s is listed more often than on the roster.' % lines[i]))
+                continue
+
+            line_people[i] = people[k]
+            taken[people[k]] = True
+
+        # List the assignments of the people found
+        lengths = np.fromiter(map(len, shift_lists), dtype=np.int64, count=len(shift_lists))
+        listed = list(itertools.chain.from_iterable(shift_lists))
+        person_ids = np.repeat(line_people, lengths)
+        shift_ids = np.fromiter(map(self.ShiftIndex.get, listed, itertools.repeat(-1)), dtype=np.int64,
+                                count=len(listed))
+        found = np.flatnonzero(person_ids >= 0)
+        listed = [listed[i] for i in found.tolist()] if len(found) < len(listed) else listed
+        (person_ids, shift_ids) = (person_ids[found], shift_ids[found])
+
+        # Drop the shifts that do not exist
+        for i in np.flatnonzero(shift_ids < 0).tolist():
+            report.Violations.append(('Unknown shift', '%s is assigned to %r, which is not a shift.' % (
+                names[person_ids[i]], listed[i])))
+        known = shift_ids >= 0
+        (person_ids, shift_ids) = (person_ids[known], shift_ids[known])
+
+        # Drop the repeated assignments of a volunteer to the same shift, which leaves the assignments sorted by
+        # volunteer
+        (keys, first, repeats) = np.unique(person_ids * shift_count + shift_ids, return_index=True, return_counts=True)
+        for i in first[repeats > 1].tolist():
+            report.Violations.append(('Repeated shift', '%s is assigned to %s more than once.' % (
+                names[person_ids[i]], shift_names[shift_ids[i]])))
+        (person_ids, shift_ids) = (keys // shift_count, keys % shift_count)
+
+        # Look up each assignment among the eligible pairs; a volunteer can only work the shifts they listed
+        wanted = self.Rows[person_ids] * shift_count + shift_ids
+        if len(self.PairKeys) > 0:
+            positions = np.minimum(np.searchsorted(self.PairKeys, wanted), len(self.PairKeys) - 1)
+            eligible = self.PairKeys[positions] == wanted
+        else:
+            (positions, eligible) = (np.zeros(len(wanted), dtype=np.int64), np.zeros(len(wanted), dtype=bool))
+        for i in np.flatnonzero(~eligible).tolist():
+            report.Violations.append(('Not eligible', '%s did not list %s.' % (
+                names[person_ids[i]], shift_names[shift_ids[i]])))
+
+        # Each eligible assignment realizes its pair's preference points and objective coefficient; a group's pair
+        # counts once per member
+        pairs = self.PairOrder[positions[eligible]]
+        report.PreferencePoints = int(self.Points[pairs].sum())
+        report.ObjectiveValue = int(self.Coefficients[pairs].sum())
+
+        # Each volunteer works at most their maximum number of shifts
+        load = np.bincount(person_ids, minlength=len(names))
+        for p in np.flatnonzero(load > self.Limits).tolist():
+            report.Violations.append(('Too many shifts', '%s is assigned to %d shifts, more than their limit of %d.' % (
+                names[p], load[p], self.Limits[p])))
+
+        # ... and never to two shifts too close together, which only the volunteers with several shifts can break
+        conflict_count = max(len(self.Conflicts), 1)
+        several = np.flatnonzero(load[person_ids] > 1)
+        (pair_index, conflict_index) = np.nonzero(self.ConflictMembers[shift_ids[several]])
+        (keys, crowded) = np.unique(person_ids[several[pair_index]] * conflict_count + conflict_index,
+                                    return_counts=True)
+        for key in keys[crowded > 1].tolist():
+            p = key // conflict_count
+            (start, end) = np.searchsorted(person_ids, [p, p + 1])
+            close = [shift_names[s] for s in shift_ids[start:end].tolist()
+                     if shift_names[s] in self.Conflicts[key % conflict_count]]
+            report.Violations.append(('Too little rest', '%s is assigned to %s, less than %s hours apart.' % (
+                names[p], ' and '.join(close), self.MinRestHours)))
+
+        # Each shift takes at most the number of volunteers it requires
+        staffing = np.bincount(shift_ids, minlength=len(shift_names))
+        for s in np.flatnonzero(staffing > self.Required).tolist():
+            report.Violations.append(('Over capacity', '%s has %d volunteers but requires %d.' % (
+                shift_names[s], staffing[s], self.Required[s])))
+
+        # Score the schedule
+        assigned = np.zeros(len(names), dtype=bool)
+        assigned[person_ids] = True
+
+        report.ShiftCount = len(shift_names)
+        report.UnderStaffedShifts = int(np.count_nonzero(staffing < self.Required))
+        report.AssignmentsRequired = int(self.Required.sum())
+        report.AssignmentsRealized = int(np.minimum(staffing, self.Required).sum())
+        report.Volunteers = len(names)
+        report.VolunteersAssigned = int(np.count_nonzero(assigned))
+        report.PreferredVolunteers = int(np.count_nonzero(self.Preferred))
+        report.PreferredVolunteersAssigned = int(np.count_nonzero(assigned & self.Preferred))
+
+        return report
+
+
+def ValidateSchedule(Schedule, IndividualVolunteers, Shifts, VolunteerGroups=(), MinRestHours=1, Points=None):
+    # This function checks and scores one schedule against its roster (see ScheduleValidator)
+    # Outputs:
+    #   report = a ValidationReport object
+    return ScheduleValidator(IndividualVolunteers, Shifts, VolunteerGroups, MinRestHours, Points).Validate(Schedule)
@@ -1,71 +1,238 @@
 class Volunteer():
-    # This class describes individual volunteers
+    # This class describes individual volunteers. Their preference points are calculated for the whole roster at
+    # once by CalculatePreferencePoints, which stores them in a PreferencePoints table.
+    __slots__ = ('ID_Number', 'Name', 'IsPreferredVolunteer', 'PreferredShifts', 'MaxShifts')
 
     def __init__(self):
         self.ID_Number = 0
         self.Name = ''
         self.IsPreferredVolunteer = False
         self.PreferredShifts = []
-        self.ShiftPreferencePoints = {}
+        self.MaxShifts = 1  # the most shifts the volunteer works in a week
 
-    def CalculateShiftPreferencePoints(self, Shifts):
 
-        # Instantiate the dictionary of shift preference points
-        self.ShiftPreferencePoints = {}
+class VolunteerGroup():
+    # This class describes volunteer groups
+    __slots__ = ('ID_Number', 'GroupName', 'AssignedShift', 'Volunteers', 'IsPreferredVolunteer')
 
-        # Initialize a point value of zero for each shift
-        for s in Shifts:
-            self.ShiftPreferencePoints[s] = 0
+    # Group members are scored as if the group's shift were the first choice in a five-shift preference list
+    PreferenceListLength = 5
 
-        # Assign preference points for each of the volunteer's preferred shifts
-        for s in Shifts:
+    def __init__(self):
+        self.ID_Number = 0
+        self.GroupName = ''
+        self.AssignedShift = ''
+        self.Volunteers = 0
+        self.IsPreferredVolunteer = True
 
-            # Check if the current shift is in the volunteer's list of preferred shifts
-            if not s in self.PreferredShifts:  # then it's not there
+    def CreateMembers(self, FirstID_Number):
+        # This function creates a named placeholder volunteer for each member of the group
+        # Inputs:
+        #   FirstID_Number = the ID number of the first member
+        # Outputs:
+        #   members = a list of volunteer objects
 
-                # Assign 0 preference points to this shift for this volunteer
-                self.ShiftPreferencePoints[s] = 0
+        members = []
+        for VolunteerIndex in range(self.Volunteers):
 
-            else:  # the shift *is* in the volunteer's list of preferred shifts
+            # Instantiate a new individual volunteer
+            v = Volunteer()
 
-                # Find the position of the shift in the list
-                index = self.PreferredShifts.index(s)
+            # Assign an ID Number to the volunteer
+            v.ID_Number = FirstID_Number + VolunteerIndex
 
-                # Find the length of the list
-                list_length = len(self.PreferredShifts)
+            # Create a placeholder for the name of the volunteer
+            v.Name = str(self.GroupName + ' Volunteer %d' % (VolunteerIndex + 1))
 
-                # Calculate the number of points corresponding to this index
-                self.ShiftPreferencePoints[
-                    s] = list_length - index  # Index = 0 ==> max points,  Index = Max Index ==> 1 point
+            # Specify them as a preferred volunteer whose only preference is the group's shift
+            v.IsPreferredVolunteer = True
+            v.PreferredShifts = [self.AssignedShift]
 
-                # Check if this is a preferred volunteer
-                if self.IsPreferredVolunteer == True:
-                    # Increase the points
-                    self.ShiftPreferencePoints[s] = self.ShiftPreferencePoints[
-                                                        s] * 2  # This ensures preferential treatment for preferred volunteers
+            members.append(v)
 
+        return members
 
-class VolunteerGroup():
-    # This class describes volunteer groups
+
+class PreferenceTable():
+    # This class describes the preference sheet in compact form
 
     def __init__(self):
-        self.ID_Number = 0
-        self.GroupName = ''
-        self.AssignedShift = ''
-        self.Volunteers = 0
+        self.Names = []  # list of volunteer names, one per row
+        self.IsPreferred = []  # list of booleans, one per row
+        self.ShiftNames = []  # list of shift names, one per column
+        self.Ranks = []  # list of rows of the preference rank in each column; 0 means the shift was not listed
+        self.MaxShifts = []  # list of the most shifts each volunteer works in a week, one per row
+
+
+class PreferencePoints():
+    # This class describes the preference points of every eligible (volunteer or group, shift) pair, stored as a
+    # sparse matrix in compressed row form: row e lists the shifts volunteer or group e can be assigned to, in
+    # preference order
+
+    def __init__(self):
+        self.Entities = []  # list of the volunteer and group objects, one per row; a row's position is its ID
+        self.ShiftNames = []  # list of shift names; a shift's position is its ID
+        self.EntityIds = None  # integer array of the row of each pair
+        self.ShiftIds = None  # integer array of the shift ID of each pair
+        self.Points = None  # integer array of the preference points of each pair
+        self.Indptr = None  # integer array; the pairs of row e are at positions Indptr[e] to Indptr[e + 1]
+        self.UnknownListings = []  # list of (row, shift name) tuples for the listed shifts that do not exist
+        self.DuplicateListings = 0  # number of listings of a shift a volunteer had already listed
+
+    def __len__(self):
+        return len(self.Points)
+
+
+class PresolveResult():
+    # This class describes what the presolve pass removed from or fixed in the model, and the pairs left to solve
+
+    def __init__(self):
+        self.Points = None  # the PreferencePoints of the pairs left to solve
+        self.FixedCounts = {}  # (volunteer or group, shift name) --> number of people fixed to the assignment
+        self.FixedObjective = 0  # objective value of the fixed assignments
+        self.Room = {}  # shift name --> number of people the shift can take after the fixed assignments
+        self.UnknownShifts = {}  # volunteer or group --> list of the listed shift names that do not exist
+        self.DuplicateListings = 0  # number of listings of a shift a volunteer had already listed
+        self.Unmatchable = []  # list of the volunteers and groups without a single shift they can work
+        self.UnlistedShifts = []  # list of the names of the shifts nobody can work
+        self.PairsBefore = 0  # number of eligible pairs before the presolve
+        self.PairsAfter = 0  # number of eligible pairs left to solve
 
 
 class Shift():
     # This class describes shifts
+    __slots__ = ('shift_name', 'required_volunteers', 'start_hour', 'duration_hours')
 
     def __init__(self):
         self.shift_name = ''
         self.required_volunteers = 0
+        self.start_hour = 0  # hours from the start of the week (Sunday 00:00) to the start of the shift
+        self.duration_hours = 0
 
 
 class Period():
     # This class describes periods
+    __slots__ = ('Name', 'RequiredVolunteers', 'StartHour', 'Hours')
 
-    def __init__(self, Name, RequiredVolunteers):
+    def __init__(self, Name, RequiredVolunteers, StartHour=0, Hours=0):
         self.Name = Name
-        self.RequiredVolunteers = RequiredVolunteers
\ No newline at end of file
+        self.RequiredVolunteers = RequiredVolunteers
+        self.StartHour = StartHour  # hour of the day the period starts
+        self.Hours = Hours  # length of the period in hours
+
+
+class Solution():
+    # This class describes a solved shift assignment, extracted once from the solver
+
+    def __init__(self):
+        self.Volunteers = []  # list of all volunteer objects, in roster order
+        self.ShiftAssignments = {}  # shift name --> list of volunteers assigned to the shift
+        self.VolunteerAssignments = {}  # volunteer --> list of shift names the volunteer is assigned to
+        self.Counts = {}  # (volunteer or group, shift name) --> number of people assigned, for the non-zero assignments
+        self.GroupMembers = {}  # volunteer group --> list of the group's placeholder volunteers
+        self.ObjectiveValue = 0
+        self.ShiftCount = 0
+        self.AssignmentsRequired = 0
+        self.AssignmentsRealized = 0
+        self.PreferredAssignmentsRealized = 0
+        self.VolunteersAssigned = 0  # number of volunteers assigned to at least one shift
+        self.PreferredVolunteersAssigned = 0  # number of preferred volunteers assigned to at least one shift
+        self.PreferredVolunteers = 0
+        self.UnderStaffedShifts = 0
+        self.Presolve = None  # the PresolveResult of the model the solution came from, if it was presolved
+
+    def AssignmentsByName(self):
+        # Return a dictionary mapping each volunteer's name to the list of shift names they are assigned to
+        assignments = {}
+        for v in self.Volunteers:
+            assignments[v.Name] = list(self.VolunteerAssignments[v])
+
+        return assignments
+
+    def AssignmentRows(self):
+        # Return the schedule as a list of (volunteer name, shift names) tuples, in roster order; unlike
+        # AssignmentsByName, volunteers who share a name are kept apart
+        return [(v.Name, list(self.VolunteerAssignments[v])) for v in self.Volunteers]
+
+
+class ValidationReport():
+    # This class describes the constraint violations and the quality scores of a schedule, as found by
+    # ValidateSchedule
+
+    def __init__(self):
+        self.Violations = []  # list of (constraint, description) tuples, one per violation
+        self.ShiftCount = 0
+        self.UnderStaffedShifts = 0
+        self.AssignmentsRequired = 0
+        self.AssignmentsRealized = 0  # number of assignments that fill a required place
+        self.Volunteers = 0
+        self.VolunteersAssigned = 0  # number of volunteers assigned to at least one shift
+        self.PreferredVolunteers = 0
+        self.PreferredVolunteersAssigned = 0  # number of preferred volunteers assigned to at least one shift
+        self.PreferencePoints = 0  # preference points realized by the eligible assignments
+        self.ObjectiveValue = 0  # the solver's objective value of the eligible assignments
+
+    def IsValid(self):
+        # Return True when the schedule satisfies every constraint
+        return not self.Violations
+
+    def Summary(self):
+        # Return the scores as a JSON-ready dictionary; a fraction whose denominator is zero is None
+        def Fraction(Numerator, Denominator):
+            return Numerator / Denominator if Denominator > 0 else None
+
+        return {
+            'valid': self.IsValid(),
+            'violations': len(self.Violations),
+            'coverage': Fraction(self.AssignmentsRealized, self.AssignmentsRequired),
+            'shifts_fully_covered': Fraction(self.ShiftCount - self.UnderStaffedShifts, self.ShiftCount),
+            'volunteers_assigned': Fraction(self.VolunteersAssigned, self.Volunteers),
+            'preferred_volunteers_assigned': Fraction(self.PreferredVolunteersAssigned, self.PreferredVolunteers),
+            'preference_points': self.PreferencePoints,
+            'objective': self.ObjectiveValue,
+        }
+
+
+class SolverConfig():
+    # This class describes the solver settings. Settings left at None keep the solver's defaults.
+
+    def __init__(self):
+        self.Backend = 'cp-sat'  # 'cp-sat', 'min-cost-flow' or 'lns' (large neighborhood search, for huge rosters)
+        self.Presolve = True  # simplify the problem with PresolveAssignment before building the model
+        self.MaxTimeInSeconds = None  # wall-clock limit on the solve
+        self.NumSearchWorkers = None  # number of parallel search workers
+        self.RandomSeed = None  # seed for the solver's randomized search
+        self.RelativeGapLimit = None  # stop once (best bound - objective) / objective falls to this value
+        self.NoImprovementSeconds = None  # stop once this long has passed without an improving solution, counted
+                                          # from the first solution
+        self.MinRestHours = 1  # least rest in hours between two shifts of a volunteer who works several; the
+                               # default rules out back-to-back shifts such as Evening followed by Overnight
+        self.LNSTimeLimit = 60  # wall-clock limit of the lns backend when MaxTimeInSeconds is not set; it usually
+                                # stops sooner, once a pass of neighborhoods brings no improvement
+
+    def Settings(self):
+        # Return the settings as a list of (name, value) tuples
+        return [
+            ('Backend', self.Backend),
+            ('Presolve', self.Presolve),
+            ('Max time in seconds', self.MaxTimeInSeconds),
+            ('Num search workers', self.NumSearchWorkers),
+            ('Random seed', self.RandomSeed),
+            ('Relative gap limit', self.RelativeGapLimit),
+            ('No improvement seconds', self.NoImprovementSeconds),
+            ('Min rest hours', self.MinRestHours),
+            ('LNS time limit', self.LNSTimeLimit),
+        ]
+
+
+class HorizonConfig():
+    # This class describes a multi-week planning horizon. Limits left at None are not enforced.
+
+    def __init__(self):
+        self.Weeks = 1  # number of weeks in the horizon
+        self.MaxShiftsPerWeek = 1  # most shifts a volunteer works in one week, unless their own MaxShifts is lower
+        self.MaxShiftsPerSeason = None  # most shifts a volunteer works over the whole horizon
+        self.MinRestHours = 1  # least time between the end of a volunteer's shift and the start of their next one;
+                               # the same default as SolverConfig.MinRestHours
+        self.Window = 1  # number of weeks solved at once; each solve commits its first week. None solves the whole
+                         # horizon in one model.
@@ -0,0 +1,34 @@
+from utils.export_data import *
+from utils.data_processing import *
+from utils.validation import *
+import argparse
+import sys
+import time
+
+# Read the schedule and roster to check from the command line
+parser = argparse.ArgumentParser(description='Check a schedule against every constraint and score it.')
+parser.add_argument('schedule', nargs='?', default='../exported_files/Volunteer-Focused Schedule.csv',
+                    help='volunteer-focused schedule csv, as exported or edited by hand')
+parser.add_argument('--preferences', default='../data/Updated Preferences.csv', help='individual preference csv')
+parser.add_argument('--groups', default='../data/Group Volunteers.csv', help='volunteer group csv')
+parser.add_argument('--periods', default='../data/Shift Periods.csv', help='shift period csv')
+parser.add_argument('--min-rest', type=float, default=1, help='least rest in hours between two shifts')
+arguments = parser.parse_args()
+
+# Read in the roster and the schedule
+shifts = BuildShiftDictionary(arguments.periods)
+individual_volunteers = ReadInIndividualVolunteerData(arguments.preferences)
+group_volunteers = ReadInGroupVolunteerData(arguments.groups)
+CapVolunteerGroups(group_volunteers, shifts)
+schedule = ReadInScheduleRows(arguments.schedule)
+
+# Check and score the schedule
+start = time.perf_counter()
+report = ValidateSchedule(schedule, individual_volunteers, shifts, group_volunteers, arguments.min_rest)
+seconds = time.perf_counter() - start
+
+PrintValidationReport(report)
+print('\nChecked %d assignments in %1.1f ms.' % (sum(len(s) for (_, s) in schedule), seconds * 1000))
+
+# Fail when a constraint is violated, so the check can gate a script
+sys.exit(0 if report.IsValid() else 1)
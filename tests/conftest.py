@@ -0,0 +1,80 @@
+import os
+import sys
+
+import pytest
+
+# The modules are imported as utils.<module> from src, and their default paths are relative to src
+SOURCE_DIRECTORY = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')
+DATA_DIRECTORY = os.path.join(os.path.dirname(SOURCE_DIRECTORY), 'data')
+sys.path.insert(0, SOURCE_DIRECTORY)
+
+from utils.data_processing import CapVolunteerGroups, ReadInGroupVolunteerData, ReadInIndividualVolunteerData
+from utils.synthetic_data import WriteSyntheticRoster
+from utils.y2y_classes import SolverConfig, Volunteer
+
+# The bundled roster's preference and group files
+BUNDLED_ROSTER = (os.path.join(DATA_DIRECTORY, 'Updated Preferences.csv'),
+                  os.path.join(DATA_DIRECTORY, 'Group Volunteers.csv'))
+
+
+def MakeVolunteer(ID_Number, Name, Shifts, MaxShifts=1):
+    # Create a volunteer who lists the given shifts in preference order
+    v = Volunteer()
+    v.ID_Number = ID_Number
+    v.Name = Name
+    v.PreferredShifts = list(Shifts)
+    v.MaxShifts = MaxShifts
+    return v
+
+
+def MakeSyntheticRoster(Directory, **RosterOptions):
+    # Write a synthetic roster and return its preference and group files
+    directory = str(Directory)
+    WriteSyntheticRoster(directory, **RosterOptions)
+    return (os.path.join(directory, 'Updated Preferences.csv'), os.path.join(directory, 'Group Volunteers.csv'))
+
+
+def LoadRoster(PreferencesFile, GroupsFile, Shifts):
+    # Read in a roster's volunteers and groups, with the groups capped at their shifts' requirements
+    individual_volunteers = ReadInIndividualVolunteerData(PreferencesFile)
+    group_volunteers = ReadInGroupVolunteerData(GroupsFile)
+    CapVolunteerGroups(group_volunteers, Shifts)
+    return (individual_volunteers, group_volunteers)
+
+
+def MakeConfig(**Settings):
+    # Create solver settings that give the same schedule on every run, with any settings overridden
+    config = SolverConfig()
+    config.NumSearchWorkers = 1
+    config.RandomSeed = 0
+    for (name, value) in Settings.items():
+        setattr(config, name, value)
+    return config
+
+
+@pytest.fixture
+def config():
+    return MakeConfig()
+
+
+@pytest.fixture(autouse=True)
+def RunFromSource(monkeypatch):
+    # Run each test from src, as the scripts are
+    monkeypatch.chdir(SOURCE_DIRECTORY)
+
+
+def pytest_addoption(parser):
+    parser.addoption('--run-slow', action='store_true', help='also run the tests marked slow')
+
+
+def pytest_configure(config):
+    config.addinivalue_line('markers', 'slow: a test too slow for every run; only run with --run-slow')
+
+
+def pytest_collection_modifyitems(config, items):
+    # Skip the slow tests unless they were asked for
+    if config.getoption('--run-slow'):
+        return
+    for item in items:
+        if 'slow' in item.keywords:
+            item.add_marker(pytest.mark.skip(reason='slow; run with --run-slow'))
@@ -0,0 +1,77 @@
+import time
+
+import pytest
+
+from conftest import BUNDLED_ROSTER, MakeConfig, MakeSyntheticRoster
+from utils.pipeline import STATUS_NAMES, SolveRoster
+from utils.telemetry import Telemetry
+
+
+def SolveWithBackend(Backend, PreferencesFile, GroupsFile):
+    # Solve a roster with one backend, deterministically
+    (solution, _, status) = SolveRoster(MakeConfig(Backend=Backend), PreferencesFile, GroupsFile)
+    assert STATUS_NAMES[status] == 'Optimal'
+    return solution.ObjectiveValue
+
+
+def test_backends_agree_on_bundled_roster():
+    assert SolveWithBackend('cp-sat', *BUNDLED_ROSTER) == SolveWithBackend('min-cost-flow', *BUNDLED_ROSTER)
+
+
+@pytest.mark.parametrize('Seed', [0, 1, 2])
+def test_backends_agree_on_synthetic_roster(tmp_path, Seed):
+    files = MakeSyntheticRoster(tmp_path, Volunteers=150, PreferenceListLength=5, Groups=4, GroupSize=3, Seed=Seed)
+    assert SolveWithBackend('cp-sat', *files) == SolveWithBackend('min-cost-flow', *files)
+
+
+@pytest.mark.parametrize('Seed', [0, 1])
+def test_lns_converges_near_cp_sat(tmp_path, Seed):
+    files = MakeSyntheticRoster(tmp_path, Volunteers=150, PreferenceListLength=5, Groups=4, GroupSize=3, Seed=Seed)
+
+    # Without a time limit, LNS stops once a pass of neighborhoods brings no improvement, well before its 60 second
+    # budget
+    start = time.perf_counter()
+    telemetry = Telemetry()
+    (solution, _, status) = SolveRoster(MakeConfig(Backend='lns'), *files, Telemetry=telemetry)
+    assert time.perf_counter() - start < 30
+    assert STATUS_NAMES[status] == 'Feasible'
+    assert telemetry.Solver['stop_reason'] == 'converged'
+
+    # It cannot beat the optimum, and on a roster this small it should come close
+    optimum = SolveWithBackend('cp-sat', *files)
+    assert solution.ObjectiveValue <= optimum
+    assert solution.ObjectiveValue >= 0.99 * optimum
+
+
+def test_lns_stops_at_its_time_limit(tmp_path):
+    files = MakeSyntheticRoster(tmp_path, Volunteers=150, PreferenceListLength=5, Groups=4, GroupSize=3, Seed=0)
+
+    # Without MaxTimeInSeconds the search is still capped, at LNSTimeLimit
+    for settings in ({'MaxTimeInSeconds': 0.5}, {'LNSTimeLimit': 0.5}):
+        telemetry = Telemetry()
+        start = time.perf_counter()
+        SolveRoster(MakeConfig(Backend='lns', **settings), *files, Telemetry=telemetry)
+        assert time.perf_counter() - start < 10
+        assert telemetry.Solver['stop_reason'] == 'time limit'
+
+
+@pytest.mark.slow
+def test_lns_improves_huge_roster(tmp_path):
+    # A huge roster whose shifts are large enough to be contested, so the greedy start falls short of the optimum.
+    # The monolithic CP-SAT model finds no schedule in this time on one worker; LNS finds one and improves it.
+    periods = tmp_path / 'periods.csv'
+    periods.write_text('Period,Required Volunteers,Start Hour,Hours\nBreakfast,300,7,2\nDinner,300,17,3\n'
+                       'Evening,300,20,3\nOvernight,100,23,8\n')
+    files = MakeSyntheticRoster(tmp_path, Volunteers=20000, PreferenceListLength=12, Groups=20, Seed=0,
+                                PeriodsFile=str(periods))
+
+    # Everyone works one shift, so the min-cost flow gives the optimum
+    (optimum, _, _) = SolveRoster(MakeConfig(Backend='min-cost-flow'), *files, str(periods))
+
+    telemetry = Telemetry()
+    (solution, _, status) = SolveRoster(MakeConfig(Backend='lns', MaxTimeInSeconds=10), *files, str(periods),
+                                        Telemetry=telemetry)
+    assert STATUS_NAMES[status] == 'Feasible'
+    greedy = telemetry.Solver['trajectory'][0]['objective']
+    assert greedy < solution.ObjectiveValue <= optimum.ObjectiveValue
+    assert solution.ObjectiveValue >= 0.9 * optimum.ObjectiveValue
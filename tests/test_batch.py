@@ -0,0 +1,59 @@
+import csv
+
+import pytest
+
+from batch import ReadInManifest, SolveSite, SplitSearchWorkers
+from conftest import BUNDLED_ROSTER
+from utils.export_data import ExportBatchSummary
+
+
+def WriteManifest(Directory, *Rows):
+    path = Directory / 'manifest.csv'
+    path.write_text('\n'.join(['Site,Preferences,Groups,Time Limit'] + list(Rows)) + '\n')
+    return str(path)
+
+
+def test_manifest_paths_are_relative_to_the_manifest(tmp_path):
+    sites = ReadInManifest(WriteManifest(tmp_path, ' north , north/prefs.csv,/data/groups.csv,'))
+    assert sites == [{'Site': 'north', 'Preferences': str(tmp_path / 'north' / 'prefs.csv'),
+                      'Groups': '/data/groups.csv', 'Time Limit': ''}]
+
+
+def test_failed_sites_get_error_rows(tmp_path, config):
+    (preferences, groups) = BUNDLED_ROSTER
+    sites = ReadInManifest(WriteManifest(tmp_path, 'good,%s,%s,' % (preferences, groups),
+                                         'missing,missing.csv,%s,' % groups,
+                                         'bad limit,%s,%s,soon' % (preferences, groups)))
+    summaries = [SolveSite(site, config, str(tmp_path / 'output')) for site in sites]
+
+    # The good site is solved and exported, whatever happens to the others
+    assert summaries[0]['Status'] == 'Optimal'
+    assert summaries[0]['Objective Value'] == 1951
+    assert (tmp_path / 'output' / 'good' / 'Volunteer-Focused Schedule.csv').exists()
+
+    # Each failure is reported on its own row, without results or an export
+    assert summaries[1]['Status'].startswith('Error:') and 'missing.csv' in summaries[1]['Status']
+    assert summaries[2]['Status'].startswith('Error:') and 'soon' in summaries[2]['Status']
+    for summary in summaries[1:]:
+        assert not 'Objective Value' in summary
+        assert summary['Seconds'] >= 0
+    assert not (tmp_path / 'output' / 'missing').exists()
+
+    # The summary leaves the results of the failed sites blank
+    ExportBatchSummary(summaries, str(tmp_path))
+    with open(str(tmp_path / 'Batch Summary.csv'), newline='') as f:
+        rows = list(csv.DictReader(f))
+    assert [row['Site'] for row in rows] == ['good', 'missing', 'bad limit']
+    assert float(rows[0]['Objective Value']) == 1951
+    assert rows[1]['Objective Value'] == rows[2]['Objective Value'] == ''
+
+
+@pytest.mark.parametrize('Jobs, Sites, Cores, Workers', [
+    (4, 10, 16, 4),  # the cores are shared between the jobs
+    (4, 10, 6, 1),  # rounded down
+    (16, 2, 16, 8),  # only two sites ever run at once
+    (32, 100, 8, 1),  # at least one worker
+    (4, 0, 8, 8),
+])
+def test_search_workers_are_split_between_sites(Jobs, Sites, Cores, Workers):
+    assert SplitSearchWorkers(Jobs, Sites, Cores) == Workers
@@ -0,0 +1,68 @@
+import datetime
+import os
+import pickle
+
+import pytest
+
+from conftest import BUNDLED_ROSTER
+from utils.cache import HashInputs, ScheduleCache
+from utils.pipeline import SolveRoster
+from utils.telemetry import Telemetry
+
+
+def test_hit_and_miss(tmp_path):
+    cache = ScheduleCache(str(tmp_path))
+    assert cache.Load('missing') is None
+
+    cache.Store('entry', {'value': [1, 2, 3]})
+    assert cache.Load('entry') == {'value': [1, 2, 3]}
+
+
+@pytest.mark.parametrize('Contents', [
+    b'\x80',  # left incomplete by a crash
+    pickle.dumps(HashInputs).replace(b'HashInputs', b'HashInputz'),  # a function that no longer exists
+    pickle.dumps(HashInputs).replace(b'utils.cache', b'utils.cachz'),  # a module that no longer exists
+    pickle.dumps(datetime.date(2026, 1, 1)).replace(b'\x07\xea\x01\x01', b'\x07\xea\x0d\x01'),  # a bad value
+], ids=['truncated', 'missing function', 'missing module', 'bad value'])
+def test_unreadable_entry_is_a_miss_and_deleted(tmp_path, Contents):
+    cache = ScheduleCache(str(tmp_path))
+    file_name = os.path.join(str(tmp_path), 'broken.pkl')
+    with open(file_name, mode='wb') as f:
+        f.write(Contents)
+
+    assert cache.Load('broken') is None
+    assert not os.path.exists(file_name)
+
+
+def test_least_recently_used_entry_is_evicted(tmp_path):
+    cache = ScheduleCache(str(tmp_path), MaxBytes=10 ** 6)
+    payload = b'x' * 400000
+    cache.Store('first', payload)
+    cache.Store('second', payload)
+
+    # Age both entries, then read the first so the second becomes the least recently used
+    for (age, name) in enumerate(['first', 'second']):
+        os.utime(os.path.join(str(tmp_path), name + '.pkl'), (1000 + age, 1000 + age))
+    assert cache.Load('first') == payload
+
+    # A third entry pushes the cache past its limit
+    cache.Store('third', payload)
+    assert cache.Load('second') is None
+    assert cache.Load('first') == payload
+    assert cache.Load('third') == payload
+
+
+def test_cached_schedule_keeps_presolve_report(tmp_path, config):
+    cache = ScheduleCache(str(tmp_path))
+
+    (solved, _, status) = SolveRoster(config, *BUNDLED_ROSTER, Cache=cache)
+    telemetry = Telemetry()
+    (cached, _, cached_status) = SolveRoster(config, *BUNDLED_ROSTER, Cache=cache, Telemetry=telemetry)
+
+    assert telemetry.Solver['cached']
+    assert cached_status == status
+    assert cached.ObjectiveValue == solved.ObjectiveValue
+    assert cached.AssignmentRows() == solved.AssignmentRows()
+    assert cached.Presolve is not None
+    assert cached.Presolve.PairsAfter == solved.Presolve.PairsAfter
+    assert len(cached.Presolve.FixedCounts) == len(solved.Presolve.FixedCounts)
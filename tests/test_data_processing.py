@@ -0,0 +1,140 @@
+import re
+
+import pytest
+
+from conftest import BUNDLED_ROSTER, MakeSyntheticRoster
+from utils.data_processing import ReadInGroupVolunteerData, ReadInIndividualVolunteerData, ReadInPreferenceTable, \
+    ReadInShiftPeriods
+
+
+def WritePeriods(Directory, *Rows):
+    path = Directory / 'periods.csv'
+    path.write_text('\n'.join(['Period,Required Volunteers,Start Hour,Hours'] + list(Rows)) + '\n')
+    return str(path)
+
+
+def test_periods_are_read(tmp_path):
+    periods = ReadInShiftPeriods(WritePeriods(tmp_path, 'Breakfast,3,7,2', 'Overnight,1,23.5,7.5'))
+    assert [(p.Name, p.RequiredVolunteers, p.StartHour, p.Hours) for p in periods] == [
+        ('Breakfast', 3, 7, 2), ('Overnight', 1, 23.5, 7.5)]
+
+
+@pytest.mark.parametrize('Row', [
+    'Dinner,0,17,3', 'Dinner,-1,17,3', 'Dinner,2.5,17,3', 'Dinner,,17,3', 'Dinner,three,17,3',
+    'Dinner,3,24,3', 'Dinner,3,-1,3', 'Dinner,3,,3',
+    'Dinner,3,17,0', 'Dinner,3,17,-3', 'Dinner,3,17,', 'Dinner,3,17,inf',
+])
+def test_bad_period_is_named(tmp_path, Row):
+    with pytest.raises(ValueError, match='Dinner'):
+        ReadInShiftPeriods(WritePeriods(tmp_path, 'Breakfast,3,7,2', Row))
+
+
+def test_unnamed_period_is_rejected(tmp_path):
+    with pytest.raises(ValueError, match='line 3'):
+        ReadInShiftPeriods(WritePeriods(tmp_path, 'Breakfast,3,7,2', ',3,17,3'))
+
+
+def WritePreferences(Directory, *Rows):
+    path = Directory / 'preferences.csv'
+    path.write_text('\n'.join(['Name,Max Shifts,Monday Dinner'] + list(Rows)) + '\n')
+    return str(path)
+
+
+def test_max_shifts_are_read(tmp_path):
+    table = ReadInPreferenceTable(WritePreferences(tmp_path, 'Ana Diaz,2,1st choice', 'Ben Ng,,1st choice'))
+    assert table.MaxShifts == [2, 1]
+
+
+@pytest.mark.parametrize('Limit', ['0', '-1', '1.5', 'two'])
+def test_bad_max_shifts_are_named(tmp_path, Limit):
+    with pytest.raises(ValueError, match='Ben Ng'):
+        ReadInPreferenceTable(WritePreferences(tmp_path, 'Ana Diaz,2,1st choice', 'Ben Ng,%s,1st choice' % Limit))
+
+
+def test_preference_sheet_with_many_ranks(tmp_path):
+    # Ana ranks twelve shifts, so "10th choice" has to sort after "9th choice" rather than after "1st choice"; Ben
+    # lists a shift without a rank and is a preferred applicant
+    shifts = ['Sunday Breakfast', 'Sunday Dinner', 'Sunday Evening', 'Sunday Overnight', 'Monday Breakfast',
+              'Monday Dinner', 'Monday Evening', 'Monday Overnight', 'Tuesday Breakfast', 'Tuesday Dinner',
+              'Tuesday Evening', 'Tuesday Overnight']
+    ranks = [12, 11, 10, 9, 8, 7, 6, 5, 4, 3, 2, 1]
+    suffixes = dict([(1, 'st'), (2, 'nd'), (3, 'rd')])
+    path = tmp_path / 'preferences.csv'
+    path.write_text('\n'.join([
+        'Name,%s,Preferred Applicants' % ','.join(shifts),
+        'Ana Diaz,%s,FALSE' % ','.join('%d%s choice' % (r, suffixes.get(r, 'th')) for r in ranks),
+        'Ben Ng,,,2nd choice,,,,,,,Available,,1st choice,TRUE',
+        ',,,,,,,,,,,,1st choice,',
+    ]) + '\n')
+
+    table = ReadInPreferenceTable(str(path))
+    assert table.ShiftNames == shifts
+    assert table.Ranks[0] == ranks
+    assert table.Ranks[1] == [0, 0, 2, 0, 0, 0, 0, 0, 0, 13, 0, 1]
+    assert table.IsPreferred == [False, True, False]
+    assert table.Names == ['Ana Diaz', 'Ben Ng', 'nan']
+
+    volunteers = ReadInIndividualVolunteerData(str(path))
+    assert volunteers[0].PreferredShifts == shifts[::-1]
+    assert volunteers[1].PreferredShifts == ['Tuesday Overnight', 'Sunday Evening', 'Tuesday Dinner']
+    assert [v.IsPreferredVolunteer for v in volunteers] == [False, True, False]
+
+
+def ReadInPreferencesWithPandas(csv_name):
+    # Read a preference sheet the way the loader did before it moved to the csv module: (names, shift names, ranks,
+    # preferred flags)
+    pandas = pytest.importorskip('pandas')
+    data = pandas.read_csv(csv_name, dtype=object)
+    shift_columns = [c for c in data.columns if c not in ('Name', 'Preferred Applicants', 'Max Shifts')]
+
+    label_ranks = {}
+    for label in pandas.unique(data[shift_columns].to_numpy(dtype=object).ravel()):
+        if isinstance(label, str):
+            match = re.search(r'\d+', label)
+            label_ranks[label] = int(match.group()) if match else None
+    unranked = max([r for r in label_ranks.values() if r is not None], default=0) + 1
+
+    ranks = [[0 if not isinstance(cell, str) else label_ranks[cell] or unranked for cell in row]
+             for row in data[shift_columns].to_numpy(dtype=object).tolist()]
+    # Convert the missing cells with str, as astype(str) did before pandas 3
+    if 'Preferred Applicants' in data.columns:
+        flags = [str(f).strip().upper() in ('TRUE', '1', '1.0', 'YES') for f in data['Preferred Applicants']]
+    else:
+        flags = [False] * len(data)
+    return ([str(n) for n in data['Name']], shift_columns, ranks, flags)
+
+
+def ReadInGroupsWithPandas(csv_name):
+    pandas = pytest.importorskip('pandas')
+    data = pandas.read_csv(csv_name)
+    return [(row['Group'], row['Shift'], int(row['Volunteers'])) for (_, row) in data.iterrows()]
+
+
+@pytest.mark.parametrize('Roster', ['bundled', 'synthetic', 'awkward'])
+def test_csv_loader_matches_pandas(tmp_path, Roster):
+    if Roster == 'bundled':
+        (preferences, groups) = BUNDLED_ROSTER
+    elif Roster == 'synthetic':
+        (preferences, groups) = MakeSyntheticRoster(tmp_path, Volunteers=300, PreferenceListLength=12, Groups=6,
+                                                    MaxShifts=3, Seed=0)
+    else:
+        # A byte order mark, missing-value markers, a short line, a blank line, quoted commas, spaces and a rank
+        # without a number
+        preferences = str(tmp_path / 'preferences.csv')
+        with open(preferences, mode='w', encoding='utf-8-sig', newline='') as f:
+            f.write('Name,Monday Dinner,Friday Dinner,Preferred Applicants\n'
+                    '"Diaz, Ana",1st choice,NA,TRUE\n'
+                    'Ben Ng,n/a,10th choice, yes \n'
+                    '\n'
+                    'Cal Ruiz,Any shift\n'
+                    'NULL,2nd choice,,1.0\n'
+                    '  Dee Park  , 1st choice ,null,false\n')
+        groups = str(tmp_path / 'groups.csv')
+        with open(groups, mode='w', newline='') as f:
+            f.write('Shift,Group,Volunteers\nThursday Dinner,"Club, The",5\nMonday Dinner,Team,2.0\n')
+
+    table = ReadInPreferenceTable(preferences)
+    assert (table.Names, table.ShiftNames, [list(r) for r in table.Ranks], table.IsPreferred) == \
+        ReadInPreferencesWithPandas(preferences)
+    assert [(g.GroupName, g.AssignedShift, g.Volunteers) for g in ReadInGroupVolunteerData(groups)] == \
+        ReadInGroupsWithPandas(groups)
@@ -0,0 +1,102 @@
+import csv
+import json
+import os
+import sys
+
+import pytest
+
+from conftest import BUNDLED_ROSTER, MakeSyntheticRoster, MakeVolunteer
+from utils.cp_model import BuildSolution
+from utils.data_processing import BuildShiftDictionary
+from utils.export_data import ASSIGNMENT_COLUMNS, BuildAssignmentTable, ExportSchedules, \
+    ExportShiftFocusedSchedule, ExportVolunteerFocusedSchedule
+from utils.pipeline import SolveRoster
+
+
+def WriteReferenceSchedules(solution, Shifts, OutputDirectory):
+    # Write both CSVs line by line from the solution, as the exporters did before the assignment table
+    terminator = {'lineterminator': '\n'} if 'win' in sys.platform else {}
+
+    with open(os.path.join(OutputDirectory, 'Volunteer-Focused Schedule.csv'), mode='w') as f:
+        writer = csv.writer(f, delimiter=',', **terminator)
+        writer.writerow(['Volunteer', 'Assignment'])
+        for v in solution.Volunteers:
+            writer.writerow([v.Name] + (solution.VolunteerAssignments[v] or ['Unassigned']))
+
+    with open(os.path.join(OutputDirectory, 'Shift-Focused Schedule.csv'), mode='w') as f:
+        writer = csv.writer(f, delimiter=',', **terminator)
+        largest = max([s.required_volunteers for s in Shifts.values()])
+        writer.writerow(['Shift'] + ['Volunteer %d' % v for v in range(1, largest + 1)] + ['Notes'])
+        for s in Shifts:
+            names = [v.Name for v in solution.ShiftAssignments[s]]
+            if len(names) < Shifts[s].required_volunteers:
+                names += [' '] * (largest - len(names)) + ['Warning: this shift is under-staffed.']
+            writer.writerow([s] + names)
+
+
+def MakeSmallRoster(Directory):
+    # Volunteers work up to three shifts, yet the roster is too small to staff every shift, and the preference lists
+    # are short enough to leave some volunteers without a shift
+    return MakeSyntheticRoster(Directory, Volunteers=30, PreferenceListLength=4, Groups=2, MaxShifts=3, Seed=0)
+
+
+@pytest.mark.parametrize('Roster', ['bundled', 'synthetic'])
+def test_csv_output_is_unchanged(tmp_path, config, Roster):
+    if Roster == 'bundled':
+        files = BUNDLED_ROSTER
+    else:
+        files = MakeSmallRoster(tmp_path)
+    (solution, shifts, _) = SolveRoster(config, *files)
+
+    (reference, exported) = (tmp_path / 'reference', tmp_path / 'exported')
+    reference.mkdir()
+    exported.mkdir()
+    WriteReferenceSchedules(solution, shifts, str(reference))
+    table = ExportSchedules(solution, shifts, str(exported))
+
+    for name in ('Volunteer-Focused Schedule.csv', 'Shift-Focused Schedule.csv'):
+        assert (exported / name).read_bytes() == (reference / name).read_bytes()
+
+    # The single-view exporters write the same files from the table
+    ExportVolunteerFocusedSchedule(table, str(reference))
+    ExportShiftFocusedSchedule(table, shifts, str(reference))
+    for name in ('Volunteer-Focused Schedule.csv', 'Shift-Focused Schedule.csv'):
+        assert (exported / name).read_bytes() == (reference / name).read_bytes()
+
+
+def test_unlisted_shift_has_no_rank():
+    # Ana lists Monday Dinner twice and is assigned Friday Dinner by hand; Ben has no shift
+    ana = MakeVolunteer(0, 'Ana Diaz', ['Tuesday Dinner', 'Monday Dinner', 'Monday Dinner'], MaxShifts=3)
+    ben = MakeVolunteer(1, 'Ben Ng', ['Monday Dinner'])
+    solution = BuildSolution({(ana, 'Monday Dinner'): 1, (ana, 'Friday Dinner'): 1}, BuildShiftDictionary(),
+                             [ana, ben])
+
+    table = BuildAssignmentTable(solution)
+    assert list(zip(table['Volunteer'], table['Shift'], table['Rank'], table['Points'])) == [
+        ('Ana Diaz', 'Monday Dinner', 2, 2), ('Ana Diaz', 'Friday Dinner', None, 0), ('Ben Ng', None, None, 0)]
+
+
+@pytest.mark.parametrize('Format', ['jsonl', 'parquet', 'arrow'])
+def test_assignment_table_round_trip(tmp_path, config, Format):
+    (solution, shifts, _) = SolveRoster(config, *MakeSmallRoster(tmp_path))
+    table = ExportSchedules(solution, shifts, str(tmp_path), [Format])
+    assert solution.UnderStaffedShifts > 0
+    assert None in table['Shift']
+    assert max(len(a) for a in solution.VolunteerAssignments.values()) > 1
+
+    if Format == 'jsonl':
+        with open(str(tmp_path / 'Assignments.jsonl')) as f:
+            rows = [json.loads(line) for line in f]
+        assert [list(row) for row in rows] == [ASSIGNMENT_COLUMNS] * len(rows)
+        assert dict((c, [row[c] for row in rows]) for c in ASSIGNMENT_COLUMNS) == table
+        return
+
+    pyarrow = pytest.importorskip('pyarrow')
+    if Format == 'parquet':
+        import pyarrow.parquet
+        read = pyarrow.parquet.read_table(str(tmp_path / 'Assignments.parquet'))
+    else:
+        import pyarrow.ipc
+        read = pyarrow.ipc.open_file(str(tmp_path / 'Assignments.arrow')).read_all()
+    assert read.column_names == ASSIGNMENT_COLUMNS
+    assert read.to_pydict() == table
@@ -0,0 +1,46 @@
+from conftest import MakeVolunteer
+from utils.cp_model import ApplySolutionHints, BuildModel
+from utils.data_processing import BuildShiftDictionary
+from utils.y2y_classes import VolunteerGroup
+
+
+def MakeGroup(ID_Number, GroupName, AssignedShift, Volunteers):
+    g = VolunteerGroup()
+    (g.ID_Number, g.GroupName, g.AssignedShift, g.Volunteers) = (ID_Number, GroupName, AssignedShift, Volunteers)
+    return g
+
+
+def Hints(Model, Assignment):
+    # Return the hinted value of each (volunteer or group, shift) pair
+    hint = Model.Proto().solution_hint
+    values = dict(zip(hint.vars, hint.values))
+    return dict((key, values[x.Index()]) for (key, x) in zip(Assignment.Keys(), Assignment.Variables))
+
+
+def test_hints_match_names_regardless_of_case_and_spacing():
+    ana = MakeVolunteer(0, 'Ana  Diaz', ['Monday Dinner', 'Friday Dinner'])
+    ben = MakeVolunteer(1, 'Ben Ng', ['Monday Dinner'])
+    (model, assignment) = BuildModel([ana, ben], BuildShiftDictionary())
+
+    # Cal has left the roster, and Ben's old shift is one he no longer lists
+    hinted = ApplySolutionHints(model, assignment, {' ana diaz ': ['Friday Dinner'], 'BEN NG': ['Tuesday Dinner'],
+                                                    'Cal Ruiz': ['Monday Dinner']})
+    assert hinted == 1
+
+    # Every variable is hinted, so the hint describes a complete schedule
+    assert Hints(model, assignment) == {(ana, 'Monday Dinner'): 0, (ana, 'Friday Dinner'): 1,
+                                        (ben, 'Monday Dinner'): 0}
+
+
+def test_group_hint_counts_placeholder_members():
+    group = MakeGroup(1, 'Harvard Caribbean Club', 'Thursday Dinner', 3)
+    (model, assignment) = BuildModel([], BuildShiftDictionary(), [group])
+
+    # Two of the group's three placeholder members worked its shift; a fourth member is beyond the group's size
+    hinted = ApplySolutionHints(model, assignment, {
+        'Harvard Caribbean Club Volunteer 1': ['Thursday Dinner'],
+        'harvard caribbean club volunteer 3': ['Thursday Dinner'],
+        'Harvard Caribbean Club Volunteer 4': ['Thursday Dinner'],
+    })
+    assert hinted == 1
+    assert Hints(model, assignment) == {(group, 'Thursday Dinner'): 2}
@@ -0,0 +1,69 @@
+import pytest
+
+from conftest import BUNDLED_ROSTER, LoadRoster, MakeConfig, MakeVolunteer
+from utils.data_processing import BuildShiftDictionary
+from utils.horizon import SolveHorizon
+from utils.y2y_classes import HorizonConfig
+
+
+def MakeHorizon(Weeks, Window, **Limits):
+    horizon = HorizonConfig()
+    horizon.Weeks = Weeks
+    horizon.Window = Window
+    for (name, value) in Limits.items():
+        setattr(horizon, name, value)
+    return horizon
+
+
+def test_rolling_horizon_commits_each_week_once():
+    shifts = BuildShiftDictionary()
+    (individual_volunteers, group_volunteers) = LoadRoster(*BUNDLED_ROSTER, shifts)
+
+    # Each two-week window commits its first week; the last window is cut short by the horizon
+    (rolling, horizon_shifts, report) = SolveHorizon(individual_volunteers, shifts, group_volunteers,
+                                                     MakeHorizon(3, 2), MakeConfig())
+    assert [(first, span) for (first, span, _, _) in report] == [(1, 2), (2, 2), (3, 1)]
+    assert len(horizon_shifts) == 3 * len(shifts)
+
+    # Every week is staffed, and no more than each shift requires
+    for week in (1, 2, 3):
+        assert any(rolling.ShiftAssignments['Week %d %s' % (week, s)] for s in shifts)
+    for (name, assigned) in rolling.ShiftAssignments.items():
+        assert len(assigned) <= horizon_shifts[name].required_volunteers
+
+    # Committing week by week can only do as well as solving the horizon at once
+    (monolithic, _, report) = SolveHorizon(individual_volunteers, shifts, group_volunteers, MakeHorizon(3, None),
+                                           MakeConfig())
+    assert len(report) == 1
+    assert rolling.ObjectiveValue <= monolithic.ObjectiveValue
+
+
+@pytest.mark.parametrize('Window', [1, None])
+def test_season_limit_carries_across_weeks(Window):
+    ana = MakeVolunteer(0, 'Ana Diaz', ['Monday Dinner'])
+    (solution, _, _) = SolveHorizon([ana], BuildShiftDictionary(), [], MakeHorizon(3, Window, MaxShiftsPerSeason=2),
+                                    MakeConfig())
+
+    assert len(solution.VolunteerAssignments[ana]) == 2
+    if Window is not None:
+        # The rolling horizon uses up the season in the first two weeks
+        assert solution.VolunteerAssignments[ana] == ['Week 1 Monday Dinner', 'Week 2 Monday Dinner']
+
+
+@pytest.mark.parametrize('Window', [1, None])
+@pytest.mark.parametrize('MinRestHours', [0, 1])
+def test_min_rest_holds_across_week_boundary(Window, MinRestHours):
+    # Saturday Overnight ends at 07:00 on Sunday, when the next week's Sunday Breakfast starts
+    ana = MakeVolunteer(0, 'Ana Diaz', ['Saturday Overnight', 'Sunday Breakfast'], MaxShifts=2)
+    (solution, horizon_shifts, _) = SolveHorizon(
+        [ana], BuildShiftDictionary(), [], MakeHorizon(2, Window, MaxShiftsPerWeek=2, MinRestHours=MinRestHours),
+        MakeConfig())
+
+    assigned = solution.VolunteerAssignments[ana]
+    assert len(assigned) == (4 if MinRestHours == 0 else 3)
+
+    # No two of Ana's shifts are closer than the minimum rest
+    times = sorted((horizon_shifts[s].start_hour, horizon_shifts[s].start_hour + horizon_shifts[s].duration_hours)
+                   for s in assigned)
+    for ((_, end), (start, _)) in zip(times, times[1:]):
+        assert start >= end + MinRestHours
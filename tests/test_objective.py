@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+from conftest import MakeVolunteer
+from utils.cp_model import MAX_OBJECTIVE_MAGNITUDE, CalcObjectiveCoefficients, CalcObjectiveScalar, \
+    CalculatePreferencePoints, ValidateObjectiveCoefficients
+from utils.data_processing import BuildShiftDictionary
+
+
+def BuildShifts(Sizes):
+    # Build a week of shifts from the bundled periods, with each shift's size replaced in turn by one of Sizes
+    shifts = BuildShiftDictionary()
+    for (ShiftIndex, s) in enumerate(shifts.values()):
+        s.required_volunteers = Sizes[ShiftIndex % len(Sizes)]
+    return shifts
+
+
+def test_scalar_is_least_common_multiple():
+    assert CalcObjectiveScalar(BuildShifts([3, 1])) == 3
+    assert CalcObjectiveScalar(BuildShifts([4, 6])) == 12
+    assert CalcObjectiveScalar(BuildShifts([1, 2, 3, 4, 5, 6, 8, 10, 12])) == 120
+
+
+@pytest.mark.parametrize('Size', [0, -2])
+def test_shift_without_volunteers_is_rejected(Size):
+    shifts = BuildShifts([3])
+    shifts['Monday Dinner'].required_volunteers = Size
+    with pytest.raises(ValueError, match='Monday Dinner'):
+        CalcObjectiveScalar(shifts)
+
+    points = CalculatePreferencePoints([MakeVolunteer(0, 'Ana Diaz', ['Monday Dinner'])], shifts)
+    with pytest.raises(ValueError, match='Monday Dinner'):
+        CalcObjectiveCoefficients(points, shifts)
+
+
+def test_common_factor_is_divided_out():
+    shifts = BuildShifts([3, 1, 2])
+    volunteers = [MakeVolunteer(0, 'Ana Diaz', ['Monday Overnight', 'Monday Dinner', 'Tuesday Breakfast']),
+                  MakeVolunteer(1, 'Ben Ng', ['Friday Evening', 'Monday Dinner'])]
+    points = CalculatePreferencePoints(volunteers, shifts)
+
+    # Scaling both weights by the same factor gives the same coefficients
+    base = CalcObjectiveCoefficients(points, shifts, {'Maximize the shift coverage': 10,
+                                                      'Respect the volunteer preferences': 1})
+    scaled = CalcObjectiveCoefficients(points, shifts, {'Maximize the shift coverage': 70,
+                                                        'Respect the volunteer preferences': 7})
+    assert scaled.tolist() == base.tolist()
+
+
+def test_objective_overflow_is_rejected():
+    shifts = BuildShifts([3])
+    points = CalculatePreferencePoints([MakeVolunteer(0, 'Ana Diaz', ['Monday Dinner'])], shifts)
+
+    # The coefficient itself is too large
+    with pytest.raises(ValueError, match='exceeds the solver limit'):
+        CalcObjectiveCoefficients(points, shifts, {'Maximize the shift coverage': 2 ** 62,
+                                                   'Respect the volunteer preferences': 1})
+
+    # Each coefficient fits, but the objective summed over the variables' ranges does not
+    ValidateObjectiveCoefficients(np.array([MAX_OBJECTIVE_MAGNITUDE // 4]), np.array([4]))
+    with pytest.raises(ValueError, match='exceeds the solver limit'):
+        ValidateObjectiveCoefficients(np.array([MAX_OBJECTIVE_MAGNITUDE // 4, 2 ** 40]), np.array([4, 4]))
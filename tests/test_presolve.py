@@ -0,0 +1,44 @@
+import pytest
+
+from conftest import BUNDLED_ROSTER, MakeConfig, MakeSyntheticRoster, MakeVolunteer
+from utils.cp_model import CalculatePreferencePoints, PresolveAssignment
+from utils.data_processing import BuildShiftDictionary
+from utils.pipeline import STATUS_NAMES, SolveRoster
+
+
+def SolveWithPresolve(Presolve, PreferencesFile, GroupsFile):
+    # Solve a roster with or without the presolve pass, deterministically
+    (solution, _, status) = SolveRoster(MakeConfig(Presolve=Presolve), PreferencesFile, GroupsFile)
+    assert STATUS_NAMES[status] == 'Optimal'
+    return solution
+
+
+def test_presolve_keeps_objective_on_bundled_roster():
+    presolved = SolveWithPresolve(True, *BUNDLED_ROSTER)
+    assert presolved.Presolve.FixedCounts
+    assert presolved.ObjectiveValue == SolveWithPresolve(False, *BUNDLED_ROSTER).ObjectiveValue
+
+
+@pytest.mark.parametrize('Seed', [0, 1, 2])
+def test_presolve_keeps_objective_on_synthetic_roster(tmp_path, Seed):
+    # A small roster leaves many shifts uncontested, so many volunteers are fixed
+    files = MakeSyntheticRoster(tmp_path, Volunteers=40, PreferenceListLength=4, Groups=3, GroupSize=2, Seed=Seed)
+    assert SolveWithPresolve(True, *files).ObjectiveValue == SolveWithPresolve(False, *files).ObjectiveValue
+
+
+def test_uncontested_best_choice_is_fixed():
+    shifts = BuildShiftDictionary()
+
+    # Nobody else wants Monday Overnight, Ana's first choice; Cal and Dee compete for Tuesday Overnight, which takes
+    # a single volunteer
+    ana = MakeVolunteer(0, 'Ana Diaz', ['Monday Overnight', 'Tuesday Overnight'])
+    cal = MakeVolunteer(1, 'Cal Ruiz', ['Tuesday Overnight'])
+    dee = MakeVolunteer(2, 'Dee Park', ['Tuesday Overnight'])
+    presolve = PresolveAssignment(CalculatePreferencePoints([ana, cal, dee], shifts), shifts)
+
+    assert presolve.FixedCounts == {(ana, 'Monday Overnight'): 1}
+    assert presolve.Room['Monday Overnight'] == 0
+
+    # Ana's other pair is gone, and the contested pairs are left to the solver
+    assert presolve.PairsBefore == 4
+    assert presolve.PairsAfter == 2
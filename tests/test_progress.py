@@ -0,0 +1,48 @@
+import threading
+import time
+
+from conftest import BUNDLED_ROSTER, MakeConfig, MakeVolunteer
+from utils.cp_model import BuildModel
+from utils.data_processing import BuildShiftDictionary
+from utils.pipeline import STATUS_NAMES, SolveRoster
+from utils.progress import ProgressCallback, SolveProgress
+
+
+class StopRecorder():
+    # A stand-in for the CpSolver that records when the search is stopped
+    def __init__(self):
+        self.Stopped = threading.Event()
+
+    def StopSearch(self):
+        self.Stopped.set()
+
+
+def test_stall_watcher_waits_for_the_first_solution():
+    shifts = BuildShiftDictionary()
+    (_, assignment) = BuildModel([MakeVolunteer(0, 'Ana Diaz', ['Monday Dinner'])], shifts)
+    solver = StopRecorder()
+    callback = ProgressCallback(solver, assignment, shifts, [], NoImprovementSeconds=0.1)
+
+    watcher = threading.Thread(target=callback.WatchForStall, daemon=True)
+    watcher.start()
+    try:
+        # Well past the stall limit, but without a solution the search goes on
+        assert not solver.Stopped.wait(0.5)
+        assert callback.StopReason is None
+
+        # Once a solution is found, the clock starts from it
+        callback.LastImprovement = time.perf_counter()
+        callback.Progress.append(SolveProgress())
+        assert solver.Stopped.wait(5)
+        assert time.perf_counter() - callback.LastImprovement >= 0.1
+        assert callback.StopReason == 'no improvement'
+    finally:
+        callback.Done.set()
+        watcher.join()
+
+
+def test_short_stall_limit_still_finds_a_schedule():
+    # The limit is shorter than the time to the first solution
+    (solution, _, status) = SolveRoster(MakeConfig(NoImprovementSeconds=0.001), *BUNDLED_ROSTER)
+    assert STATUS_NAMES[status] in ('Optimal', 'Feasible')
+    assert solution.ObjectiveValue > 0
@@ -0,0 +1,100 @@
+import pytest
+from ortools.sat.python import cp_model
+
+from conftest import BUNDLED_ROSTER, LoadRoster, MakeVolunteer
+from utils.cp_model import BuildModel, BuildSolution, CalcObjectiveCoefficients, CalculatePreferencePoints, \
+    ConfigureSolver, ExtractSolution
+from utils.data_processing import BuildShiftDictionary
+from utils.reoptimize import Reoptimize
+from utils.y2y_classes import VolunteerGroup
+
+
+def SolveBundledRoster(Config):
+    # Solve the bundled roster, keeping the volunteer objects the solution refers to
+    shifts = BuildShiftDictionary()
+    (individual_volunteers, group_volunteers) = LoadRoster(*BUNDLED_ROSTER, shifts)
+
+    (model, assignment) = BuildModel(individual_volunteers, shifts, group_volunteers)
+    solver = cp_model.CpSolver()
+    ConfigureSolver(solver, Config)
+    assert solver.Solve(model) == cp_model.OPTIMAL
+
+    solution = ExtractSolution(solver, assignment, shifts, individual_volunteers, group_volunteers)
+    return (solution, shifts, individual_volunteers, group_volunteers)
+
+
+def test_dropout_only_moves_the_neighborhood(config):
+    (solution, shifts, individual_volunteers, group_volunteers) = SolveBundledRoster(config)
+
+    # Drop an assigned volunteer
+    dropout = next(v for v in individual_volunteers if solution.VolunteerAssignments[v])
+    vacated = solution.VolunteerAssignments[dropout][0]
+    (repaired, volunteers) = Reoptimize(solution, shifts, individual_volunteers, group_volunteers,
+                                        RemovedVolunteers=[dropout])
+    assert not dropout in volunteers
+
+    # Everyone who did not list the vacated shift keeps their assignment
+    for v in volunteers:
+        if not vacated in v.PreferredShifts:
+            assert repaired.VolunteerAssignments[v] == solution.VolunteerAssignments[v]
+
+    # The repair is at least as good as leaving the vacated place empty
+    points = CalculatePreferencePoints([dropout], shifts)
+    coefficients = CalcObjectiveCoefficients(points, shifts)
+    dropped = int(coefficients[points.ShiftIds == points.ShiftNames.index(vacated)][0])
+    assert repaired.ObjectiveValue >= solution.ObjectiveValue - dropped
+
+
+def test_move_penalty_keeps_assigned_volunteers_in_place():
+    shifts = BuildShiftDictionary()
+
+    # Ana works her second choice; Ben leaves her first choice open when he drops out
+    ana = MakeVolunteer(0, 'Ana Diaz', ['Tuesday Overnight', 'Monday Overnight'])
+    ben = MakeVolunteer(1, 'Ben Ng', ['Tuesday Overnight'])
+    volunteers = [ana, ben]
+    solution = BuildSolution({(ana, 'Monday Overnight'): 1, (ben, 'Tuesday Overnight'): 1}, shifts, volunteers)
+
+    # By default Ana stays where she is
+    (repaired, _) = Reoptimize(solution, shifts, volunteers, RemovedVolunteers=[ben])
+    assert repaired.VolunteerAssignments[ana] == ['Monday Overnight']
+
+    # Without the penalty she moves to her first choice, which scores higher
+    (moved, _) = Reoptimize(solution, shifts, volunteers, RemovedVolunteers=[ben], MovePenalty=0)
+    assert moved.VolunteerAssignments[ana] == ['Tuesday Overnight']
+    assert moved.ObjectiveValue > repaired.ObjectiveValue
+
+
+def test_stale_assignments_are_reassigned():
+    shifts = BuildShiftDictionary()
+
+    # Ana works Monday Overnight, which Cal wants too, then drops it from her preferences
+    ana = MakeVolunteer(0, 'Ana Diaz', ['Monday Overnight', 'Tuesday Overnight'])
+    cal = MakeVolunteer(1, 'Cal Ruiz', ['Monday Overnight'])
+    solution = BuildSolution({(ana, 'Monday Overnight'): 1}, shifts, [ana, cal])
+    ana.PreferredShifts = ['Tuesday Overnight']
+
+    (repaired, _) = Reoptimize(solution, shifts, [ana, cal])
+    assert repaired.VolunteerAssignments[ana] == ['Tuesday Overnight']
+    assert repaired.VolunteerAssignments[cal] == ['Monday Overnight']
+
+
+def test_shrunk_group_count_is_cut():
+    shifts = BuildShiftDictionary()
+    group = VolunteerGroup()
+    (group.ID_Number, group.GroupName, group.AssignedShift, group.Volunteers) = (1, 'Harvard Caribbean Club',
+                                                                                  'Thursday Dinner', 3)
+    solution = BuildSolution({(group, 'Thursday Dinner'): 3}, shifts, [], [group])
+
+    # Two of the group's members drop out
+    group.Volunteers = 1
+    (repaired, _) = Reoptimize(solution, shifts, [], [group])
+    assert repaired.Counts == {(group, 'Thursday Dinner'): 1}
+    assert len(repaired.ShiftAssignments['Thursday Dinner']) == 1
+
+
+def test_multiple_shift_roster_is_refused():
+    shifts = BuildShiftDictionary()
+    ana = MakeVolunteer(0, 'Ana Diaz', ['Monday Dinner', 'Friday Dinner'], MaxShifts=2)
+    solution = BuildSolution({(ana, 'Monday Dinner'): 1}, shifts, [ana])
+    with pytest.raises(ValueError, match='cp-sat'):
+        Reoptimize(solution, shifts, [ana])
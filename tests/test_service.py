@@ -0,0 +1,138 @@
+import pytest
+
+from utils.service import LocalClient, SchedulingService, SchedulingSession
+
+
+@pytest.fixture
+def client(config):
+    # Serve the bundled roster without a network
+    return LocalClient(SchedulingService(SchedulingSession(config)))
+
+
+def test_schedule(client):
+    (code, schedule) = client.Get('/schedule')
+    assert code == 200
+    assert schedule['status'] == 'Optimal'
+    assert schedule['objective'] == 1951
+
+
+def test_edits(client):
+    # Add a volunteer who only works an under-staffed shift
+    (_, schedule) = client.Get('/schedule')
+    shift = schedule['understaffed'][0]
+    (code, schedule) = client.Post('/edits', [{'op': 'add_volunteer', 'name': 'New Volunteer', 'shifts': [shift]}])
+    assert code == 200
+    assert schedule['volunteers']['New Volunteer'] == [shift]
+
+    # Move them to another shift
+    (code, schedule) = client.Post('/edits', [
+        {'op': 'change_preferences', 'name': 'New Volunteer', 'shifts': ['Saturday Overnight']}])
+    assert code == 200
+    assert schedule['volunteers']['New Volunteer'] == ['Saturday Overnight']
+
+    # Remove them again
+    (code, schedule) = client.Post('/edits', [{'op': 'remove_volunteer', 'name': 'New Volunteer'}])
+    assert code == 200
+    assert not 'New Volunteer' in schedule['volunteers']
+    assert schedule['objective'] == 1951
+
+    # Let a shift take one more volunteer
+    (code, schedule) = client.Post('/edits', [{'op': 'set_requirement', 'shift': 'Monday Dinner', 'required': 4}])
+    assert code == 200
+    assert len(schedule['shifts']['Monday Dinner']) <= 4
+
+    # Each route reports its request count and timings
+    (code, metrics) = client.Get('/metrics')
+    assert code == 200
+    assert metrics['requests']['POST /edits']['count'] == 4
+    assert metrics['requests']['POST /edits']['max_ms'] > 0
+    assert set(metrics['last_solve_ms']) == {'Objective', 'Hints', 'Solve', 'Extract'}
+
+
+def test_set_requirement_recaps_groups(tmp_path, config):
+    # A group larger than its shift's requirement is capped, and grows back when the requirement is raised
+    groups = tmp_path / 'groups.csv'
+    groups.write_text('Shift,Group,Volunteers\nThursday Dinner,Harvard Caribbean Club,5\n')
+    client = LocalClient(SchedulingService(SchedulingSession(config, GroupsFile=str(groups))))
+    for (required, members) in ((3, 3), (1, 1), (5, 5), (8, 5)):
+        (code, schedule) = client.Post('/edits', [
+            {'op': 'set_requirement', 'shift': 'Thursday Dinner', 'required': required}])
+        assert code == 200
+        assert schedule['status'] == 'Optimal'
+        assert len([v for v in schedule['shifts']['Thursday Dinner'] if v.startswith('Harvard Caribbean Club')]) == \
+            members
+
+
+@pytest.mark.parametrize('Edits', [
+    [{'op': 'remove_volunteer', 'name': 'Amy Liu'}, {'op': 'remove_volunteer', 'name': 'Amy Liu'}],
+    [{'op': 'remove_volunteer', 'name': 'Amy Liu'}, {'op': 'change_preferences', 'name': 'Amy Liu', 'shifts': []}],
+    [{'op': 'remove_volunteer', 'name': 'Amy Liu'}, {'op': 'set_requirement', 'shift': 'Funday', 'required': 1}],
+])
+def test_bad_batch_leaves_roster_untouched(client, Edits):
+    (code, response) = client.Post('/edits', Edits)
+    assert code == 400
+    assert 'error' in response
+
+    # Amy Liu is still on the roster and the schedule is unchanged
+    (code, schedule) = client.Post('/solve')
+    assert code == 200
+    assert 'Amy Liu' in schedule['volunteers']
+    assert schedule['objective'] == 1951
+
+
+def test_unknown_route(client):
+    assert client.Get('/nowhere')[0] == 404
+
+
+@pytest.mark.parametrize('Edits', [
+    [{'op': 'add_volunteer', 'name': 'Ann Lee', 'shifts': 'Monday Dinner'}],
+    [{'op': 'add_volunteer', 'name': 'Ann Lee', 'shifts': [['Monday Dinner']]}],
+    [{'op': 'add_volunteer', 'name': ['Ann Lee'], 'shifts': ['Monday Dinner']}],
+    [{'op': 'add_volunteer', 'name': 'Ann Lee', 'shifts': ['Monday Dinner'], 'max_shifts': True}],
+    [{'op': 'change_preferences', 'name': 'Amy Liu', 'shifts': {'Monday Dinner': 1}}],
+    [{'op': 'set_requirement', 'shift': 'Monday Dinner', 'required': '4'}],
+    [{'op': 'set_requirement', 'shift': 'Monday Dinner', 'required': True}],
+    [{'op': 'set_requirement', 'shift': ['Monday Dinner'], 'required': 4}],
+    [['set_requirement', 'Monday Dinner', 4]],
+    [{'op': ['add_volunteer'], 'name': 'Ann Lee', 'shifts': ['Monday Dinner']}],
+])
+def test_malformed_edit_is_rejected(client, Edits):
+    (code, response) = client.Post('/edits', Edits)
+    assert code == 400
+    assert 'error' in response
+
+    # The service keeps answering
+    assert client.Get('/schedule')[1]['objective'] == 1951
+
+
+def test_failed_batch_is_rolled_back(client, monkeypatch):
+    session = client.Service.Session
+    model = str(session.Model.Proto())
+    names = [v.Name for v in session.IndividualVolunteers]
+    add_variables = session.AddVariables
+
+    # The second added volunteer breaks the service part way through the batch
+    def AddVariablesOnce(Volunteer):
+        monkeypatch.setattr(session, 'AddVariables', None)
+        add_variables(Volunteer)
+    monkeypatch.setattr(session, 'AddVariables', AddVariablesOnce)
+
+    (code, response) = client.Post('/edits', [
+        {'op': 'set_requirement', 'shift': 'Monday Dinner', 'required': 4},
+        {'op': 'add_volunteer', 'name': 'Ann Lee', 'shifts': ['Monday Dinner']},
+        {'op': 'change_preferences', 'name': 'Amy Liu', 'shifts': ['Saturday Overnight']},
+    ])
+    assert code == 500
+    assert 'error' in response
+
+    # The roster and the model are as they were before the batch
+    assert str(session.Model.Proto()) == model
+    assert [v.Name for v in session.IndividualVolunteers] == names
+    assert session.Shifts['Monday Dinner'].required_volunteers == 3
+    monkeypatch.undo()
+    assert client.Post('/solve')[1]['objective'] == 1951
+
+    # And later edits still apply
+    (code, schedule) = client.Post('/edits', [{'op': 'add_volunteer', 'name': 'Ann Lee', 'shifts': ['Monday Dinner']}])
+    assert code == 200
+    assert 'Ann Lee' in schedule['volunteers']
@@ -0,0 +1,69 @@
+import pytest
+from ortools.sat.python import cp_model
+
+from conftest import MakeVolunteer
+from utils.cp_model import AddVolunteerLimits, FindShiftConflicts
+from utils.data_processing import BuildShiftDictionary
+
+
+def test_back_to_back_shifts_conflict():
+    # Monday Dinner ends at 20:00, when Monday Evening starts
+    conflicts = FindShiftConflicts(BuildShiftDictionary(), MinRestHours=1)
+    assert {'Monday Dinner', 'Monday Evening'} in conflicts
+    assert {'Monday Evening', 'Monday Overnight'} in conflicts
+    assert not any({'Monday Breakfast', 'Monday Dinner'} <= c for c in conflicts)
+
+    # Without any rest, shifts that only touch can be worked together
+    assert not any({'Monday Dinner', 'Monday Evening'} <= c for c in FindShiftConflicts(BuildShiftDictionary(), 0))
+
+
+@pytest.mark.parametrize('MinRestHours', [0, 1])
+def test_conflicts_wrap_around_the_week(MinRestHours):
+    # Saturday Overnight ends at 07:00 on Sunday, when the next week's Sunday Breakfast starts
+    conflicts = FindShiftConflicts(BuildShiftDictionary(), MinRestHours)
+    assert ({'Saturday Overnight', 'Sunday Breakfast'} in conflicts) == (MinRestHours > 0)
+
+    # Saturday Overnight overlaps the next week's Sunday Overnight whatever the rest
+    shifts = BuildShiftDictionary()
+    shifts['Saturday Overnight'].duration_hours = 32
+    assert any({'Saturday Overnight', 'Sunday Overnight'} <= c for c in FindShiftConflicts(shifts, MinRestHours))
+
+
+def test_conflicts_are_maximal():
+    # A long Monday Evening overlaps both its neighbours, which only touch each other
+    shifts = BuildShiftDictionary()
+    shifts['Monday Evening'].duration_hours = 12
+    conflicts = FindShiftConflicts(shifts, MinRestHours=0)
+    assert {'Monday Evening', 'Monday Overnight'} in conflicts
+    assert {'Monday Evening', 'Tuesday Breakfast'} in conflicts
+
+    # Once the neighbours overlap too, the three form a single set and no pair of them is listed apart
+    shifts['Monday Overnight'].duration_hours = 9
+    conflicts = FindShiftConflicts(shifts, MinRestHours=0)
+    assert {'Monday Evening', 'Monday Overnight', 'Tuesday Breakfast'} in conflicts
+    assert {'Monday Evening', 'Monday Overnight'} not in conflicts
+
+
+def SolveLimits(Volunteer, Shifts, Conflicts):
+    # Assign the volunteer as many of the shifts as the limits allow
+    model = cp_model.CpModel()
+    pairs = [(s, model.NewBoolVar(s)) for s in Shifts]
+    AddVolunteerLimits(model, Volunteer, pairs, Conflicts)
+    model.Maximize(sum(x for (_, x) in pairs))
+
+    solver = cp_model.CpSolver()
+    assert solver.Solve(model) == cp_model.OPTIMAL
+    return sorted(s for (s, x) in pairs if solver.Value(x))
+
+
+def test_volunteer_limits():
+    shifts = ['Monday Dinner', 'Monday Evening', 'Monday Overnight', 'Friday Dinner']
+    conflicts = FindShiftConflicts(BuildShiftDictionary(), MinRestHours=1)
+
+    # A single-shift volunteer needs no conflicts
+    assert len(SolveLimits(MakeVolunteer(0, 'Ana Diaz', shifts), shifts, ())) == 1
+
+    # Monday Evening conflicts with both its neighbours, which can be worked together
+    assert SolveLimits(MakeVolunteer(0, 'Ana Diaz', shifts, MaxShifts=4), shifts, conflicts) == [
+        'Friday Dinner', 'Monday Dinner', 'Monday Overnight']
+    assert len(SolveLimits(MakeVolunteer(0, 'Ana Diaz', shifts, MaxShifts=2), shifts, conflicts)) == 2
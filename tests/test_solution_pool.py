@@ -0,0 +1,17 @@
+from conftest import MakeVolunteer
+from utils.cp_model import BuildSolution
+from utils.data_processing import BuildShiftDictionary
+from utils.solution_pool import DiffSchedules
+
+
+def test_diff_keeps_volunteers_who_share_a_name_apart():
+    shifts = BuildShiftDictionary()
+    first = MakeVolunteer(0, 'Sam Lee', ['Monday Dinner', 'Friday Dinner'])
+    second = MakeVolunteer(1, 'Sam Lee', ['Monday Dinner', 'Friday Dinner'])
+    volunteers = [first, second]
+
+    # Only the second volunteer moves
+    base = BuildSolution({(first, 'Monday Dinner'): 1, (second, 'Monday Dinner'): 1}, shifts, volunteers)
+    other = BuildSolution({(first, 'Monday Dinner'): 1, (second, 'Friday Dinner'): 1}, shifts, volunteers)
+
+    assert DiffSchedules(base, other) == [('Sam Lee', ['Monday Dinner'], ['Friday Dinner'])]
@@ -0,0 +1,51 @@
+import numpy as np
+
+from conftest import BUNDLED_ROSTER, LoadRoster
+from utils.cp_model import BuildModel, CalcObjectiveCoefficients, CalculatePreferencePoints, GetObjectiveWeights
+from utils.data_processing import BuildShiftDictionary
+from utils.sweep import FindParetoFront, SweepObjectiveWeights, SweepPoint
+
+
+def MakePoint(Coverage, PreferencePoints):
+    point = SweepPoint()
+    (point.Coverage, point.PreferencePoints) = (Coverage, PreferencePoints)
+    return point
+
+
+def test_pareto_front_keeps_only_non_dominated_points():
+    a = MakePoint(20.0, 100)
+    b = MakePoint(18.0, 150)
+    c = MakePoint(18.0, 120)  # beaten by b on preference points at the same coverage
+    d = MakePoint(15.0, 140)  # beaten by b on both
+    e = MakePoint(12.0, 200)
+    f = MakePoint(sum([0.1] * 200), 100)  # the same scores as a, up to rounding (20.000000000000014)
+
+    front = FindParetoFront([d, c, e, a, f, b])
+    assert front == [a, b, e]
+
+
+def test_pareto_front_of_one_point():
+    a = MakePoint(20.0, 100)
+    assert FindParetoFront([a]) == [a]
+    assert FindParetoFront([]) == []
+
+
+def test_each_point_is_scored_under_its_own_weights(config):
+    shifts = BuildShiftDictionary()
+    (individual_volunteers, group_volunteers) = LoadRoster(*BUNDLED_ROSTER, shifts)
+    points = CalculatePreferencePoints(individual_volunteers + group_volunteers, shifts)
+    (model, _) = BuildModel(individual_volunteers, shifts, group_volunteers, Points=points)
+
+    grid = [GetObjectiveWeights(),
+            {'Maximize the shift coverage': 1, 'Respect the volunteer preferences': 10},
+            {'Maximize the shift coverage': 0, 'Respect the volunteer preferences': 1}]
+    results = SweepObjectiveWeights(model, points, shifts, grid, config)
+
+    for (weights, point) in zip(grid, results):
+        assert point.Weights == weights
+        assert point.ObjectiveValue == int(np.dot(CalcObjectiveCoefficients(points, shifts, weights), point.Values))
+
+    # The default weights give the usual optimum, and the preference-only point realizes the most preference points
+    assert results[0].ObjectiveValue == 1951
+    assert results[2].PreferencePoints == max(p.PreferencePoints for p in results)
+    assert results[0].Coverage == max(p.Coverage for p in results)
@@ -0,0 +1,54 @@
+import json
+
+from conftest import BUNDLED_ROSTER, MakeConfig
+from utils.export_data import ExportTelemetry
+from utils.pipeline import SolveRoster
+from utils.telemetry import Telemetry
+
+# The stages SolveRoster times, in order
+STAGES = ['BuildShiftDictionary', 'Load', 'CapVolunteerGroups', 'CalculatePreferencePoints', 'PresolveAssignment',
+          'BuildModel', 'Solve', 'ExtractSolution']
+
+
+def test_report_of_a_solve(tmp_path, config):
+    telemetry = Telemetry(ProfileStages=['BuildModel'], ProfileDirectory=str(tmp_path / 'profiles'))
+    (solution, _, _) = SolveRoster(config, *BUNDLED_ROSTER, Telemetry=telemetry)
+    report = telemetry.Report()
+
+    # Every stage is timed once, in order
+    assert [stage['stage'] for stage in report['stages']] == STAGES
+    for stage in report['stages']:
+        assert stage['seconds'] >= 0
+        assert stage['peak_memory_mb'] >= stage['peak_memory_growth_mb'] >= 0
+    assert report['total_seconds'] >= sum(stage['seconds'] for stage in report['stages'])
+
+    # The model's size and the solver's statistics
+    assert report['model']['variables'] > 0
+    assert 0 < report['model']['objective_terms'] <= report['model']['variables']
+    assert report['solver']['status'] == 'Optimal'
+    assert report['solver']['objective'] == solution.ObjectiveValue
+    assert report['solver']['best_bound'] == solution.ObjectiveValue
+
+    # Only the asked-for stage is profiled, and its full profile is written out
+    assert list(report['profiles']) == ['BuildModel']
+    assert any('BuildModel' in f['function'] for f in report['profiles']['BuildModel'])
+    assert (tmp_path / 'profiles' / 'BuildModel.prof').exists()
+
+    # The exported report is plain JSON
+    ExportTelemetry(telemetry, str(tmp_path))
+    with open(str(tmp_path / 'Telemetry.json')) as f:
+        assert json.load(f)['solver'] == json.loads(json.dumps(report['solver']))
+
+
+def test_report_of_the_lns_backend():
+    telemetry = Telemetry()
+    SolveRoster(MakeConfig(Backend='lns', MaxTimeInSeconds=1), *BUNDLED_ROSTER, Telemetry=telemetry)
+    solver = telemetry.Report()['solver']
+
+    # The objective only improves, and the last point of the trajectory is the final objective
+    objectives = [point['objective'] for point in solver['trajectory']]
+    assert objectives == sorted(objectives)
+    assert objectives[-1] == solver['objective']
+    assert solver['neighborhoods'] > 0
+    assert solver['stop_reason'] == 'time limit'
+    assert not 'best_bound' in solver
@@ -0,0 +1,69 @@
+import pytest
+
+from conftest import BUNDLED_ROSTER, LoadRoster, MakeSyntheticRoster, MakeVolunteer
+from utils.data_processing import BuildShiftDictionary
+from utils.pipeline import STATUS_NAMES, SolveRoster
+from utils.validation import ValidateSchedule
+
+
+def Constraints(Report):
+    # Return the names of the constraints a report found violated
+    return sorted(set(constraint for (constraint, _) in Report.Violations))
+
+
+@pytest.mark.parametrize('Roster', ['bundled', 'synthetic'])
+def test_solver_schedule_is_valid(tmp_path, config, Roster):
+    if Roster == 'bundled':
+        files = BUNDLED_ROSTER
+    else:
+        # Volunteers who work several shifts are also checked for rest
+        files = MakeSyntheticRoster(tmp_path, Volunteers=150, PreferenceListLength=6, Groups=4, MaxShifts=3,
+                                    Seed=0)
+
+    (solution, shifts, status) = SolveRoster(config, *files)
+    assert STATUS_NAMES[status] == 'Optimal'
+
+    (individual_volunteers, group_volunteers) = LoadRoster(*files, shifts)
+    report = ValidateSchedule(solution.AssignmentRows(), individual_volunteers, shifts, group_volunteers,
+                              config.MinRestHours)
+
+    assert report.Violations == []
+    assert report.ObjectiveValue == solution.ObjectiveValue
+    assert report.AssignmentsRealized == solution.AssignmentsRealized
+    assert report.UnderStaffedShifts == solution.UnderStaffedShifts
+
+
+def test_over_capacity_shift_is_reported():
+    # Monday Overnight requires a single volunteer
+    volunteers = [MakeVolunteer(0, 'Ana Diaz', ['Monday Overnight']), MakeVolunteer(1, 'Ben Ng', ['Monday Overnight'])]
+    report = ValidateSchedule([('Ana Diaz', ['Monday Overnight']), ('Ben Ng', ['Monday Overnight'])], volunteers,
+                              BuildShiftDictionary())
+
+    assert Constraints(report) == ['Over capacity']
+    assert 'Monday Overnight' in report.Violations[0][1]
+
+
+def test_unlisted_shift_is_reported():
+    volunteers = [MakeVolunteer(0, 'Ana Diaz', ['Monday Dinner'])]
+    report = ValidateSchedule([('Ana Diaz', ['Friday Dinner'])], volunteers, BuildShiftDictionary())
+
+    assert Constraints(report) == ['Not eligible']
+    assert report.ObjectiveValue == 0
+
+
+def test_over_limit_volunteer_is_reported():
+    # The shifts are days apart, so only the limit is broken
+    volunteers = [MakeVolunteer(0, 'Ana Diaz', ['Monday Dinner', 'Friday Dinner'], MaxShifts=1)]
+    report = ValidateSchedule([('Ana Diaz', ['Monday Dinner', 'Friday Dinner'])], volunteers, BuildShiftDictionary())
+
+    assert Constraints(report) == ['Too many shifts']
+
+
+def test_min_rest_violation_is_reported():
+    # Monday Evening ends at 23:00, when Monday Overnight starts
+    volunteers = [MakeVolunteer(0, 'Ana Diaz', ['Monday Evening', 'Monday Overnight'], MaxShifts=2)]
+    schedule = [('Ana Diaz', ['Monday Evening', 'Monday Overnight'])]
+    shifts = BuildShiftDictionary()
+
+    assert Constraints(ValidateSchedule(schedule, volunteers, shifts, MinRestHours=1)) == ['Too little rest']
+    assert ValidateSchedule(schedule, volunteers, shifts, MinRestHours=0).IsValid()